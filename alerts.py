@@ -0,0 +1,163 @@
+import logging
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from sqlalchemy import insert, select
+from database import db
+from models import Job, SavedSearch, AlertOutbox
+
+logger = logging.getLogger(__name__)
+
+# Length of the substrings used to index keyword and location filters
+GRAM_SIZE = 3
+
+
+def _grams(text, size):
+    """Return the set of substrings of the given size"""
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class SubstringIndex:
+    """Finds stored needles that occur anywhere in a haystack.
+
+    Each needle is filed under its rarest gram, so a lookup only touches the
+    grams present in the haystack plus the needles sharing one of them.
+    Needles shorter than a gram are filed under themselves.
+    """
+
+    def __init__(self, gram_size=GRAM_SIZE):
+        self.gram_size = gram_size
+        self._by_gram = defaultdict(list)
+        self._short = defaultdict(list)
+        self._pending = []
+
+    def add(self, needle, item):
+        self._pending.append((needle.lower(), item))
+
+    def build(self):
+        """File every added needle; call once after the last add()"""
+        counts = Counter()
+        for needle, _ in self._pending:
+            if len(needle) >= self.gram_size:
+                counts.update(_grams(needle, self.gram_size))
+
+        for needle, item in self._pending:
+            if len(needle) < self.gram_size:
+                self._short[needle].append(item)
+            else:
+                rarest = min(_grams(needle, self.gram_size), key=lambda gram: (counts[gram], gram))
+                self._by_gram[rarest].append(item)
+        self._pending = []
+
+    def candidates(self, haystack):
+        """Yield items whose needle may occur in the haystack"""
+        haystack = (haystack or '').lower()
+        for gram in _grams(haystack, self.gram_size):
+            yield from self._by_gram.get(gram, ())
+        if self._short:
+            for size in range(1, self.gram_size):
+                for gram in _grams(haystack, size):
+                    yield from self._short.get(gram, ())
+
+
+class SearchMatcher:
+    """Matches jobs against many saved searches without a searches x jobs loop.
+
+    Every search is filed under its most selective filter: keyword, then
+    department, then location, then salary bounds. A job only visits the
+    searches that share its title grams, department, location grams or
+    salary interval, and each candidate is confirmed with
+    ``SavedSearch.matches`` so results equal running the search in index().
+    """
+
+    def __init__(self, searches):
+        self._keywords = SubstringIndex()
+        self._locations = SubstringIndex()
+        self._departments = defaultdict(list)
+        # Sorted (bound, search) pairs; a job matches a prefix of floors and a suffix of ceilings
+        floors = []
+        ceilings = []
+
+        for search in searches:
+            if search.keyword:
+                self._keywords.add(search.keyword, search)
+            elif search.department:
+                self._departments[search.department].append(search)
+            elif search.location:
+                self._locations.add(search.location, search)
+            elif search.salary_min is not None:
+                floors.append((search.salary_min, search.id, search))
+            elif search.salary_max is not None:
+                ceilings.append((search.salary_max, search.id, search))
+
+        self._keywords.build()
+        self._locations.build()
+
+        floors.sort(key=lambda entry: entry[:2])
+        ceilings.sort(key=lambda entry: entry[:2])
+        self._floor_bounds = [entry[0] for entry in floors]
+        self._floor_searches = [entry[2] for entry in floors]
+        self._ceiling_bounds = [entry[0] for entry in ceilings]
+        self._ceiling_searches = [entry[2] for entry in ceilings]
+
+    def candidates(self, job):
+        """Yield searches that may match the job"""
+        yield from self._keywords.candidates(job.title)
+        yield from self._departments.get(job.department, ())
+        yield from self._locations.candidates(job.location)
+        if job.salary_min is not None:
+            yield from self._floor_searches[:bisect_right(self._floor_bounds, job.salary_min)]
+        if job.salary_max is not None:
+            yield from self._ceiling_searches[bisect_left(self._ceiling_bounds, job.salary_max):]
+
+    def match(self, jobs):
+        """Return {search_id: [job, ...]} for every search with at least one match"""
+        matches = defaultdict(list)
+        for job in jobs:
+            seen = set()
+            for search in self.candidates(job):
+                if search.id in seen:
+                    continue
+                seen.add(search.id)
+                if search.matches(job):
+                    matches[search.id].append(job)
+        return matches
+
+
+def queue_alerts(requisition_ids):
+    """Match newly scraped jobs against all saved searches and write the outbox"""
+    if not requisition_ids:
+        return 0
+
+    searches = [search for search in SavedSearch.query.all() if search.has_criteria()]
+    if not searches:
+        return 0
+
+    requisition_ids = set(requisition_ids)
+    new_jobs = Job.query.filter(Job.requisition_id.in_(requisition_ids)).all()
+
+    matches = SearchMatcher(searches).match(new_jobs)
+
+    # A job re-added after cleanup must not alert the same search twice
+    already_queued = set(db.session.execute(
+        select(AlertOutbox.saved_search_id, AlertOutbox.requisition_id)
+        .where(AlertOutbox.requisition_id.in_(requisition_ids))
+    ).all())
+
+    rows = [
+        {
+            'saved_search_id': search_id,
+            'requisition_id': job.requisition_id,
+            'title': job.title,
+            'url': job.url
+        }
+        for search_id, jobs in matches.items()
+        for job in jobs
+        if (search_id, job.requisition_id) not in already_queued
+    ]
+
+    if rows:
+        db.session.execute(insert(AlertOutbox), rows)
+        db.session.commit()
+
+    logger.info(f"Queued {len(rows)} alerts for {len(matches)} saved searches")
+    return len(rows)
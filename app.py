@@ -1,93 +1,277 @@
+import hmac
 import os
 import logging
-import pytz
-from flask import Flask, render_template, request, jsonify
-from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.orm import DeclarativeBase
+import math
+import time
+from flask import Flask, Blueprint, abort, render_template, request, jsonify, send_from_directory, Response, stream_with_context
+from sqlalchemy import inspect, or_, text
+from sqlalchemy.orm import joinedload, undefer
 from werkzeug.middleware.proxy_fix import ProxyFix
+from database import db
+import models
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-class Base(DeclarativeBase):
-    pass
+bp = Blueprint('jobs', __name__)
+
+_app = None
+
+
+def configure_logging():
+    """Configure root logging once, at LOG_LEVEL (default INFO)"""
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
+
+
+def log_missing_optional_modules():
+    """Warn once per process about speedups that are off because their package isn't installed"""
+    from importlib.util import find_spec
+    from page_cache import PAGE_CACHE_ENABLED
+    from read_model import READ_MODEL_ENABLED
+    if find_spec('orjson') is None:
+        logger.warning("orjson is not installed; JSON responses use Flask's encoder")
+    if find_spec('numpy') is None:
+        logger.warning("numpy is not installed; salary statistics and duplicate detection run in pure Python")
+        if READ_MODEL_ENABLED:
+            logger.warning("numpy is not installed; READ_MODEL=1 is ignored and queries go to the database")
+    if find_spec('brotli') is None and PAGE_CACHE_ENABLED:
+        logger.warning("brotli is not installed; cached pages are served gzip-compressed only")
+
+
+def create_app():
+    """Build and configure a Flask app; no database I/O happens here"""
+    configure_logging()
+    log_missing_optional_modules()
+
+    app = Flask(__name__)
+    app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key")
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+
+    # Configure the database
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///azstatejobs.db")
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+    }
+
+    # Initialize the app with the extension
+    db.init_app(app)
+
+    app.register_blueprint(bp)
+
+    import profiling
+    profiling.init_app(app)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create any missing database tables."""
+        init_db(app)
+
+    return app
+
+
+def get_app():
+    """Return the process-wide app, creating it on first use"""
+    global _app
+    if _app is None:
+        _app = create_app()
+    return _app
+
+
+def init_db(app):
+    """Create any missing tables and columns; run once at process start, not on import"""
+    with app.app_context():
+        db.create_all()
+        add_missing_columns()
+        add_missing_indexes()
+        from persistence import (backfill_coordinates, backfill_display_fields, backfill_sources, expire_closed_jobs,
+                                 migrate_legacy_job_text)
+        migrate_legacy_job_text()
+        backfill_display_fields()
+        backfill_coordinates()
+        backfill_sources()
+        if expire_closed_jobs():
+            from scraper import group_duplicate_postings
+            group_duplicate_postings()
+
+
+def add_missing_columns():
+    """Add nullable model columns that existing tables predate"""
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            logger.info(f"Added column {table.name}.{column.name}")
+
+
+def index_signature(columns, options):
+    """What an index covers, ignoring its name; staged publishes rename the jobs indexes"""
+    return tuple(columns), any(key.endswith('_where') and value is not None for key, value in options.items())
 
-db = SQLAlchemy(model_class=Base)
 
-# Create the app
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key")
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+def add_missing_indexes():
+    """Create model indexes that existing tables predate"""
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {index_signature(index['column_names'], index.get('dialect_options', {}))
+                    for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            options = {f"{dialect}_{key}": value for dialect, values in index.dialect_options.items()
+                       for key, value in values.items()}
+            if index_signature([column.name for column in index.columns], options) not in existing:
+                index.create(db.engine)
+                logger.info(f"Created index {index.name}")
 
-# Configure the database
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///azstatejobs.db")
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
 
-# Initialize the app with the extension
-db.init_app(app)
+def json_response(payload, status=200):
+    """JSON response, encoded with orjson when it is installed"""
+    if orjson is not None:
+        return Response(orjson.dumps(payload), status=status, mimetype='application/json')
+    response = jsonify(payload)
+    response.status_code = status
+    return response
 
-with app.app_context():
-    # Import models to create tables
-    import models
-    db.create_all()
 
-@app.route('/')
+def clamp_coordinates(latitude, longitude):
+    """Latitude and longitude limited to the valid ranges"""
+    return min(max(latitude, -90.0), 90.0), min(max(longitude, -180.0), 180.0)
+
+
+def geo_places(args):
+    """Places selected by the near/radius and bbox parameters, or None when neither is given"""
+    near = args.get('near', '').strip()
+    bbox = args.get('bbox', '').strip()
+    if not near and not bbox:
+        return None
+
+    from gazetteer import current_geo_index, resolve_point, DEFAULT_RADIUS_MILES, MAX_RADIUS_MILES
+    index = current_geo_index()
+    places = None
+    if near:
+        point = resolve_point(near)
+        if point is None or not all(math.isfinite(value) for value in point):
+            raise ValueError(f"Unknown place: {near}")
+        latitude, longitude = clamp_coordinates(*point)
+        radius = args.get('radius', type=float, default=DEFAULT_RADIUS_MILES)
+        if not math.isfinite(radius):
+            raise ValueError("radius must be a number of miles")
+        radius = min(max(radius, 0), MAX_RADIUS_MILES)
+        places = set(index.within_radius(latitude, longitude, radius))
+    if bbox:
+        try:
+            west, south, east, north = (float(value) for value in bbox.split(','))
+        except ValueError:
+            raise ValueError("bbox must be west,south,east,north")
+        if not all(math.isfinite(value) for value in (west, south, east, north)):
+            raise ValueError("bbox values must be finite numbers")
+        south, west = clamp_coordinates(south, west)
+        north, east = clamp_coordinates(north, east)
+        if west > east or south > north:
+            raise ValueError("bbox must have west <= east and south <= north")
+        in_box = index.within_bbox(west, south, east, north)
+        places = in_box if places is None else places & in_box
+    return places
+
+
+def __getattr__(name):
+    # Keeps `from app import app` working without building the app on import
+    if name == 'app':
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+@bp.route('/')
 def index():
     """Main page displaying job listings"""
     try:
         # Get filter parameters
-        search_query = request.args.get('search', '')
-        department_filter = request.args.get('department', '')
-        location_filter = request.args.get('location', '')
-        salary_min = request.args.get('salary_min', type=int)
-        salary_max = request.args.get('salary_max', type=int)
-        
-        # Query jobs with filters
-        query = models.Job.query
-        
-        if search_query:
-            query = query.filter(models.Job.title.contains(search_query))
-        
-        if department_filter:
-            query = query.filter(models.Job.department == department_filter)
-            
-        if location_filter:
-            query = query.filter(models.Job.location.contains(location_filter))
-            
-        if salary_min is not None:
-            query = query.filter(models.Job.salary_min >= salary_min)
-            
-        if salary_max is not None:
-            query = query.filter(models.Job.salary_max <= salary_max)
-        
-        # Order by newest first
-        jobs = query.order_by(models.Job.scraped_at.desc()).all()
-        
-        # Get unique departments and locations for filters
-        departments = db.session.query(models.Job.department).distinct().order_by(models.Job.department).all()
-        departments = [d[0] for d in departments if d[0]]
-        
-        locations = db.session.query(models.Job.location).distinct().order_by(models.Job.location).all()
-        locations = [l[0] for l in locations if l[0]]
-        
-        return render_template('index.html', 
-                             jobs=jobs, 
-                             departments=departments,
-                             locations=locations,
+        filters = (
+            request.args.get('search', ''),
+            request.args.get('department', ''),
+            request.args.get('location', ''),
+            request.args.get('salary_min', type=int),
+            request.args.get('salary_max', type=int)
+        )
+
+        # Rendered once per data version and filter combination; only the unfiltered and
+        # department pages come from a bounded set worth compressing hard
+        search_query, _, location_filter, salary_min, salary_max = filters
+        shared = not (search_query or location_filter or salary_min is not None or salary_max is not None)
+        from page_cache import cached_page
+        return cached_page(('index',) + filters, lambda: render_index(*filters), shared)
+    except Exception as e:
+        logger.error(f"Error in index route: {str(e)}")
+        return render_template('index.html', job_count=0, departments=[], locations=[], error="Error loading jobs")
+
+def render_index(search_query, department_filter, location_filter, salary_min, salary_max):
+    """Render the index page for one set of filters"""
+    from read_model import current_read_model
+    read_model = current_read_model()
+    if read_model is not None:
+        return render_template('index.html',
+                             job_count=len(read_model.filter(search_query, department_filter, location_filter,
+                                                             salary_min, salary_max)),
+                             departments=read_model.departments,
+                             locations=read_model.locations,
                              current_search=search_query,
                              current_department=department_filter,
                              current_location=location_filter,
                              current_salary_min=salary_min,
                              current_salary_max=salary_max)
-    except Exception as e:
-        logger.error(f"Error in index route: {str(e)}")
-        return render_template('index.html', jobs=[], departments=[], locations=[], error="Error loading jobs")
+    
+    # Query open jobs with filters
+    query = models.Job.query.filter(models.ACTIVE)
+    
+    if search_query:
+        query = query.filter(models.Job.title.contains(search_query))
+    
+    if department_filter:
+        query = query.filter(models.Job.department == department_filter)
+        
+    if location_filter:
+        query = query.filter(models.Job.location.contains(location_filter))
+        
+    if salary_min is not None:
+        query = query.filter(models.Job.salary_min >= salary_min)
+        
+    if salary_max is not None:
+        query = query.filter(models.Job.salary_max <= salary_max)
+    
+    # Only the count is shown; the table itself loads from /api/jobs
+    job_count = query.count()
+    
+    # Unique departments and locations for filters are the same for every page of a data version
+    from page_cache import current_page_cache
+    departments, locations = current_page_cache().fragment('facets', load_facets)
+    
+    return render_template('index.html', 
+                         job_count=job_count, 
+                         departments=departments,
+                         locations=locations,
+                         current_search=search_query,
+                         current_department=department_filter,
+                         current_location=location_filter,
+                         current_salary_min=salary_min,
+                         current_salary_max=salary_max)
+
+def load_facets():
+    """Distinct departments and locations among open jobs"""
+    departments = db.session.query(models.Job.department).filter(models.ACTIVE).distinct().order_by(models.Job.department).all()
+    departments = [d[0] for d in departments if d[0]]
+    
+    locations = db.session.query(models.Job.location).filter(models.ACTIVE).distinct().order_by(models.Job.location).all()
+    locations = [l[0] for l in locations if l[0]]
+    return departments, locations
 
-@app.route('/api/jobs')
+@bp.route('/api/jobs')
 def api_jobs():
     """API endpoint for DataTables AJAX"""
     try:
@@ -96,9 +280,24 @@ def api_jobs():
         start = request.args.get('start', type=int, default=0)
         length = request.args.get('length', type=int, default=10)
         search_value = request.args.get('search[value]', default='')
+        places = geo_places(request.args)
+        collapse_duplicates = request.args.get('collapse_duplicates', default='0') in ('1', 'true')
+
+        from read_model import current_read_model
+        read_model = current_read_model()
+        if read_model is not None:
+            positions = read_model.filter(any_field=search_value,
+                                          places=frozenset(places) if places is not None else None,
+                                          collapse_duplicates=collapse_duplicates)
+            return json_response({
+                'draw': draw,
+                'recordsTotal': read_model.size,
+                'recordsFiltered': len(positions),
+                'data': read_model.page(positions, start, length)
+            })
         
-        # Base query
-        query = models.Job.query
+        # Base query: open postings only
+        query = models.Job.query.filter(models.ACTIVE)
         
         # Apply search filter
         if search_value:
@@ -107,47 +306,252 @@ def api_jobs():
                 models.Job.department.contains(search_value) |
                 models.Job.location.contains(search_value)
             )
+
+        # Apply radius/bounding-box filter
+        if places is not None:
+            query = query.filter(models.Job.place.in_(places))
+
+        # Show one posting per duplicate cluster
+        if collapse_duplicates:
+            query = query.filter(or_(models.Job.duplicate_cluster_id.is_(None),
+                                     models.Job.duplicate_cluster_id == models.Job.requisition_id))
         
         # Get total count before pagination
-        total_records = models.Job.query.count()
+        total_records = models.Job.query.filter(models.ACTIVE).count()
         filtered_records = query.count()
         
         # Apply ordering
         query = query.order_by(models.Job.scraped_at.desc())
         
-        # Apply pagination
-        jobs = query.offset(start).limit(length).all()
-        
+        # Apply pagination; rows carry strings rendered at scrape time
+        rows = query.with_entities(
+            models.Job.title_html,
+            models.Job.department,
+            models.Job.location,
+            models.Job.employment_type,
+            models.Job.salary_display,
+            models.Job.closing_date_display,
+            models.Job.scraped_at_display
+        ).offset(start).limit(length).all()
+
         # Format data for DataTables
-        data = []
-        for job in jobs:
-            salary_display = ""
-            if job.salary_min and job.salary_max:
-                salary_display = f"${job.salary_min:,} - ${job.salary_max:,}"
-            elif job.salary_text:
-                salary_display = job.salary_text
-            
-            data.append({
-                'title': f'<a href="{job.url}" target="_blank" class="text-decoration-none">{job.title}</a>',
-                'department': job.department or '',
-                'location': job.location or '',
-                'employment_type': job.employment_type or '',
-                'salary': salary_display,
-                'closing_date': job.closing_date.strftime('%b %d, %Y') if job.closing_date else '',
-                'scraped_at': job.scraped_at.astimezone(pytz.timezone('America/Phoenix')).strftime('%b %d, %Y %I:%M %p MST') if job.scraped_at else ''
-            })
-        
-        return jsonify({
+        data = [{
+            'title': row.title_html or '',
+            'department': row.department or '',
+            'location': row.location or '',
+            'employment_type': row.employment_type or '',
+            'salary': row.salary_display or '',
+            'closing_date': row.closing_date_display or '',
+            'scraped_at': row.scraped_at_display or ''
+        } for row in rows]
+
+        return json_response({
             'draw': draw,
             'recordsTotal': total_records,
             'recordsFiltered': filtered_records,
             'data': data
         })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error in API jobs endpoint: {str(e)}")
         return jsonify({'error': 'Error loading jobs'}), 500
 
-@app.route('/scrape')
+@bp.route('/api/jobs/<int:job_id>')
+def api_job_detail(job_id):
+    """API endpoint returning one job including its long text fields"""
+    job = (models.Job.query
+           .options(undefer(models.Job.category), joinedload(models.Job.details))
+           .filter_by(id=job_id)
+           .first())
+    if job is None:
+        return json_response({'error': 'Job not found'}, 404)
+    return json_response(job.to_detail_dict())
+
+@bp.route('/api/suggest')
+def api_suggest():
+    """Type-ahead suggestions for the search box, served from memory"""
+    try:
+        from suggest import current_suggest_index, DEFAULT_LIMIT, MAX_LIMIT
+        query = request.args.get('q', default='')
+        limit = min(max(request.args.get('limit', type=int, default=DEFAULT_LIMIT), 1), MAX_LIMIT)
+        response = json_response({'query': query, 'suggestions': current_suggest_index().suggest(query, limit)})
+        # Suggestions only change with a scrape, so let the browser reuse them briefly
+        response.headers['Cache-Control'] = 'public, max-age=60'
+        return response
+    except Exception as e:
+        logger.error(f"Error in suggest endpoint: {str(e)}")
+        return jsonify({'error': 'Error loading suggestions'}), 500
+
+@bp.route('/api/stats')
+def api_stats():
+    """Salary distribution grouped by department, grade, location or employment type"""
+    try:
+        from salary_stats import current_salary_stats, GROUP_COLUMNS, DEFAULT_BUCKETS, MAX_BUCKETS
+        group_by = request.args.get('group_by', default='department')
+        if group_by not in GROUP_COLUMNS:
+            return jsonify({'error': f"group_by must be one of: {', '.join(GROUP_COLUMNS)}"}), 400
+        buckets = min(max(request.args.get('buckets', type=int, default=DEFAULT_BUCKETS), 1), MAX_BUCKETS)
+        response = json_response(current_salary_stats().get(group_by, buckets))
+        response.headers['Cache-Control'] = 'public, max-age=60'
+        return response
+    except Exception as e:
+        logger.error(f"Error in stats endpoint: {str(e)}")
+        return jsonify({'error': 'Error loading salary stats'}), 500
+
+@bp.route('/api/events')
+def api_events():
+    """Server-Sent Events stream announcing completed scrapes"""
+    from events import bus, format_sse, stream_slots, BUSY_RETRY_MS, HEARTBEAT_INTERVAL, RETRY_MS, STREAM_SECONDS
+
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    if last_event_id is None:
+        last_event_id = request.args.get('since', type=int)
+
+    def stream():
+        if not stream_slots.acquire(blocking=False):
+            # Every stream thread is busy; come back later instead of taking a request thread
+            yield f"retry: {BUSY_RETRY_MS}\n\n"
+            return
+        try:
+            after_id = last_event_id if last_event_id is not None else bus.current_version()
+            yield f"retry: {RETRY_MS}\n"
+            yield format_sse({'version': bus.current_version()}, event='hello', event_id=after_id)
+
+            deadline = time.monotonic() + STREAM_SECONDS
+            while True:
+                for event in bus.events_since(after_id):
+                    after_id = event.id
+                    yield format_sse(event.to_dict(), event='scrape', event_id=event.id)
+
+                # Don't hold a pooled connection while the stream sits idle
+                db.session.remove()
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                if not bus.wait(after_id, timeout=min(HEARTBEAT_INTERVAL, remaining)):
+                    yield ": keep-alive\n\n"
+        finally:
+            stream_slots.release()
+
+    response = Response(stream_with_context(stream()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def saved_search_text(payload, key):
+    """Stripped text for a saved-search column, or None; raises ValueError when it won't fit the column"""
+    value = payload.get(key)
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{key} must be a string")
+    value = value.strip()
+    limit = models.SavedSearch.__table__.c[key].type.length
+    if len(value) > limit:
+        raise ValueError(f"{key} must be at most {limit} characters")
+    return value or None
+
+@bp.route('/api/saved-searches', methods=['POST'])
+def create_saved_search():
+    """Save a search whose new matches are queued for delivery after each scrape"""
+    try:
+        payload = request.get_json(silent=True) or {}
+
+        def as_float(key):
+            value = payload.get(key)
+            if value in (None, ''):
+                return None
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                raise ValueError('Salary bounds must be numbers') from None
+
+        email = saved_search_text(payload, 'email')
+        if email is not None:
+            from email_validator import validate_email, EmailNotValidError
+            try:
+                email = validate_email(email, check_deliverability=False).normalized
+            except EmailNotValidError:
+                raise ValueError('email must be a valid address') from None
+
+        saved_search = models.SavedSearch(
+            name=saved_search_text(payload, 'name'),
+            email=email,
+            keyword=saved_search_text(payload, 'keyword'),
+            department=saved_search_text(payload, 'department'),
+            location=saved_search_text(payload, 'location'),
+            salary_min=as_float('salary_min'),
+            salary_max=as_float('salary_max')
+        )
+        if not saved_search.has_criteria():
+            return jsonify({'error': 'A saved search needs at least one filter'}), 400
+
+        token = saved_search.issue_token()
+        db.session.add(saved_search)
+        db.session.commit()
+        # The token is shown once; only its hash is stored
+        return jsonify(dict(saved_search.to_dict(), token=token)), 201
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error creating saved search: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Error saving search'}), 500
+
+@bp.route('/api/saved-searches/<int:search_id>', methods=['DELETE'])
+def delete_saved_search(search_id):
+    """Delete a saved search and its pending alerts; requires the token returned when it was created"""
+    saved_search = db.session.get(models.SavedSearch, search_id)
+    # Taken from a header or the JSON body only, never the query string, which ends up in access logs
+    body = request.get_json(silent=True)
+    token = request.headers.get('X-Search-Token') or (body.get('token') if isinstance(body, dict) else None)
+    if not isinstance(token, str):
+        token = None
+    # A wrong token looks the same as a missing search, so ids can't be probed
+    if saved_search is None or not saved_search.token_matches(token):
+        return jsonify({'error': 'Saved search not found'}), 404
+
+    models.AlertOutbox.query.filter_by(saved_search_id=search_id).delete()
+    db.session.delete(saved_search)
+    db.session.commit()
+    return jsonify({'success': True})
+
+def require_admin():
+    """Abort unless the request carries ADMIN_TOKEN; admin routes don't exist without one"""
+    token = os.environ.get("ADMIN_TOKEN")
+    if not token:
+        abort(404)
+    supplied = request.headers.get('X-Admin-Token') or request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        abort(403)
+
+@bp.route('/admin/profiles')
+def admin_profiles():
+    """List saved scrape and slow-request profiles, newest first"""
+    require_admin()
+    import profiling
+    return jsonify({'profiles': profiling.list_profiles()})
+
+@bp.route('/admin/profiles/<name>')
+def admin_profile_download(name):
+    """Download one profile (.pstats for pstats/snakeviz, .collapsed for flamegraph tools)"""
+    require_admin()
+    import profiling
+    if name not in {entry['name'] for entry in profiling.list_profiles()}:
+        abort(404)
+    return send_from_directory(os.path.abspath(profiling.PROFILE_DIR), name, as_attachment=True)
+
+@bp.route('/admin/profiles/next-scrape', methods=['POST'])
+def admin_profile_next_scrape():
+    """Profile the next scrape, whichever process runs it"""
+    require_admin()
+    import profiling
+    profiling.request_next_scrape_profile()
+    return jsonify({'success': True})
+
+@bp.route('/scrape')
 def manual_scrape():
     """Manual trigger for scraping (for testing)"""
     try:
@@ -158,7 +562,7 @@ def manual_scrape():
         logger.error(f"Error in manual scrape: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/scrape-selenium')
+@bp.route('/scrape-selenium')
 def manual_scrape_selenium():
     """Manual trigger for Selenium scraping (for testing bot detection)"""
     try:
@@ -169,7 +573,7 @@ def manual_scrape_selenium():
         logger.error(f"Error in Selenium scrape: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/scrape-playwright')
+@bp.route('/scrape-playwright')
 def manual_scrape_playwright():
     """Manual trigger for Playwright scraping (best for bot detection)"""
     try:
@@ -181,6 +585,9 @@ def manual_scrape_playwright():
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
+    app = get_app()
+    init_db(app)
+
     # Start the scheduler
     from scheduler import start_scheduler
     start_scheduler()
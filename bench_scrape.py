@@ -0,0 +1,346 @@
+"""End-to-end scrape benchmark against a local azstatejobs stand-in.
+
+Starts an HTTP server in a child process that serves a homepage, a search
+page with --jobs rows and one detail page per job, optionally with bot
+challenge pages, 503 responses and injected latency. Pages found under --recorded (laid
+out as index.html, jobs/search.html, jobs/<id>.html) are served in place of
+the synthetic ones. Each selected backend scrapes the stand-in into a fresh
+SQLite database and the results are written to --output-dir as JSON. With
+--read-probe, a thread keeps requesting /api/jobs during each scrape so
+read latency under write load can be compared with idle latency.
+
+Usage: python bench_scrape.py [--jobs 500] [--latency-ms 0] [--challenge-rate 0] [--error-rate 0]
+                              [--backends requests,playwright,selenium] [--runs 1]
+"""
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEPARTMENTS = ["Department of Transportation", "Department of Economic Security", "Department of Child Safety",
+               "Department of Health Services", "Department of Corrections", "Department of Revenue"]
+LOCATIONS = ["Phoenix", "Tucson", "Flagstaff", "Yuma", "Kingman", "Florence", "Prescott"]
+TITLES = ["Administrative Assistant", "Correctional Officer", "Program Specialist", "IT Analyst",
+          "Registered Nurse", "Highway Maintenance Technician", "Accountant", "Case Manager"]
+CHALLENGE_PAGE = b"<html><body><noscript>JavaScript is disabled</noscript>Please verify that you're not a robot.</body></html>"
+
+
+def listing_page(jobs):
+    """Synthetic search page with the same table layout as azstatejobs.gov"""
+    rng = random.Random(0)
+    closing = datetime(2030, 1, 1)
+    rows = []
+    for i in range(jobs):
+        rows.append(
+            f"<tr><td><a href=\"/jobs/{i}\">{rng.choice(TITLES)} {i}</a></td>"
+            f"<td>REQ{i:06d}</td><td>Category {i % 12}</td><td>{rng.choice(DEPARTMENTS)}</td>"
+            f"<td>{'Full-time' if i % 5 else 'Part-time'}</td><td>{rng.choice(LOCATIONS)}</td>"
+            f"<td>{(closing + timedelta(days=i % 60)).strftime('%b %d %Y')}</td><td>No</td></tr>"
+        )
+    return ("<html><body><h1>Search Jobs</h1><table><thead><tr><th>Title</th><th>ID</th><th>Category</th>"
+            "<th>Department</th><th>Type</th><th>Location</th><th>Closing</th><th>Postsecondary</th></tr></thead>"
+            f"<tbody>{''.join(rows)}</tbody></table></body></html>").encode()
+
+
+def detail_page(job_id):
+    """Synthetic detail page that every extractor in scraper.py can parse"""
+    low = 35000 + (job_id % 40) * 1000
+    filler = " ".join(["Performs duties as assigned."] * 40)
+    return (f"<html><body><h1>Job {job_id}</h1><h3>Posting Details:</h3>"
+            f"<p>Salary: ${low:,}.00 - ${low + 15000:,}.00</p><p>Grade: {job_id % 25}</p>"
+            f"<h3>Job Summary:</h3><p>Summary for job {job_id}. {filler}</p>"
+            f"<h3>Job Duties:</h3><p>{filler}</p>"
+            f"<h3>Knowledge, Skills and Abilities:</h3><p>{filler}</p></body></html>").encode()
+
+
+def serve(config, port_queue, requests_served, bytes_served):
+    """Child process: run the stand-in site until terminated"""
+    listing = listing_page(config['jobs'])
+    rng = random.Random(1)
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def recorded(self, path):
+            if not config['recorded']:
+                return None
+            name = 'index' if path in ('', '/') else path.strip('/')
+            candidate = os.path.join(config['recorded'], f"{name}.html")
+            if os.path.isfile(candidate):
+                with open(candidate, 'rb') as f:
+                    return f.read()
+            return None
+
+        def do_GET(self):
+            if config['latency_ms']:
+                time.sleep(config['latency_ms'] / 1000)
+
+            path = self.path.split('?', 1)[0]
+            body = self.recorded(path)
+            status = 200
+            if body is None:
+                if path in ('', '/'):
+                    body = b"<html><body><a href=\"/jobs/search\">Search jobs</a></body></html>"
+                elif path in ('/jobs', '/jobs/search'):
+                    body = CHALLENGE_PAGE if rng.random() < config['challenge_rate'] else listing
+                elif path.startswith('/jobs/') and path[len('/jobs/'):].isdigit():
+                    body = detail_page(int(path[len('/jobs/'):]))
+                else:
+                    status, body = 404, b"Not found"
+
+            if status == 200 and path.startswith('/jobs/') and rng.random() < config['error_rate']:
+                status, body = 503, b"Service unavailable"
+
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+            with requests_served.get_lock():
+                requests_served.value += 1
+            with bytes_served.get_lock():
+                bytes_served.value += len(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+class WriteTimer:
+    """Accumulates time spent in INSERT/UPDATE/DELETE statements"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.seconds = 0.0
+        self.statements = 0
+        event.listen(engine, 'before_cursor_execute', self.before)
+        event.listen(engine, 'after_cursor_execute', self.after)
+
+    def before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info['bench_started'] = time.perf_counter()
+
+    def after(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            self.seconds += time.perf_counter() - conn.info.pop('bench_started', time.perf_counter())
+            self.statements += 1
+
+    def reset(self):
+        self.seconds = 0.0
+        self.statements = 0
+
+
+class ReadProbe:
+    """Requests the first /api/jobs page in a loop and records latencies"""
+
+    PATH = "/api/jobs?draw=1&start=0&length=25"
+
+    def __init__(self, app):
+        self.client = app.test_client()
+        self.latencies = []
+        self.errors = 0
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def sample(self, count):
+        for _ in range(count):
+            self.request()
+
+    def request(self):
+        started = time.perf_counter()
+        try:
+            status = self.client.get(self.PATH).status_code
+        except Exception:
+            status = None
+        self.latencies.append((time.perf_counter() - started) * 1000)
+        if status != 200:
+            self.errors += 1
+
+    def start(self):
+        self.latencies, self.errors = [], 0
+        self.stopping.clear()
+
+        def loop():
+            while not self.stopping.is_set():
+                self.request()
+                time.sleep(0.02)
+
+        self.thread = threading.Thread(target=loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+
+    def summary(self):
+        ordered = sorted(self.latencies)
+        if not ordered:
+            return {'requests': 0}
+        return {
+            'requests': len(ordered),
+            'errors': self.errors,
+            'p50_ms': round(statistics.median(ordered), 2),
+            'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+            'max_ms': round(ordered[-1], 2)
+        }
+
+
+def make_scrape(backend, base_url, delay):
+    """Return a zero-argument callable running one scrape with the given backend"""
+    if backend == 'requests':
+        from scraper import AZStateJobsScraper, scrape_jobs
+        return lambda: scrape_jobs(AZStateJobsScraper(base_url=base_url, request_delay=delay))
+    if backend == 'playwright':
+        from playwright_scraper import PlaywrightAZStateJobsScraper, scrape_jobs_playwright
+        return lambda: scrape_jobs_playwright(PlaywrightAZStateJobsScraper(base_url=base_url))
+    if backend == 'selenium':
+        from selenium_scraper import SeleniumAZStateJobsScraper, scrape_jobs_selenium
+        return lambda: scrape_jobs_selenium(SeleniumAZStateJobsScraper(base_url=base_url))
+    raise ValueError(f"Unknown backend: {backend}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def previous_result(output_dir, backend):
+    """Most recent earlier result for the backend, for a quick comparison"""
+    if not os.path.isdir(output_dir):
+        return None
+    names = sorted(name for name in os.listdir(output_dir) if name.startswith(f"scrape-{backend}-") and name.endswith('.json'))
+    if not names:
+        return None
+    with open(os.path.join(output_dir, names[-1])) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=500, help="Rows on the search page")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Delay added to every response")
+    parser.add_argument('--challenge-rate', type=float, default=0, help="Fraction of search requests answered with a bot challenge")
+    parser.add_argument('--error-rate', type=float, default=0, help="Fraction of detail requests answered with a 503")
+    parser.add_argument('--recorded', default=None, help="Directory of recorded pages served instead of synthetic ones")
+    parser.add_argument('--backends', default='requests', help="Comma-separated: requests, playwright, selenium")
+    parser.add_argument('--runs', type=int, default=1, help="Scrapes per backend; later runs only refresh existing jobs")
+    parser.add_argument('--delay', type=float, default=0, help="Scraper request_delay in seconds")
+    parser.add_argument('--read-probe', action='store_true', help="Measure /api/jobs latency while scraping")
+    parser.add_argument('--output-dir', default='bench_results')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='azjobs-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['HTML_ARCHIVE_DIR'] = os.path.join(workdir, 'html_archive')
+    os.environ['SCRAPE_SESSION_DIR'] = os.path.join(workdir, 'sessions')
+
+    config = {
+        'jobs': args.jobs,
+        'latency_ms': args.latency_ms,
+        'challenge_rate': args.challenge_rate,
+        'error_rate': args.error_rate,
+        'recorded': args.recorded
+    }
+    port_queue = multiprocessing.Queue()
+    requests_served = multiprocessing.Value('q', 0)
+    bytes_served = multiprocessing.Value('q', 0)
+    server = multiprocessing.Process(target=serve, args=(config, port_queue, requests_served, bytes_served), daemon=True)
+    server.start()
+    base_url = f"http://127.0.0.1:{port_queue.get(timeout=10)}"
+
+    import logging
+    from app import get_app
+    from database import db
+    app = get_app()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    try:
+        with app.app_context():
+            timer = WriteTimer(db.engine)
+
+        for backend in args.backends.split(','):
+            backend = backend.strip()
+            # Each backend is named after the package it needs
+            if backend not in ('requests', 'playwright', 'selenium') or importlib.util.find_spec(backend) is None:
+                print(f"Skipping {backend}: not installed")
+                continue
+
+            with app.app_context():
+                db.drop_all()
+                db.create_all()
+            scrape = make_scrape(backend, base_url, args.delay)
+
+            runs = []
+            for run in range(args.runs):
+                timer.reset()
+                requests_served.value = 0
+                bytes_served.value = 0
+                probe = ReadProbe(app) if args.read_probe else None
+                if probe:
+                    probe.sample(50)
+                    idle = probe.summary()
+                    probe.start()
+                started = time.perf_counter()
+                new_jobs = scrape()
+                elapsed = time.perf_counter() - started
+                if probe:
+                    probe.stop()
+                runs.append({
+                    'run': run + 1,
+                    'seconds': round(elapsed, 3),
+                    'new_jobs': new_jobs,
+                    'jobs_per_sec': round(args.jobs / elapsed, 2) if elapsed else None,
+                    'requests': requests_served.value,
+                    'bytes': bytes_served.value,
+                    'db_write_seconds': round(timer.seconds, 3),
+                    'db_write_statements': timer.statements,
+                    'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+                })
+                if probe:
+                    runs[-1]['reads_idle'] = idle
+                    runs[-1]['reads_during_scrape'] = probe.summary()
+                print(f"{backend} run {run + 1}: {json.dumps(runs[-1])}")
+
+            result = {
+                'benchmark': 'scrape',
+                'backend': backend,
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'commit': git_commit(),
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'config': config,
+                'runs': runs
+            }
+
+            previous = previous_result(args.output_dir, backend)
+            if previous and previous.get('runs') and runs:
+                before = previous['runs'][0]['jobs_per_sec']
+                after = runs[0]['jobs_per_sec']
+                print(f"{backend}: {after} jobs/sec vs {before} in {previous.get('commit') or 'previous run'}")
+
+            path = os.path.join(args.output_dir, f"scrape-{backend}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json")
+            with open(path, 'w') as f:
+                json.dump(result, f, indent=2)
+            print(f"Wrote {path}")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
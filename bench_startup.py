@@ -0,0 +1,114 @@
+"""Import-time budget for the app, scraper and CLI entry points.
+
+Imports each entry module in a fresh interpreter with -X importtime, takes
+the median cumulative time over --repeat runs and compares it with
+BUDGET_MS. Each import must also be free of side effects: no background
+threads, no Flask app built outside the WSGI entry point, and no browser
+automation packages loaded. Exits non-zero when any module is over budget or has side effects.
+
+Usage: python bench_startup.py [--repeat 5] [--output-dir bench_results]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+# Median cumulative import time allowed per module, in milliseconds
+BUDGET_MS = {
+    'database': 900,
+    'models': 1000,
+    'app': 1100,
+    'main': 1200,
+    'scraper': 1300,
+    'scheduler': 1400,
+    'selenium_scraper': 1300,
+    'playwright_scraper': 1300,
+    'reparse': 1400,
+    'crawl_queue': 1400,
+    'crawl_runner': 1400,
+}
+
+# WSGI entry points expose a ready app object for gunicorn
+BUILDS_APP = {'main'}
+
+# Heavy packages that must only load when a browser scrape actually runs
+LAZY_PACKAGES = ('selenium', 'webdriver_manager', 'playwright')
+
+PROBE = """
+import json, sys, threading
+import {module}
+app_module = sys.modules.get('app')
+print(json.dumps({{
+    'threads': threading.active_count(),
+    'app_built': bool(app_module and getattr(app_module, '_app', None) is not None),
+    'lazy_loaded': sorted(name for name in {lazy!r} if name in sys.modules),
+}}))
+"""
+
+
+def measure(module, repo_dir):
+    """Import a module once in a fresh interpreter; returns (cumulative_ms, side_effects)"""
+    env = dict(os.environ, PYTHONPATH=repo_dir)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE.format(module=module, lazy=LAZY_PACKAGES)],
+        capture_output=True, text=True, cwd=repo_dir, env=env, check=True
+    )
+    cumulative_us = None
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) == 3 and parts[2] == module:
+            cumulative_us = int(parts[1])
+    return cumulative_us / 1000, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output-dir', default='bench_results')
+    args = parser.parse_args()
+
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    failed = False
+    for module, budget in BUDGET_MS.items():
+        samples = []
+        effects = None
+        for _ in range(args.repeat):
+            elapsed, effects = measure(module, repo_dir)
+            samples.append(elapsed)
+        median = statistics.median(samples)
+
+        problems = []
+        if median > budget:
+            problems.append(f"over budget by {median - budget:.0f}ms")
+        if effects['threads'] > 1:
+            problems.append(f"started {effects['threads'] - 1} thread(s)")
+        if effects['app_built'] and module not in BUILDS_APP:
+            problems.append("built the Flask app")
+        if effects['lazy_loaded']:
+            problems.append(f"imported {', '.join(effects['lazy_loaded'])}")
+        failed = failed or bool(problems)
+
+        results[module] = {'median_ms': round(median, 1), 'budget_ms': budget, 'problems': problems}
+        status = 'FAIL ' + '; '.join(problems) if problems else 'ok'
+        print(f"{module:20} {median:8.1f}ms / {budget}ms  {status}")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"startup-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json")
+    with open(path, 'w') as f:
+        json.dump({
+            'benchmark': 'startup',
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': sys.version.split()[0],
+            'repeat': args.repeat,
+            'modules': results
+        }, f, indent=2)
+    print(f"Wrote {path}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
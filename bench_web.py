@@ -0,0 +1,254 @@
+"""Web-tier load benchmark against a seeded synthetic jobs table.
+
+For each --rows size the jobs table is rebuilt with skewed department and
+location distributions, then --concurrency threads replay a weighted mix of
+index and /api/jobs requests (filters, searches, deep pages and the facet
+queries behind the index page). Requests go through the Flask test client,
+which also lets the benchmark count SQL statements per route, or to a
+running server given with --url. Results are written to --output-dir as JSON.
+
+The target database is wiped. SQLite runs use a temporary file; pass
+--database-url postgresql://... for a scratch local Postgres database.
+
+Usage: python bench_web.py [--rows 10000,100000,1000000] [--concurrency 8] [--requests 400]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+DEPARTMENTS = [f"Department {name}" for name in (
+    "of Corrections", "of Economic Security", "of Transportation", "of Child Safety", "of Health Services",
+    "of Revenue", "of Environmental Quality", "of Public Safety", "of Administration", "of Education",
+    "of Veterans Services", "of Water Resources", "of Agriculture", "of Insurance", "of Housing",
+    "of Gaming", "of Juvenile Corrections", "of Emergency Management", "of Real Estate", "of Financial Institutions")]
+LOCATIONS = ["Phoenix", "Tucson", "Florence", "Mesa", "Flagstaff", "Yuma", "Kingman", "Douglas", "Prescott",
+             "Safford", "Globe", "Holbrook", "Show Low", "Winslow", "Nogales", "Casa Grande", "Buckeye",
+             "Lake Havasu City", "Sierra Vista", "Payson", "Bisbee", "Goodyear", "Chandler", "Tempe", "Page"]
+TITLE_WORDS = ["Correctional", "Officer", "Administrative", "Assistant", "Program", "Specialist", "Analyst",
+               "Manager", "Registered", "Nurse", "Highway", "Technician", "Accountant", "Case", "Supervisor",
+               "Senior", "IT", "Engineer", "Investigator", "Clerk", "Coordinator", "Director", "Auditor"]
+EMPLOYMENT_TYPES = ["Full-time", "Part-time", "Temporary", "Seasonal"]
+
+
+def zipf_weights(n, s=1.1):
+    """Skewed weights: the first entries dominate like the real departments and locations do"""
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def synthetic_rows(count, seed=0):
+    """Yield job rows for bulk insertion"""
+    from gazetteer import geocode_fields
+    from models import display_fields
+    rng = random.Random(seed)
+    department_weights = zipf_weights(len(DEPARTMENTS))
+    location_weights = zipf_weights(len(LOCATIONS))
+    now = datetime.now()
+    for i in range(count):
+        salary_min = rng.choice([None, None] + [30000 + 1000 * k for k in range(60)])
+        row = {
+            'requisition_id': f"BENCH{i:08d}",
+            'title': " ".join(rng.sample(TITLE_WORDS, rng.randint(2, 4))),
+            'department': rng.choices(DEPARTMENTS, department_weights)[0],
+            'location': rng.choices(LOCATIONS, location_weights)[0],
+            'employment_type': rng.choice(EMPLOYMENT_TYPES),
+            'category': f"Category {i % 30}",
+            'closing_date': now + timedelta(days=rng.randint(-5, 60)),
+            'postsecondary_required': rng.choice(["Yes", "No"]),
+            'url': f"https://www.azstatejobs.gov/jobs/{i}",
+            'salary_text': f"${salary_min} - ${salary_min + 15000}" if salary_min else None,
+            'salary_min': salary_min,
+            'salary_max': salary_min + 15000 if salary_min else None,
+            'grade': str(rng.randint(10, 30)),
+            'scraped_at': now - timedelta(minutes=rng.randint(0, 60 * 24 * 25)),
+            'updated_at': now
+        }
+        row.update(display_fields(SimpleNamespace(**row)))
+        row.update(geocode_fields(row['location']))
+        yield row
+
+
+def seed(app, db, rows, batch_size=10000):
+    """Rebuild the schema and bulk-load synthetic jobs"""
+    from sqlalchemy import insert
+    from models import Job
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        batch = []
+        for row in synthetic_rows(rows):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                db.session.execute(insert(Job), batch)
+                db.session.commit()
+                batch = []
+        if batch:
+            db.session.execute(insert(Job), batch)
+            db.session.commit()
+
+        # A new data version, so per-version caches and read models rebuild
+        from events import bus
+        bus.publish('bench', new_count=rows)
+
+
+def request_mix(rows, rng):
+    """Return (route_name, path) for one request drawn from the weighted mix"""
+    page = 25
+    choices = [
+        (10, 'index', lambda: "/"),
+        (10, 'index_filtered', lambda: f"/?department={rng.choice(DEPARTMENTS).replace(' ', '+')}"
+                                       f"&salary_min={rng.choice([40000, 50000, 60000])}"),
+        (5, 'index_search', lambda: f"/?search={rng.choice(TITLE_WORDS)}&location={rng.choice(LOCATIONS[:5])}"),
+        (35, 'api_first_page', lambda: f"/api/jobs?draw=1&start=0&length={page}"),
+        (25, 'api_search', lambda: f"/api/jobs?draw=1&start=0&length={page}&search%5Bvalue%5D={rng.choice(TITLE_WORDS + LOCATIONS)}"),
+        (15, 'api_deep_page', lambda: f"/api/jobs?draw=1&start={rng.randrange(max(rows - page, 1))}&length={page}")
+    ]
+    weights = [weight for weight, _, _ in choices]
+    _, name, path = rng.choices(choices, weights)[0]
+    return name, path()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class SQLCounter:
+    """Counts statements executed on behalf of the current thread's request"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self.count)
+
+    def count(self, *args):
+        self.local.statements = getattr(self.local, 'statements', 0) + 1
+
+    def take(self):
+        statements = getattr(self.local, 'statements', 0)
+        self.local.statements = 0
+        return statements
+
+
+def run_load(app, counter, rows, total_requests, concurrency, base_url=None):
+    """Replay the request mix and return per-route samples"""
+    latencies = defaultdict(list)
+    statements = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+
+    def worker(worker_id, count):
+        rng = random.Random(worker_id)
+        client = app.test_client() if base_url is None else None
+        for _ in range(count):
+            name, path = request_mix(rows, rng)
+            if counter:
+                counter.take()
+            started = time.perf_counter()
+            try:
+                if client is not None:
+                    status = client.get(path).status_code
+                else:
+                    with urllib.request.urlopen(base_url + path, timeout=120) as response:
+                        response.read()
+                        status = response.status
+            except Exception:
+                status = None
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies[name].append(elapsed_ms)
+                if counter:
+                    statements[name].append(counter.take())
+                if status != 200:
+                    errors[name] += 1
+
+    per_worker = [total_requests // concurrency + (1 if i < total_requests % concurrency else 0) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker, i, count) for i, count in enumerate(per_worker)]:
+            future.result()
+    wall = time.perf_counter() - started
+
+    routes = {}
+    for name, samples in sorted(latencies.items()):
+        routes[name] = {
+            'requests': len(samples),
+            'errors': errors[name],
+            'p50_ms': round(percentile(samples, 50), 2),
+            'p95_ms': round(percentile(samples, 95), 2),
+            'p99_ms': round(percentile(samples, 99), 2),
+            'mean_ms': round(statistics.fmean(samples), 2),
+            'sql_per_request': round(statistics.fmean(statements[name]), 2) if statements[name] else None
+        }
+    return {'wall_seconds': round(wall, 3), 'requests_per_sec': round(total_requests / wall, 2), 'routes': routes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', default='10000,100000,1000000', help="Comma-separated table sizes")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400, help="Requests per table size")
+    parser.add_argument('--database-url', default=None, help="Scratch database to wipe and seed (default: temporary SQLite file)")
+    parser.add_argument('--url', default=None, help="Send requests to a running server (e.g. gunicorn) instead of the test client")
+    parser.add_argument('--output-dir', default='bench_results')
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='azjobs-bench-'), 'bench.db')}"
+
+    import logging
+    from app import get_app
+    from database import db
+    app = get_app()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        counter = SQLCounter(db.engine) if args.url is None else None
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for rows in [int(size) for size in args.rows.split(',')]:
+        print(f"Seeding {rows} jobs into {dialect}...")
+        started = time.perf_counter()
+        seed(app, db, rows)
+        seed_seconds = time.perf_counter() - started
+
+        load = run_load(app, counter, rows, args.requests, args.concurrency, base_url=args.url)
+        result = {
+            'benchmark': 'web',
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': sys.version.split()[0],
+            'dialect': dialect,
+            'rows': rows,
+            'seed_seconds': round(seed_seconds, 2),
+            'concurrency': args.concurrency,
+            'target': args.url or 'test_client',
+            **load
+        }
+        for name, stats in load['routes'].items():
+            print(f"  {name:15} p50={stats['p50_ms']:9.1f}ms p95={stats['p95_ms']:9.1f}ms "
+                  f"p99={stats['p99_ms']:9.1f}ms sql={stats['sql_per_request']}")
+
+        path = os.path.join(args.output_dir, f"web-{dialect}-{rows}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json")
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""Durable crawl queue: listing and detail pages as leased tasks in the database.
+
+A coordinator starts (or resumes) a crawl with a single listing task. Workers
+on any number of nodes claim tasks under a time-limited lease, fetch and
+store them, and commit each batch together with the task status, so a crash
+loses at most one uncommitted batch; expired leases are picked up again by
+the next worker. Fetched jobs wait in their tasks: when no open tasks remain
+the coordinator finalizes the crawl by writing them through
+scraper.store_scrape(), like any other scrape, which also cleans up, sends
+alerts and publishes the scrape event.
+
+Usage: python crawl_queue.py run                 # start or resume, work and finalize
+       python crawl_queue.py work [--wait]       # extra worker, e.g. on another node
+       python crawl_queue.py finalize [--force]
+       python crawl_queue.py status
+"""
+import argparse
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from app import get_app, init_db
+from database import db
+from models import DEFAULT_SOURCE, Crawl, CrawlTask, Job, phoenix_naive
+from html_archive import archive_page
+from scraper import AZStateJobsScraper, store_scrape
+from sources import get_source
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = int(os.environ.get("CRAWL_LEASE_SECONDS", "300"))
+MAX_ATTEMPTS = int(os.environ.get("CRAWL_MAX_ATTEMPTS", "3"))
+BATCH_SIZE = int(os.environ.get("CRAWL_BATCH_SIZE", "8"))
+# Crawls left running longer than this are abandoned instead of resumed
+MAX_AGE_HOURS = int(os.environ.get("CRAWL_MAX_AGE_HOURS", "12"))
+# Days a finished crawl's row is kept for crawl_status(); its tasks go as soon as it ends
+RETENTION_DAYS = int(os.environ.get("CRAWL_RETENTION_DAYS", "30"))
+POLL_SECONDS = 2.0
+
+OPEN_STATUSES = ('pending', 'leased')
+FINISHED_STATUSES = ('done', 'failed')
+# Detail tasks out of attempts keep their listing fields and are stored without details
+FETCH_FAILED = "fetch failed"
+
+
+def running_crawl():
+    """Return the newest crawl still being worked, if any"""
+    return Crawl.query.filter(Crawl.status == 'running').order_by(Crawl.id.desc()).first()
+
+
+def start_crawl(scraper=None, source='requests'):
+    """Resume the running crawl, or create one with its listing task; returns the crawl id"""
+    crawl = running_crawl()
+    if crawl and crawl.started_at and phoenix_naive(crawl.started_at) >= phoenix_naive() - timedelta(hours=MAX_AGE_HOURS):
+        logger.info(f"Resuming crawl {crawl.id}")
+        return crawl.id
+    if crawl:
+        logger.warning(f"Abandoning crawl {crawl.id} started at {crawl.started_at}")
+        crawl.status = 'failed'
+        crawl.finished_at = phoenix_naive()
+
+    scraper = scraper or AZStateJobsScraper()
+    crawl = Crawl(source=source, started_at=phoenix_naive())
+    db.session.add(crawl)
+    db.session.flush()
+    db.session.add(CrawlTask(crawl_id=crawl.id, kind='listing', url=scraper.search_url))
+    db.session.commit()
+    logger.info(f"Started crawl {crawl.id}")
+    return crawl.id
+
+
+def claim_tasks(crawl_id, limit=BATCH_SIZE, lease_seconds=LEASE_SECONDS):
+    """Lease up to `limit` open tasks for this worker.
+
+    Postgres locks the candidate rows with FOR UPDATE SKIP LOCKED so
+    concurrent workers never wait on or double-claim each other's rows.
+    SQLite has no row locks, but it serializes writers and the claim is a
+    single UPDATE, so the lease token alone identifies this worker's rows.
+    """
+    now = phoenix_naive()
+    token = uuid.uuid4().hex
+    expired = and_(CrawlTask.status == 'leased', CrawlTask.lease_expires_at < now)
+
+    # Tasks whose worker died on every attempt are given up on
+    db.session.execute(
+        update(CrawlTask)
+        .where(CrawlTask.crawl_id == crawl_id, expired, CrawlTask.attempts >= MAX_ATTEMPTS)
+        .values(status='failed', last_error='lease expired', lease_token=None, updated_at=now)
+    )
+
+    claimable = (select(CrawlTask.id)
+                 .where(CrawlTask.crawl_id == crawl_id, or_(CrawlTask.status == 'pending', expired))
+                 .order_by(CrawlTask.id)
+                 .limit(limit))
+    if db.engine.dialect.name == 'postgresql':
+        claimable = claimable.with_for_update(skip_locked=True)
+
+    db.session.execute(
+        update(CrawlTask)
+        .where(CrawlTask.id.in_(claimable))
+        .values(status='leased', lease_token=token, lease_expires_at=now + timedelta(seconds=lease_seconds),
+                attempts=CrawlTask.attempts + 1, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return CrawlTask.query.filter_by(lease_token=token).order_by(CrawlTask.id).all()
+
+
+def _settle(task, status, error=None, payload=None):
+    """Record a claimed task's outcome; returns False if its lease was lost to another worker"""
+    values = {'payload': payload} if payload is not None else {}
+    result = db.session.execute(
+        update(CrawlTask)
+        .where(CrawlTask.id == task.id, CrawlTask.lease_token == task.lease_token)
+        .values(status=status, last_error=error, lease_token=None, lease_expires_at=None, updated_at=phoenix_naive(),
+                **values)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        logger.warning(f"Lost the lease on task {task.id}; leaving it to its new owner")
+        return False
+    return True
+
+
+def _retry_or_fail(task, error):
+    """Put a task back in the queue, or fail it once it is out of attempts"""
+    return _settle(task, 'pending' if task.attempts < MAX_ATTEMPTS else 'failed', error)
+
+
+def _process_listing(task, scraper):
+    """Fetch the listing page and queue a detail task per new job"""
+    job_listings = scraper.get_job_listings()
+    if not job_listings:
+        _retry_or_fail(task, "listing page returned no jobs")
+        db.session.commit()
+        return
+
+    # Duplicate rows would collide on the (crawl, url) constraint
+    listings = {job['url']: job for job in job_listings}
+    requisition_ids = sorted({job['requisition_id'] for job in job_listings})
+    existing_ids = set()
+    for i in range(0, len(requisition_ids), 500):
+        existing_ids.update(row[0] for row in db.session.query(Job.requisition_id)
+                            .filter(Job.requisition_id.in_(requisition_ids[i:i + 500])))
+
+    if not _settle(task, 'done'):
+        db.session.rollback()
+        return
+
+    now = phoenix_naive()
+    detail_tasks = [
+        {
+            'crawl_id': task.crawl_id,
+            'kind': 'detail',
+            'url': url,
+            'requisition_id': job['requisition_id'],
+            'payload': dump_job(job),
+            'status': 'pending',
+            'attempts': 0,
+            'updated_at': now
+        }
+        for url, job in listings.items() if job['requisition_id'] not in existing_ids
+    ]
+    for i in range(0, len(detail_tasks), 500):
+        db.session.execute(insert(CrawlTask), detail_tasks[i:i + 500])
+
+    crawl = db.session.get(Crawl, task.crawl_id)
+    crawl.requisition_ids = json.dumps(requisition_ids)
+    crawl.updated_count = len(existing_ids)
+    db.session.commit()
+    logger.info(f"Crawl {task.crawl_id}: {len(job_listings)} listings, {len(detail_tasks)} detail pages queued")
+
+
+def dump_job(job_data):
+    return json.dumps(job_data, default=lambda value: value.isoformat())
+
+
+def load_job(payload):
+    job_data = json.loads(payload)
+    if job_data.get('closing_date'):
+        job_data['closing_date'] = datetime.fromisoformat(job_data['closing_date'])
+    return job_data
+
+
+def _process_details(tasks, scraper):
+    """Fetch a batch of detail pages concurrently and keep their parsed fields in the tasks, in one commit"""
+    pages = scraper.fetch_detail_pages([task.url for task in tasks])
+    fetched = 0
+    for task in tasks:
+        content = pages.get(task.url)
+        if content is None and task.attempts < MAX_ATTEMPTS:
+            _retry_or_fail(task, FETCH_FAILED)
+            continue
+        # Out of attempts: keep the listing data without details, as scrape_jobs() does
+        if content is None:
+            _settle(task, 'failed', FETCH_FAILED)
+            continue
+
+        archive_page(task.url, content, 'detail')
+        job_data = load_job(task.payload)
+        job_data.update(scraper.source.parse_detail(content))
+        if _settle(task, 'done', payload=dump_job(job_data)):
+            fetched += 1
+    db.session.commit()
+    return fetched
+
+
+def crawled_listings(crawl):
+    """Listing rows for store_scrape(): the crawled new jobs, and the ids of jobs already stored when it listed"""
+    ready = or_(CrawlTask.status == 'done',
+                and_(CrawlTask.status == 'failed', CrawlTask.last_error == FETCH_FAILED))
+    listings = [load_job(payload) for (payload,) in db.session.query(CrawlTask.payload)
+                .filter(CrawlTask.crawl_id == crawl.id, CrawlTask.kind == 'detail', ready)]
+    queued_ids = {requisition_id for (requisition_id,) in db.session.query(CrawlTask.requisition_id)
+                  .filter(CrawlTask.crawl_id == crawl.id, CrawlTask.kind == 'detail')}
+    # store_scrape() only needs the id of a job it already has
+    listings.extend({'requisition_id': requisition_id} for requisition_id in json.loads(crawl.requisition_ids)
+                    if requisition_id not in queued_ids)
+    return listings
+
+
+def run_worker(crawl_id=None, scraper=None, batch_size=BATCH_SIZE, wait=False):
+    """Claim and process tasks until the crawl has none open; with wait=True, keep polling for new crawls"""
+    with get_app().app_context():
+        scraper = scraper or AZStateJobsScraper()
+        processed = 0
+        while True:
+            current_id = crawl_id
+            if current_id is None:
+                crawl = running_crawl()
+                current_id = crawl.id if crawl else None
+            if current_id is None:
+                if not wait:
+                    break
+                time.sleep(POLL_SECONDS)
+                continue
+
+            tasks = claim_tasks(current_id, limit=batch_size)
+            if tasks:
+                try:
+                    for task in [task for task in tasks if task.kind == 'listing']:
+                        _process_listing(task, scraper)
+                    details = [task for task in tasks if task.kind == 'detail']
+                    if details:
+                        _process_details(details, scraper)
+                except Exception as e:
+                    # Leases run out and the tasks go back to the queue
+                    logger.error(f"Error processing crawl {current_id} tasks: {str(e)}")
+                    db.session.rollback()
+                processed += len(tasks)
+                continue
+
+            open_tasks = CrawlTask.query.filter(CrawlTask.crawl_id == current_id,
+                                                CrawlTask.status.in_(OPEN_STATUSES)).count()
+            if open_tasks:
+                # Other workers hold the rest; wait for them to finish or their leases to expire
+                time.sleep(POLL_SECONDS)
+                continue
+            if crawl_id is not None or not wait:
+                break
+            time.sleep(POLL_SECONDS)
+
+        logger.info(f"Worker finished after processing {processed} tasks")
+        return processed
+
+
+def finalize_crawl(crawl_id, force=False):
+    """Run the end-of-crawl steps once every task is settled; returns new jobs, or None if not finalized"""
+    with get_app().app_context():
+        open_tasks = CrawlTask.query.filter(CrawlTask.crawl_id == crawl_id,
+                                            CrawlTask.status.in_(OPEN_STATUSES)).count()
+        if open_tasks:
+            logger.info(f"Crawl {crawl_id} still has {open_tasks} open tasks")
+            return None
+
+        # Only one coordinator wins the transition to finalizing
+        allowed = ('running', 'finalizing') if force else ('running',)
+        claimed = db.session.execute(
+            update(Crawl).where(Crawl.id == crawl_id, Crawl.status.in_(allowed)).values(status='finalizing')
+        ).rowcount
+        db.session.commit()
+        if claimed != 1:
+            return None
+
+        crawl = db.session.get(Crawl, crawl_id)
+        listing_done = CrawlTask.query.filter_by(crawl_id=crawl_id, kind='listing', status='done').count()
+        if not listing_done or crawl.requisition_ids is None:
+            # Cleaning up against an empty listing would delete every job
+            logger.error(f"Crawl {crawl_id} never fetched its listing page; skipping cleanup")
+            crawl.status = 'failed'
+            crawl.finished_at = phoenix_naive()
+            db.session.commit()
+            prune_crawls()
+            return None
+
+        # The queue crawls the original board only; its jobs go through the configured writer like any scrape
+        jobs_scraped = store_scrape(get_source(DEFAULT_SOURCE), crawled_listings(crawl), event_source=crawl.source)
+
+        crawl = db.session.get(Crawl, crawl_id)
+        crawl.status = 'done'
+        crawl.finished_at = phoenix_naive()
+        crawl.requisition_ids = None
+        db.session.commit()
+        prune_crawls()
+
+        logger.info(f"Crawl {crawl_id} finalized. {jobs_scraped} new jobs added.")
+        return jobs_scraped
+
+
+def prune_crawls(retention_days=RETENTION_DAYS):
+    """Delete the tasks of every crawl that is over, with their job payloads, and crawls older than retention_days"""
+    finished = select(Crawl.id).where(Crawl.status.in_(FINISHED_STATUSES))
+    tasks = db.session.execute(delete(CrawlTask).where(CrawlTask.crawl_id.in_(finished))).rowcount
+    cutoff = phoenix_naive() - timedelta(days=retention_days)
+    crawls = db.session.execute(delete(Crawl).where(Crawl.status.in_(FINISHED_STATUSES),
+                                                   Crawl.finished_at < cutoff)).rowcount
+    db.session.commit()
+    if tasks or crawls:
+        logger.info(f"Crawl prune: {tasks} tasks and {crawls} crawls older than {retention_days} days removed")
+    return tasks, crawls
+
+
+def run_crawl(scraper=None):
+    """Coordinator: start or resume a crawl, work it in this process and finalize it"""
+    with get_app().app_context():
+        crawl_id = start_crawl(scraper)
+    run_worker(crawl_id, scraper)
+    return finalize_crawl(crawl_id) or 0
+
+
+def resume_unfinished_crawl():
+    """Pick up a crawl interrupted by a restart, if there is one"""
+    with get_app().app_context():
+        crawl = running_crawl()
+    if crawl:
+        return run_crawl()
+    return 0
+
+
+def crawl_status(crawl_id=None):
+    """Task counts by kind and status for a crawl (default: the newest)"""
+    with get_app().app_context():
+        crawl = db.session.get(Crawl, crawl_id) if crawl_id else Crawl.query.order_by(Crawl.id.desc()).first()
+        if crawl is None:
+            return None
+        counts = (db.session.query(CrawlTask.kind, CrawlTask.status, func.count())
+                  .filter(CrawlTask.crawl_id == crawl.id)
+                  .group_by(CrawlTask.kind, CrawlTask.status).all())
+        return {
+            'crawl': crawl.id,
+            'status': crawl.status,
+            'started_at': crawl.started_at.isoformat() if crawl.started_at else None,
+            'tasks': {f"{kind}:{status}": count for kind, status, count in counts}
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=['run', 'work', 'finalize', 'status'])
+    parser.add_argument('--crawl', type=int, default=None, help="Crawl id (default: the running crawl)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Tasks claimed at a time")
+    parser.add_argument('--wait', action='store_true', help="Keep polling for new crawls instead of exiting")
+    parser.add_argument('--force', action='store_true', help="Finalize a crawl stuck in 'finalizing'")
+    args = parser.parse_args()
+
+    init_db(get_app())
+    if args.command == 'run':
+        run_crawl()
+    elif args.command == 'work':
+        run_worker(args.crawl, batch_size=args.batch_size, wait=args.wait)
+    elif args.command == 'finalize':
+        crawl_id = args.crawl
+        if crawl_id is None:
+            with get_app().app_context():
+                crawl = running_crawl() or Crawl.query.order_by(Crawl.id.desc()).first()
+                crawl_id = crawl.id if crawl else None
+        if crawl_id is not None:
+            finalize_crawl(crawl_id, force=args.force)
+    else:
+        print(json.dumps(crawl_status(args.crawl), indent=2))
@@ -0,0 +1,116 @@
+"""Crawl several job boards at once, one worker process per source.
+
+Each worker fetches its source's listing and the pages of jobs not stored
+yet, under the source's own rate limit and backend, and parses them. The
+parent writes each source's result through scraper.store_scrape() as soon
+as that source finishes, so sources never wait on each other's hosts and a
+run takes about as long as its slowest source.
+
+Usage: python crawl_runner.py [SOURCE ...] [--workers N]
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sqlalchemy import select
+from app import get_app, init_db
+from database import db
+from models import Job, source_clause
+from persistence import COMMIT_BATCH, chunks
+from profiling import profile_scrape
+from scraper import store_scrape
+from sources import enabled_sources, get_source
+
+logger = logging.getLogger(__name__)
+
+# Sources crawled at the same time; the rest queue for a free worker
+MAX_WORKERS = int(os.environ.get("SCRAPE_SOURCE_WORKERS", "4"))
+
+
+def scraper_for(source):
+    """Scraper for the source's backend"""
+    if source.backend == 'playwright':
+        from playwright_scraper import PlaywrightAZStateJobsScraper
+        return PlaywrightAZStateJobsScraper(source=source)
+    if source.backend == 'selenium':
+        from selenium_scraper import SeleniumAZStateJobsScraper
+        return SeleniumAZStateJobsScraper(source=source)
+    from scraper import AZStateJobsScraper
+    return AZStateJobsScraper(source=source)
+
+
+def known_ids(source):
+    """Requisition ids already stored for a source"""
+    table = Job.__table__
+    return set(db.session.execute(select(table.c.requisition_id).where(source_clause(table, source.name))).scalars())
+
+
+def _crawl_source(source, skip_ids):
+    """Fetch and parse one source; runs in a worker process.
+
+    Returns (listings, {url: fields} for new jobs' pages, seconds taken).
+    Only the requests backend fetches job pages, as in the single-source
+    scrapes.
+    """
+    started = time.monotonic()
+    with get_app().app_context():
+        scraper = scraper_for(source)
+        if source.backend == 'playwright':
+            job_listings = asyncio.run(scraper.get_job_listings())
+        else:
+            job_listings = scraper.get_job_listings()
+        # Commit the listing's archive entry
+        db.session.commit()
+
+        details = {}
+        if source.backend == 'requests':
+            new_listings = [job for job in job_listings if job['requisition_id'] not in skip_ids]
+            for batch in chunks(new_listings, COMMIT_BATCH):
+                details.update(scraper.fetch_job_details(batch))
+                db.session.commit()
+            logger.info(f"Fetch stats for {source.name}: {scraper.fetcher.stats()}")
+    return job_listings, details, time.monotonic() - started
+
+
+@profile_scrape
+def run_sources(sources=None, workers=None):
+    """Crawl sources (every enabled one by default) concurrently; returns the new jobs across all"""
+    with get_app().app_context():
+        sources = sources if sources is not None else enabled_sources()
+        if not sources:
+            logger.error("No sources to crawl")
+            return 0
+        skip_ids = {source.name: known_ids(source) for source in sources}
+
+    started = time.monotonic()
+    jobs_scraped = 0
+    # Spawned rather than forked: the scheduler and web server threads must not be copied mid-flight
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(workers or MAX_WORKERS, len(sources)), mp_context=context) as pool:
+        futures = {pool.submit(_crawl_source, source, skip_ids[source.name]): source for source in sources}
+        for future in as_completed(futures):
+            source = futures[future]
+            try:
+                job_listings, details, elapsed = future.result()
+            except Exception as e:
+                logger.error(f"Error crawling {source.name}: {str(e)}")
+                continue
+            logger.info(f"Fetched {source.name} in {elapsed:.1f}s: {len(job_listings)} listings, {len(details)} job pages")
+            with get_app().app_context():
+                jobs_scraped += store_scrape(source, job_listings, lambda batch: details)
+
+    logger.info(f"Crawled {len(sources)} sources in {time.monotonic() - started:.1f}s. {jobs_scraped} new jobs added.")
+    return jobs_scraped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sources', nargs='*', help="Source names (default: SCRAPE_SOURCES)")
+    parser.add_argument('--workers', type=int, default=None, help=f"Sources crawled at once (default: {MAX_WORKERS})")
+    args = parser.parse_args()
+
+    init_db(get_app())
+    run_sources([get_source(name) for name in args.sources] or None, args.workers)
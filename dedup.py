@@ -0,0 +1,157 @@
+import logging
+import os
+import random
+import re
+import time
+import zlib
+from datetime import datetime
+from sqlalchemy import select, update
+from database import db
+from models import Job, JobDetail, active_clause, decompress_text
+from persistence import chunks
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Estimated Jaccard similarity above which two postings are the same role
+SIMILARITY_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", "0.8"))
+# 16 bands of 8 rows put the LSH candidate threshold near (1/16) ** (1/8) = 0.71
+BANDS = 16
+ROWS_PER_BAND = 8
+NUM_PERMUTATIONS = BANDS * ROWS_PER_BAND
+SHINGLE_WORDS = 3
+# Earlier bucket members a posting is compared against; bounds the work per bucket
+BUCKET_COMPARISONS = 8
+
+MASK64 = (1 << 64) - 1
+WORD = re.compile(r'[a-z0-9]+')
+
+# Fixed seed so signatures are comparable across runs and processes
+_rng = random.Random(20240901)
+HASH_A = [_rng.getrandbits(64) | 1 for _ in range(NUM_PERMUTATIONS)]
+HASH_B = [_rng.getrandbits(64) for _ in range(NUM_PERMUTATIONS)]
+
+
+def shingles(text):
+    """CRC32 hashes of the overlapping word n-grams in text"""
+    words = WORD.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return {zlib.crc32(' '.join(words).encode())} if words else set()
+    return {zlib.crc32(' '.join(words[i:i + SHINGLE_WORDS]).encode())
+            for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def signature(shingle_hashes):
+    """MinHash signature: per permutation, the minimum multiply-shift hash over the shingles"""
+    if not shingle_hashes:
+        return None
+    if np is not None:
+        values = np.fromiter(shingle_hashes, dtype=np.uint64, count=len(shingle_hashes))
+        a = np.array(HASH_A, dtype=np.uint64)[:, None]
+        b = np.array(HASH_B, dtype=np.uint64)[:, None]
+        # uint64 arithmetic wraps, which is the mod 2**64 the hash family needs
+        return tuple(int(value) for value in ((a * values + b) >> np.uint64(32)).min(axis=1))
+    return tuple(min(((a * value + b) & MASK64) >> 32 for value in shingle_hashes)
+                 for a, b in zip(HASH_A, HASH_B))
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(first, second)) / NUM_PERMUTATIONS
+
+
+def find_clusters(signatures):
+    """Group keys whose signatures are near-duplicates.
+
+    Each signature is cut into bands and hashed into one bucket per band;
+    only keys sharing a bucket are compared, and each is compared against
+    at most BUCKET_COMPARISONS earlier members, so the work grows with the
+    number of postings rather than its square.
+    """
+    parent = {key: key for key in signatures}
+
+    def find(key):
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    buckets = {}
+    for key, sig in signatures.items():
+        for band in range(BANDS):
+            members = buckets.setdefault((band, sig[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]), [])
+            for other in members:
+                if find(other) != find(key) and similarity(signatures[other], sig) >= SIMILARITY_THRESHOLD:
+                    parent[find(key)] = find(other)
+            if len(members) < BUCKET_COMPARISONS:
+                members.append(key)
+
+    clusters = {}
+    for key in signatures:
+        clusters.setdefault(find(key), []).append(key)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def posting_text(title, details):
+    parts = [title or '']
+    if details is not None:
+        parts.extend(decompress_text(value) or '' for value in (details.job_summary, details.job_duties, details.requirements))
+    return ' '.join(parts)
+
+
+def assign_duplicate_clusters(table=None):
+    """Store a duplicate cluster id on every job in `table` (the live jobs table by default).
+
+    Only open postings are clustered. A cluster's id is the requisition id
+    of its most recently scraped member, which is the one shown when
+    duplicates are collapsed. Closed jobs and jobs without near-duplicates
+    get NULL. Run it again whenever postings close or reopen. Returns the
+    number of clusters.
+    """
+    table = table if table is not None else Job.__table__
+    started = time.monotonic()
+    # Closed postings are never listed, so they neither join nor represent a cluster
+    rows = db.session.execute(select(table.c.requisition_id, table.c.title, table.c.scraped_at)
+                              .where(active_clause(table))).all()
+    details = {}
+    for chunk in chunks([row.requisition_id for row in rows]):
+        details.update((detail.requisition_id, detail) for detail in db.session.query(
+            JobDetail.requisition_id, JobDetail.job_summary, JobDetail.job_duties, JobDetail.requirements
+        ).filter(JobDetail.requisition_id.in_(chunk)))
+
+    signatures = {}
+    for row in rows:
+        sig = signature(shingles(posting_text(row.title, details.get(row.requisition_id))))
+        if sig is not None:
+            signatures[row.requisition_id] = sig
+
+    scraped_at = {row.requisition_id: row.scraped_at for row in rows}
+    current = dict(db.session.execute(select(table.c.requisition_id, table.c.duplicate_cluster_id)).all())
+    assignments = {requisition_id: None for requisition_id in current}
+    clusters = find_clusters(signatures)
+    for members in clusters:
+        representative = max(members, key=lambda requisition_id: (scraped_at[requisition_id] or datetime.min,
+                                                                  requisition_id))
+        for requisition_id in members:
+            assignments[requisition_id] = representative
+
+    # Only write rows whose cluster changed
+    changed = [(requisition_id, cluster_id) for requisition_id, cluster_id in assignments.items()
+               if current.get(requisition_id) != cluster_id]
+    by_cluster = {}
+    for requisition_id, cluster_id in changed:
+        by_cluster.setdefault(cluster_id, []).append(requisition_id)
+    # Not a content change, so updated_at keeps its value
+    for cluster_id, requisition_ids in by_cluster.items():
+        for chunk in chunks(requisition_ids):
+            db.session.execute(update(table).where(table.c.requisition_id.in_(chunk))
+                               .values(duplicate_cluster_id=cluster_id, updated_at=table.c.updated_at))
+    db.session.commit()
+
+    logger.info(f"Dedup: {len(clusters)} duplicate clusters covering {sum(len(m) for m in clusters)} of {len(rows)} jobs "
+                f"({len(changed)} changed) in {(time.monotonic() - started) * 1000:.0f}ms")
+    return len(clusters)
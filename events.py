@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+import threading
+import time
+from sqlalchemy import func
+from database import db
+
+# ScrapeEvent is imported where it is used: models imports the gazetteer, which caches through this module
+
+logger = logging.getLogger(__name__)
+
+# How often each worker checks the database for events published by other workers
+POLL_INTERVAL = float(os.environ.get("EVENTS_POLL_INTERVAL", "5"))
+
+# How long a cached data version may be served before re-reading it
+DATA_VERSION_TTL = float(os.environ.get("DATA_VERSION_TTL", "2"))
+
+# Comment lines keep idle connections open through proxies
+HEARTBEAT_INTERVAL = float(os.environ.get("EVENTS_HEARTBEAT_INTERVAL", "15"))
+
+# Each open stream holds a gunicorn thread; gunicorn.conf.py adds this many threads per worker
+# on top of the request threads, and streams past it are turned away so requests never starve
+MAX_STREAMS = int(os.environ.get("EVENTS_MAX_STREAMS", "64"))
+# Streams are recycled after this long, so deploys and proxies don't hold connections forever
+STREAM_SECONDS = float(os.environ.get("EVENTS_STREAM_SECONDS", "1800"))
+# EventSource reconnects with Last-Event-ID after RETRY_MS when a stream drops,
+# or after BUSY_RETRY_MS when every stream slot was taken
+RETRY_MS = int(os.environ.get("EVENTS_RETRY_MS", "3000"))
+BUSY_RETRY_MS = int(os.environ.get("EVENTS_BUSY_RETRY_MS", "30000"))
+
+stream_slots = threading.BoundedSemaphore(MAX_STREAMS)
+
+
+class EventBus:
+    """Lightweight pub/sub for scrape events.
+
+    Publishing writes a row to ``scrape_events`` and wakes subscribers in the
+    same process immediately. Other gunicorn workers see the row through a
+    single background poller per process, so subscribers never hit the
+    database while idle.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._latest_id = None
+        self._checked_at = 0.0
+        self._poller = None
+
+    def publish(self, source, new_count=0, updated_count=0, removed_count=0):
+        """Record a completed scrape and notify local subscribers"""
+        from models import ScrapeEvent
+        event = ScrapeEvent(
+            source=source,
+            new_count=new_count,
+            updated_count=updated_count,
+            removed_count=removed_count
+        )
+        db.session.add(event)
+        db.session.commit()
+
+        self._advance(event.id)
+        logger.info(f"Published scrape event {event.id}: {new_count} new, {updated_count} updated, {removed_count} removed")
+        return event
+
+    def current_version(self):
+        """Return the latest data version, re-reading the database at most every DATA_VERSION_TTL seconds"""
+        if self._latest_id is None or time.monotonic() - self._checked_at > DATA_VERSION_TTL:
+            from models import ScrapeEvent
+            self._advance(db.session.query(func.max(ScrapeEvent.id)).scalar() or 0)
+        return self._latest_id
+
+    def events_since(self, after_id, limit=50):
+        """Return events newer than after_id, oldest first"""
+        from models import ScrapeEvent
+        return (ScrapeEvent.query
+                .filter(ScrapeEvent.id > after_id)
+                .order_by(ScrapeEvent.id)
+                .limit(limit)
+                .all())
+
+    def wait(self, after_id, timeout):
+        """Block until a version newer than after_id is known or timeout elapses"""
+        self._ensure_poller()
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._latest_id is not None and self._latest_id > after_id,
+                timeout=timeout
+            )
+
+    def _advance(self, version):
+        with self._condition:
+            self._checked_at = time.monotonic()
+            if self._latest_id is None or version > self._latest_id:
+                self._latest_id = version
+                self._condition.notify_all()
+
+    def _ensure_poller(self):
+        with self._condition:
+            if self._poller is not None and self._poller.is_alive():
+                return
+            self._poller = threading.Thread(target=self._poll, name="scrape-event-poller", daemon=True)
+            self._poller.start()
+
+    def _poll(self):
+        """Pick up events published by other processes"""
+        while True:
+            try:
+                from app import get_app
+                from models import ScrapeEvent
+                with get_app().app_context():
+                    self._advance(db.session.query(func.max(ScrapeEvent.id)).scalar() or 0)
+            except Exception as e:
+                logger.error(f"Error polling scrape events: {str(e)}")
+            time.sleep(POLL_INTERVAL)
+
+
+bus = EventBus()
+
+
+class VersionedCache:
+    """A value derived from the jobs table, built once per data version.
+
+    get() builds it with build(version) on first use and again after each
+    scrape. With serve_stale, threads arriving during a rebuild keep
+    answering from the previous version's value instead of queueing behind
+    the rebuild; without it they wait, for values that are cheap to build.
+    """
+
+    def __init__(self, build, serve_stale=True):
+        self.build = build
+        self.serve_stale = serve_stale
+        # (version, value), replaced whole so readers never see a mixed pair
+        self._current = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = bus.current_version()
+        current = self._current
+        if current is not None and current[0] == version:
+            return current[1]
+
+        if not self._lock.acquire(blocking=current is None or not self.serve_stale):
+            return current[1]
+        try:
+            if self._current is None or self._current[0] != version:
+                self._current = (version, self.build(version))
+            return self._current[1]
+        finally:
+            self._lock.release()
+
+
+def format_sse(data, event=None, event_id=None):
+    """Format a single Server-Sent Events message"""
+    message = ""
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    if event:
+        message += f"event: {event}\n"
+    message += f"data: {json.dumps(data)}\n\n"
+    return message
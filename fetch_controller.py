@@ -0,0 +1,237 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+import requests
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENCY = int(os.environ.get("FETCH_MAX_CONCURRENCY", "4"))
+MAX_RETRIES = int(os.environ.get("FETCH_MAX_RETRIES", "3"))
+CIRCUIT_COOLDOWN = float(os.environ.get("FETCH_CIRCUIT_COOLDOWN", "60"))
+
+CHALLENGE_MARKERS = (b"JavaScript is disabled", b"verify that you're not a robot")
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def looks_like_challenge(content):
+    """Whether a response body is a bot challenge instead of the page we asked for"""
+    if isinstance(content, str):
+        content = content.encode('utf-8', errors='replace')
+    return any(marker in content for marker in CHALLENGE_MARKERS)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a host's circuit breaker stays open past the caller's patience"""
+
+
+class HostState:
+    """Latency, error and concurrency bookkeeping for one host"""
+
+    def __init__(self, initial_concurrency, min_timeout, max_timeout):
+        self.limit = float(initial_concurrency)
+        self.in_flight = 0
+        self.last_start = 0.0
+        # Smoothed latency and deviation, as in TCP retransmission timers
+        self.srtt = None
+        self.rttvar = None
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.outcomes = deque(maxlen=20)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+        # Trips since the circuit last closed; sets the cooldown
+        self.consecutive_trips = 0
+        self.probing = False
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    def timeout(self):
+        if self.srtt is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, self.srtt + 4 * self.rttvar))
+
+    def record_latency(self, seconds):
+        if self.srtt is None:
+            self.srtt = seconds
+            self.rttvar = seconds / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - seconds)
+            self.srtt = 0.875 * self.srtt + 0.125 * seconds
+
+    def error_rate(self):
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class FetchController:
+    """Wraps a requests session with per-host adaptive concurrency, retries and a circuit breaker.
+
+    Concurrency follows AIMD: every success adds 1/limit to the host's limit
+    and every throttle, error or challenge halves it. Failed requests are
+    retried with full-jitter exponential backoff, honouring Retry-After.
+    Timeouts track observed latency instead of a fixed 30 seconds. When
+    failures pile up the host's circuit opens, requests wait for the
+    cooldown, and a single probe decides whether it closes again.
+    """
+
+    def __init__(self, session, min_interval=1.0, initial_concurrency=1, max_concurrency=MAX_CONCURRENCY,
+                 max_retries=MAX_RETRIES, base_backoff=1.0, max_backoff=30.0, min_timeout=5.0,
+                 max_timeout=30.0, failure_threshold=5, error_rate_threshold=0.5,
+                 cooldown=CIRCUIT_COOLDOWN, max_wait=None):
+        self.session = session
+        self.min_interval = min_interval
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown = cooldown
+        # How long a request may wait for an open circuit before giving up
+        self.max_wait = max_wait if max_wait is not None else 2 * cooldown
+        self._hosts = {}
+        self._condition = threading.Condition()
+
+    def get(self, url, **kwargs):
+        """GET a URL, retrying throttles and transient errors.
+
+        Challenge pages are returned to the caller (and counted against the
+        host) rather than retried, since repeating them immediately never helps.
+        """
+        host = urlparse(url).netloc
+        state = self._state(host)
+        last_error = None
+        response = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                state.retries += 1
+                time.sleep(self._backoff(attempt, response))
+
+            self._acquire(state)
+            started = time.monotonic()
+            outcome = 'error'
+            try:
+                response = self.session.get(url, timeout=state.timeout(), **kwargs)
+                last_error = None
+                if response.status_code in RETRY_STATUSES:
+                    outcome = 'throttled'
+                elif looks_like_challenge(response.content):
+                    outcome = 'challenge'
+                else:
+                    outcome = 'ok'
+            except (requests.Timeout, requests.ConnectionError) as e:
+                response = None
+                last_error = e
+            finally:
+                self._release(state, outcome, time.monotonic() - started)
+
+            if outcome in ('ok', 'challenge'):
+                return response
+            logger.warning(f"Fetch {outcome} for {url} (attempt {attempt + 1}/{self.max_retries + 1})")
+
+        if last_error is not None:
+            raise last_error
+        return response
+
+    def stats(self):
+        """Per-host counters for logging at the end of a run"""
+        with self._condition:
+            return {
+                host: {
+                    'requests': state.requests,
+                    'retries': state.retries,
+                    'failures': state.failures,
+                    'concurrency_limit': round(state.limit, 2),
+                    'latency_ms': round(state.srtt * 1000) if state.srtt is not None else None,
+                    'timeout_s': round(state.timeout(), 1),
+                    'circuit_trips': state.trips
+                }
+                for host, state in self._hosts.items()
+            }
+
+    def _state(self, host):
+        with self._condition:
+            if host not in self._hosts:
+                self._hosts[host] = HostState(self.initial_concurrency, self.min_timeout, self.max_timeout)
+            return self._hosts[host]
+
+    def _backoff(self, attempt, response):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(self.max_backoff, float(retry_after))
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+
+    def _acquire(self, state):
+        deadline = time.monotonic() + self.max_wait
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                wait = None
+                if now < state.open_until:
+                    wait = state.open_until - now
+                elif state.open_until and state.probing:
+                    # Half-open: only the probe request may run
+                    wait = 0.5
+                elif state.in_flight >= max(1, int(state.limit)):
+                    wait = 0.5
+                elif now - state.last_start < self.min_interval:
+                    wait = self.min_interval - (now - state.last_start)
+                else:
+                    if state.open_until:
+                        state.probing = True
+                    state.in_flight += 1
+                    state.last_start = now
+                    state.requests += 1
+                    return
+
+                if now + wait > deadline:
+                    raise CircuitOpenError("circuit open or host saturated; gave up waiting")
+                self._condition.wait(wait)
+
+    def _release(self, state, outcome, latency):
+        with self._condition:
+            state.in_flight -= 1
+            success = outcome == 'ok'
+            state.outcomes.append(success)
+
+            if success:
+                state.record_latency(latency)
+                state.consecutive_failures = 0
+                state.limit = min(self.max_concurrency, state.limit + 1 / state.limit)
+                if state.open_until:
+                    logger.info(f"Circuit closed after a successful probe ({state.trips} trips so far)")
+                state.open_until = 0.0
+                state.consecutive_trips = 0
+                state.probing = False
+            else:
+                state.failures += 1
+                state.consecutive_failures += 1
+                state.limit = max(1.0, state.limit / 2)
+                if state.probing or self._should_trip(state):
+                    self._trip(state)
+
+            self._condition.notify_all()
+
+    def _should_trip(self, state):
+        return (state.consecutive_failures >= self.failure_threshold
+                or (len(state.outcomes) >= 10 and state.error_rate() >= self.error_rate_threshold))
+
+    def _trip(self, state):
+        state.trips += 1
+        state.consecutive_trips += 1
+        state.probing = False
+        # Each consecutive trip doubles the cooldown
+        cooldown = min(self.cooldown * 2 ** (state.consecutive_trips - 1), 10 * self.cooldown)
+        state.open_until = time.monotonic() + cooldown
+        state.outcomes.clear()
+        state.consecutive_failures = 0
+        logger.warning(f"Circuit opened for {cooldown:.0f}s after repeated failures")
@@ -0,0 +1,176 @@
+import csv
+import logging
+import math
+import os
+import re
+import time
+from functools import lru_cache
+from events import VersionedCache
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'az_places.csv')
+
+# Postings that name only a county are placed at its seat
+COUNTY_SEATS = {
+    'apache': 'St. Johns', 'cochise': 'Bisbee', 'coconino': 'Flagstaff', 'gila': 'Globe',
+    'graham': 'Safford', 'greenlee': 'Clifton', 'la paz': 'Parker', 'maricopa': 'Phoenix',
+    'mohave': 'Kingman', 'navajo': 'Holbrook', 'pima': 'Tucson', 'pinal': 'Florence',
+    'santa cruz': 'Nogales', 'yavapai': 'Prescott', 'yuma': 'Yuma'
+}
+DEFAULT_RADIUS_MILES = 25
+MAX_RADIUS_MILES = 500
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LATITUDE = 69.0
+# Grid cell size in degrees; roughly 35 miles across in Arizona
+GRID_CELL_DEGREES = 0.5
+# Longest place name in the gazetteer, in words
+MAX_NAME_WORDS = 3
+
+SEPARATORS = re.compile(r'\s*(?:[;/|&(),]|\s-\s|\bor\b|\band\b)\s*')
+NOISE = re.compile(r'\b(?:az|arizona|usa|us|city of|town of)\b|\b\d{5}(?:-\d{4})?\b|[.\']')
+
+def normalize(text):
+    """Lowercased place text with state names, ZIP codes and punctuation removed"""
+    text = NOISE.sub(' ', text.lower().replace('saint ', 'st '))
+    return ' '.join(text.replace('-', ' ').split())
+
+
+@lru_cache(maxsize=1)
+def load_places():
+    """Map normalized place names to (name, latitude, longitude)"""
+    places = {}
+    with open(GAZETTEER_PATH, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            places[normalize(row['name'])] = (row['name'], float(row['latitude']), float(row['longitude']))
+    return places
+
+
+@lru_cache(maxsize=4096)
+def geocode(location):
+    """Resolve a free-text job location to (place, latitude, longitude), or None.
+
+    Each part of a multi-location string is tried in turn, first whole and
+    then word by word for the longest known name, so "Phoenix - Capitol
+    Mall" and "ASPC Florence" both resolve.
+    """
+    if not location:
+        return None
+    places = load_places()
+    parts = [normalize(part) for part in SEPARATORS.split(location.lower())]
+    parts = [part for part in parts if part]
+
+    for part in parts:
+        if part.endswith(' county') and part[:-len(' county')] in COUNTY_SEATS:
+            return places[normalize(COUNTY_SEATS[part[:-len(' county')]])]
+        if part in places:
+            return places[part]
+
+    for part in parts:
+        words = part.split()
+        for size in range(min(MAX_NAME_WORDS, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                match = places.get(' '.join(words[start:start + size]))
+                if match:
+                    return match
+    return None
+
+
+def geocode_fields(location):
+    """Job column values for a location; unmatched locations get an empty place"""
+    match = geocode(location)
+    if match is None:
+        return {'place': '' if location else None, 'latitude': None, 'longitude': None}
+    place, latitude, longitude = match
+    return {'place': place, 'latitude': latitude, 'longitude': longitude}
+
+
+def resolve_point(text):
+    """Coordinates for "lat,lon" or a place name, or None"""
+    numbers = text.split(',')
+    if len(numbers) == 2:
+        try:
+            return float(numbers[0]), float(numbers[1])
+        except ValueError:
+            pass
+    match = geocode(text)
+    return (match[1], match[2]) if match else None
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+class GeoIndex:
+    """Uniform grid over the places current jobs are located at.
+
+    Jobs share a few hundred coordinates at most, so the index holds one
+    point per place and queries answer with place names; the jobs table
+    is then filtered on its indexed place column. A query only visits the
+    grid cells its search box overlaps.
+    """
+
+    def __init__(self, version, points):
+        self.version = version
+        self.size = len(points)
+        self.cells = {}
+        for place, latitude, longitude in points:
+            self.cells.setdefault(self._cell(latitude, longitude), []).append((place, latitude, longitude))
+
+    @staticmethod
+    def _cell(latitude, longitude):
+        return math.floor(latitude / GRID_CELL_DEGREES), math.floor(longitude / GRID_CELL_DEGREES)
+
+    def _candidates(self, south, west, north, east):
+        low_row, low_col = self._cell(south, west)
+        high_row, high_col = self._cell(north, east)
+        if (high_row - low_row + 1) * (high_col - low_col + 1) > len(self.cells):
+            # A box wider than the populated area: visit the occupied cells instead of every cell in it
+            for (row, col), points in self.cells.items():
+                if low_row <= row <= high_row and low_col <= col <= high_col:
+                    yield from points
+            return
+        for row in range(low_row, high_row + 1):
+            for col in range(low_col, high_col + 1):
+                yield from self.cells.get((row, col), ())
+
+    def within_bbox(self, west, south, east, north):
+        """Places inside a bounding box"""
+        return {place for place, latitude, longitude in self._candidates(south, west, north, east)
+                if south <= latitude <= north and west <= longitude <= east}
+
+    def within_radius(self, latitude, longitude, miles):
+        """Places within `miles` of a point, with their distance"""
+        lat_span = miles / MILES_PER_DEGREE_LATITUDE
+        lon_span = miles / (MILES_PER_DEGREE_LATITUDE * max(math.cos(math.radians(latitude)), 0.01))
+        found = {}
+        for place, lat, lon in self._candidates(latitude - lat_span, longitude - lon_span,
+                                                latitude + lat_span, longitude + lon_span):
+            distance = haversine_miles(latitude, longitude, lat, lon)
+            if distance <= miles:
+                found[place] = round(distance, 1)
+        return found
+
+
+def build_geo_index(version):
+    """Index every distinct geocoded place among open jobs"""
+    from database import db
+    from models import ACTIVE, Job
+    started = time.monotonic()
+    points = (db.session.query(Job.place, Job.latitude, Job.longitude)
+              .filter(ACTIVE, Job.latitude.isnot(None), Job.longitude.isnot(None))
+              .distinct()
+              .all())
+    index = GeoIndex(version, points)
+    logger.info(f"Built geo index for version {version}: {index.size} places in {(time.monotonic() - started) * 1000:.0f}ms")
+    return index
+
+
+_geo_indexes = VersionedCache(build_geo_index)
+
+
+def current_geo_index():
+    """Return the index for the current data version, rebuilding it after a scrape"""
+    return _geo_indexes.get()
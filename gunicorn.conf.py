@@ -0,0 +1,27 @@
+# Gunicorn loads this file automatically from the working directory
+import os
+from events import MAX_STREAMS
+
+worker_class = 'gthread'
+# Request threads, plus one for each /api/events stream a worker may hold open
+threads = int(os.environ.get("GUNICORN_THREADS", "8")) + MAX_STREAMS
+
+
+def on_starting(server):
+    """Create missing tables once in the master, before any worker forks"""
+    from app import get_app, init_db
+    from database import db
+
+    app = get_app()
+    init_db(app)
+
+    # Workers must not inherit the master's pooled connections
+    with app.app_context():
+        db.engine.dispose()
+
+
+def post_worker_init(worker):
+    """Start the scraping scheduler in each worker unless disabled with START_SCHEDULER=0"""
+    if os.environ.get("START_SCHEDULER", "1") == "1":
+        from scheduler import start_scheduler
+        start_scheduler()
@@ -0,0 +1,126 @@
+import gzip
+import hashlib
+import logging
+import os
+import time
+from datetime import timedelta
+from sqlalchemy import func
+from database import db
+from models import ArchivedPage, phoenix_now
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.environ.get("HTML_ARCHIVE_DIR", "html_archive")
+ARCHIVE_ENABLED = os.environ.get("HTML_ARCHIVE_ENABLED", "1") == "1"
+
+# Retention limits enforced by prune_archive()
+RETENTION_DAYS = int(os.environ.get("HTML_ARCHIVE_RETENTION_DAYS", "90"))
+MAX_BYTES = int(os.environ.get("HTML_ARCHIVE_MAX_BYTES", str(2 * 1024 ** 3)))
+# Unreferenced blobs younger than this may belong to a scrape that has not committed yet
+GRACE_HOURS = float(os.environ.get("HTML_ARCHIVE_GRACE_HOURS", "6"))
+
+
+def blob_path(content_hash):
+    """Location of a page on disk, fanned out by the first two hex digits"""
+    return os.path.join(ARCHIVE_DIR, content_hash[:2], f"{content_hash}.html.gz")
+
+
+def read_page(content_hash):
+    """Return the raw bytes of an archived page"""
+    with gzip.open(blob_path(content_hash), 'rb') as f:
+        return f.read()
+
+
+def archive_page(url, content, kind):
+    """Store a fetched page and record it in the current session.
+
+    Identical content is written once no matter how many times or from how
+    many URLs it is fetched. The caller's commit persists the index row.
+    """
+    if not ARCHIVE_ENABLED or not content:
+        return None
+
+    try:
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+
+        content_hash = hashlib.sha256(content).hexdigest()
+        path = blob_path(content_hash)
+        if os.path.exists(path):
+            # Restart the grace period; this fetch's row is not committed yet
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+        page = ArchivedPage.query.filter_by(url=url, content_hash=content_hash).first()
+        if page:
+            page.fetched_at = phoenix_now()
+        else:
+            page = ArchivedPage(
+                url=url,
+                kind=kind,
+                content_hash=content_hash,
+                size=os.path.getsize(path),
+                fetched_at=phoenix_now()
+            )
+            db.session.add(page)
+        return content_hash
+
+    except Exception as e:
+        logger.error(f"Error archiving {url}: {str(e)}")
+        return None
+
+
+def prune_archive():
+    """Apply the age and size limits, then delete blobs nothing points to that are past the grace period"""
+    cutoff = phoenix_now() - timedelta(days=RETENTION_DAYS)
+    expired = ArchivedPage.query.filter(ArchivedPage.fetched_at < cutoff).delete(synchronize_session=False)
+
+    # Blobs are shared, so count each hash once when measuring the archive
+    sizes = dict(db.session.query(ArchivedPage.content_hash, func.max(ArchivedPage.size))
+                 .group_by(ArchivedPage.content_hash).all())
+    total = sum(sizes.values())
+    evicted = 0
+    if total > MAX_BYTES:
+        newest_fetch = (db.session.query(ArchivedPage.content_hash, func.max(ArchivedPage.fetched_at).label('newest'))
+                        .group_by(ArchivedPage.content_hash)
+                        .order_by('newest')
+                        .all())
+        doomed = []
+        for content_hash, _ in newest_fetch:
+            if total <= MAX_BYTES:
+                break
+            doomed.append(content_hash)
+            total -= sizes[content_hash]
+        for i in range(0, len(doomed), 500):
+            evicted += (ArchivedPage.query
+                        .filter(ArchivedPage.content_hash.in_(doomed[i:i + 500]))
+                        .delete(synchronize_session=False))
+    db.session.commit()
+
+    referenced = {row[0] for row in db.session.query(ArchivedPage.content_hash).distinct()}
+    settled = time.time() - GRACE_HOURS * 3600
+    removed_files = 0
+    if os.path.isdir(ARCHIVE_DIR):
+        for shard in os.listdir(ARCHIVE_DIR):
+            shard_dir = os.path.join(ARCHIVE_DIR, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                if not name.endswith('.html.gz') or name[:-len('.html.gz')] in referenced:
+                    continue
+                path = os.path.join(shard_dir, name)
+                try:
+                    if os.path.getmtime(path) < settled:
+                        os.remove(path)
+                        removed_files += 1
+                except FileNotFoundError:
+                    continue
+
+    if expired or evicted or removed_files:
+        logger.info(f"Archive prune: {expired} expired entries, {evicted} evicted for size, {removed_files} files removed")
+    return removed_files
@@ -1,9 +1,13 @@
-from app import app
+from app import get_app, init_db
 
-# Import and start scheduler when module loads (for gunicorn)
-from scheduler import start_scheduler
-start_scheduler()
+# Gunicorn serves this; schema setup and the scheduler start from gunicorn.conf.py hooks
+app = get_app()
 
 if __name__ == '__main__':
+    init_db(app)
+
+    from scheduler import start_scheduler
+    start_scheduler()
+
     # Run the Flask app (only for direct python execution)
     app.run(host='0.0.0.0', port=5000, debug=False)
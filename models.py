@@ -1,11 +1,107 @@
-from app import db
+from database import db
+from gazetteer import geocode_fields
 from datetime import datetime
+import zlib
+import hashlib
+import hmac
+import secrets
 import pytz
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float
+from markupsafe import Markup
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean, LargeBinary, ForeignKey, UniqueConstraint, Index, event, or_, text, true
+from sqlalchemy.orm import deferred, relationship
+
+PHOENIX_TZ = pytz.timezone('America/Phoenix')
+# Board every job came from before there were several, see sources.py
+DEFAULT_SOURCE = 'azstatejobs'
+
+
+def phoenix_now():
+    """Current time in Phoenix; the default for every timestamp column"""
+    return datetime.now(PHOENIX_TZ)
+
+
+def phoenix_naive(value=None):
+    """A time (default now) as timestamp columns hold it: Phoenix wall-clock time without tzinfo.
+
+    SQLite and Postgres both drop the offset when storing an aware value,
+    so compare stored timestamps against this rather than phoenix_now().
+    """
+    value = value if value is not None else phoenix_now()
+    if value.tzinfo is not None:
+        value = value.astimezone(PHOENIX_TZ).replace(tzinfo=None)
+    return value
+
+
+def compress_text(text):
+    """Compress text for storage in a LargeBinary column"""
+    return zlib.compress(text.encode('utf-8')) if text is not None else None
+
+
+def decompress_text(data):
+    """Inverse of compress_text"""
+    return zlib.decompress(data).decode('utf-8') if data is not None else None
+
+
+def _job_detail(name):
+    """Job attribute backed by a compressed column on the job's JobDetail row"""
+    def getter(self):
+        return decompress_text(getattr(self.details, name)) if self.details is not None else None
+
+    def setter(self, value):
+        if self.details is None:
+            if value is None:
+                return
+            self.details = JobDetail()
+        setattr(self.details, name, compress_text(value))
+
+    return property(getter, setter, doc=f"Decompressed {name} from job_details")
+
+
+def format_salary(salary_min, salary_max, salary_text):
+    """Salary as shown in the listings table"""
+    if salary_min and salary_max and salary_min != salary_max:
+        return f"${salary_min:,} - ${salary_max:,}"
+    # A single or hourly salary reads better as posted than annualized
+    return salary_text or (f"${salary_min:,}" if salary_min else '')
+
+
+def format_title_link(title, url):
+    """Escaped link to the official posting; anything but http(s) URLs is dropped"""
+    href = url if url and url.lower().startswith(('http://', 'https://')) else '#'
+    return str(Markup('<a href="{}" target="_blank" rel="noopener" class="text-decoration-none">{}</a>').format(href, title or ''))
+
+
+def format_closing_date(closing_date):
+    return closing_date.strftime('%b %d, %Y') if closing_date else ''
+
+
+def format_scraped_at(scraped_at):
+    if not scraped_at:
+        return ''
+    # Stored timestamps come back naive but are Phoenix local time
+    if scraped_at.tzinfo is None:
+        scraped_at = PHOENIX_TZ.localize(scraped_at)
+    return scraped_at.astimezone(PHOENIX_TZ).strftime('%b %d, %Y %I:%M %p MST')
+
+
+def display_fields(job):
+    """Pre-rendered listing strings for any object with Job's column attributes"""
+    return {
+        'title_html': format_title_link(job.title, job.url),
+        'salary_display': format_salary(job.salary_min, job.salary_max, job.salary_text),
+        'closing_date_display': format_closing_date(job.closing_date),
+        'scraped_at_display': format_scraped_at(job.scraped_at)
+    }
+
 
 class Job(db.Model):
     """Model for storing job postings"""
     __tablename__ = 'jobs'
+    __table_args__ = (
+        # Partial indexes: the listing, its count and its facets only ever look at open postings
+        Index('ix_jobs_active_scraped_at', 'scraped_at', sqlite_where=text('is_active = 1'), postgresql_where=text('is_active')),
+        Index('ix_jobs_active_department', 'department', sqlite_where=text('is_active = 1'), postgresql_where=text('is_active')),
+    )
     
     id = Column(Integer, primary_key=True)
     requisition_id = Column(String(50), unique=True, nullable=False, index=True)
@@ -13,8 +109,11 @@ class Job(db.Model):
     department = Column(String(100), index=True)
     location = Column(String(100), index=True)
     employment_type = Column(String(50))
-    category = Column(Text)
+    # Not shown in listings, so only loaded when accessed
+    category = deferred(Column(Text))
     closing_date = Column(DateTime)
+    # False once closing_date has passed in Phoenix time, see persistence.expire_closed_jobs()
+    is_active = Column(Boolean, default=True)
     postsecondary_required = Column(String(10))
     url = Column(Text, nullable=False)
     
@@ -23,18 +122,53 @@ class Job(db.Model):
     salary_min = Column(Float)  # Parsed minimum salary
     salary_max = Column(Float)  # Parsed maximum salary
     grade = Column(String(20))  # Job grade
+
+    # Listing strings rendered once when the job is written, see display_fields()
+    title_html = Column(Text)
+    salary_display = Column(String(100))
+    closing_date_display = Column(String(20))
+    scraped_at_display = Column(String(40))
+
+    # Location resolved against the bundled gazetteer, see gazetteer.geocode(); '' when unknown
+    place = Column(String(100), index=True)
+    latitude = Column(Float)
+    longitude = Column(Float)
+
+    # Board the job was scraped from, see sources.py
+    source = Column(String(50), index=True, default=DEFAULT_SOURCE)
+
+    # Requisition id of the posting this one duplicates (itself for the one shown), see dedup.py
+    duplicate_cluster_id = Column(String(50), index=True)
     
-    # Additional job details
-    job_summary = Column(Text)
-    job_duties = Column(Text)
-    requirements = Column(Text)
+    # Additional job details, stored compressed in job_details and loaded on demand
+    details = relationship(
+        'JobDetail',
+        primaryjoin='Job.requisition_id == foreign(JobDetail.requisition_id)',
+        uselist=False,
+        cascade='all, delete-orphan'
+    )
+    job_summary = _job_detail('job_summary')
+    job_duties = _job_detail('job_duties')
+    requirements = _job_detail('requirements')
     
     # Metadata
-    scraped_at = Column(DateTime, default=lambda: datetime.now(pytz.timezone('America/Phoenix')), index=True)
-    updated_at = Column(DateTime, default=lambda: datetime.now(pytz.timezone('America/Phoenix')), onupdate=lambda: datetime.now(pytz.timezone('America/Phoenix')))
+    scraped_at = Column(DateTime, default=phoenix_now, index=True)
+    updated_at = Column(DateTime, default=phoenix_now, onupdate=phoenix_now)
     
     def __repr__(self):
         return f'<Job {self.requisition_id}: {self.title}>'
+
+    def refresh_display(self):
+        """Recompute the stored listing strings from the current column values"""
+        if self.scraped_at is None:
+            self.scraped_at = phoenix_now()
+        for name, value in display_fields(self).items():
+            setattr(self, name, value)
+
+    def refresh_location(self):
+        """Geocode the location string into place, latitude and longitude"""
+        for name, value in geocode_fields(self.location).items():
+            setattr(self, name, value)
     
     def to_dict(self):
         """Convert job to dictionary for JSON serialization"""
@@ -53,6 +187,229 @@ class Job(db.Model):
             'salary_min': self.salary_min,
             'salary_max': self.salary_max,
             'grade': self.grade,
+            'source': self.source,
             'scraped_at': self.scraped_at.isoformat() if self.scraped_at is not None else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at is not None else None
         }
+
+    def to_detail_dict(self):
+        """Convert job to dictionary including the long text fields"""
+        data = self.to_dict()
+        data.update({
+            'job_summary': self.job_summary,
+            'job_duties': self.job_duties,
+            'requirements': self.requirements
+        })
+        return data
+
+
+@event.listens_for(Job, 'before_insert')
+@event.listens_for(Job, 'before_update')
+def _refresh_job_display(mapper, connection, target):
+    target.refresh_display()
+    target.refresh_location()
+
+
+def active_clause(table):
+    """Filter for open postings in `table`; matches the partial indexes' WHERE clause"""
+    return table.c.is_active == true()
+
+
+ACTIVE = active_clause(Job.__table__)
+
+
+def source_clause(table, source):
+    """Filter for one source's jobs in `table`; rows from before sources existed belong to the default"""
+    if source == DEFAULT_SOURCE:
+        return or_(table.c.source == source, table.c.source.is_(None))
+    return table.c.source == source
+
+
+class JobDetail(db.Model):
+    """Model for a job's long free-text fields, kept out of the jobs table and zlib-compressed"""
+    __tablename__ = 'job_details'
+
+    # Same natural key as Job; the relationship is declared on Job.details
+    requisition_id = Column(String(50), primary_key=True)
+    job_summary = Column(LargeBinary)
+    job_duties = Column(LargeBinary)
+    requirements = Column(LargeBinary)
+
+    def __repr__(self):
+        return f'<JobDetail {self.requisition_id}>'
+
+
+class ScrapeEvent(db.Model):
+    """Model recording each completed scrape; the latest id is the data version"""
+    __tablename__ = 'scrape_events'
+
+    id = Column(Integer, primary_key=True)
+    source = Column(String(50), nullable=False)
+    new_count = Column(Integer, nullable=False, default=0)
+    updated_count = Column(Integer, nullable=False, default=0)
+    removed_count = Column(Integer, nullable=False, default=0)
+    completed_at = Column(DateTime, default=phoenix_now, index=True)
+
+    def __repr__(self):
+        return f'<ScrapeEvent {self.id}: {self.source}>'
+
+    def to_dict(self):
+        """Convert event to the payload pushed to /api/events subscribers"""
+        return {
+            'version': self.id,
+            'source': self.source,
+            'new': self.new_count,
+            'updated': self.updated_count,
+            'removed': self.removed_count,
+            'completed_at': self.completed_at.isoformat() if self.completed_at is not None else None
+        }
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class SavedSearch(db.Model):
+    """Model for a user's saved search, using the same filters as the index page"""
+    __tablename__ = 'saved_searches'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100))
+    email = Column(String(200), index=True)
+    keyword = Column(String(200))
+    department = Column(String(100))
+    location = Column(String(100))
+    salary_min = Column(Float)
+    salary_max = Column(Float)
+    # SHA-256 of the token handed out at creation; deleting the search requires the token
+    token_hash = Column(String(64))
+    created_at = Column(DateTime, default=phoenix_now)
+
+    def __repr__(self):
+        return f'<SavedSearch {self.id}: {self.name}>'
+
+    def issue_token(self):
+        """Generate the search's owner token, store its hash and return the token itself"""
+        token = secrets.token_urlsafe(32)
+        self.token_hash = hash_token(token)
+        return token
+
+    def token_matches(self, token):
+        """Whether token is this search's owner token; searches saved before tokens existed have none"""
+        if not token or not self.token_hash:
+            return False
+        return hmac.compare_digest(hash_token(token), self.token_hash)
+
+    def has_criteria(self):
+        """Whether the search filters on anything at all"""
+        return bool(self.keyword or self.department or self.location
+                    or self.salary_min is not None or self.salary_max is not None)
+
+    def matches(self, job):
+        """Check a job against every filter, with the same semantics as index()"""
+        if self.keyword and self.keyword.lower() not in (job.title or '').lower():
+            return False
+        if self.department and job.department != self.department:
+            return False
+        if self.location and self.location.lower() not in (job.location or '').lower():
+            return False
+        if self.salary_min is not None and (job.salary_min is None or job.salary_min < self.salary_min):
+            return False
+        if self.salary_max is not None and (job.salary_max is None or job.salary_max > self.salary_max):
+            return False
+        return True
+
+    def to_dict(self):
+        """Convert saved search to dictionary for JSON serialization"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'email': self.email,
+            'keyword': self.keyword,
+            'department': self.department,
+            'location': self.location,
+            'salary_min': self.salary_min,
+            'salary_max': self.salary_max,
+            'created_at': self.created_at.isoformat() if self.created_at is not None else None
+        }
+
+
+class AlertOutbox(db.Model):
+    """Model for saved-search matches waiting to be delivered"""
+    __tablename__ = 'alert_outbox'
+    __table_args__ = (
+        UniqueConstraint('saved_search_id', 'requisition_id', name='uq_alert_outbox_search_job'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    saved_search_id = Column(Integer, ForeignKey('saved_searches.id', ondelete='CASCADE'), nullable=False, index=True)
+    # Jobs are referenced by requisition id so alerts outlive cleanup of the posting
+    requisition_id = Column(String(50), nullable=False)
+    title = Column(String(200), nullable=False)
+    url = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=phoenix_now)
+    delivered_at = Column(DateTime, index=True)
+
+    def __repr__(self):
+        return f'<AlertOutbox {self.saved_search_id}: {self.requisition_id}>'
+
+
+class ArchivedPage(db.Model):
+    """Model indexing raw pages kept in the content-addressed HTML archive"""
+    __tablename__ = 'archived_pages'
+    __table_args__ = (
+        UniqueConstraint('url', 'content_hash', name='uq_archived_pages_url_hash'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    url = Column(Text, nullable=False)
+    kind = Column(String(20), nullable=False, index=True)  # 'listing' or 'detail'
+    content_hash = Column(String(64), nullable=False, index=True)
+    size = Column(Integer, nullable=False)  # Compressed size on disk
+    fetched_at = Column(DateTime, default=phoenix_now, index=True)
+
+    def __repr__(self):
+        return f'<ArchivedPage {self.kind} {self.content_hash[:12]}: {self.url}>'
+
+
+class Crawl(db.Model):
+    """Model for one run of the durable crawl queue"""
+    __tablename__ = 'crawls'
+
+    id = Column(Integer, primary_key=True)
+    source = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default='running', index=True)  # running, finalizing, done, failed
+    # JSON list of requisition ids seen on the listing page, used by cleanup
+    requisition_ids = Column(Text)
+    updated_count = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, default=phoenix_now)
+    finished_at = Column(DateTime)
+
+    def __repr__(self):
+        return f'<Crawl {self.id}: {self.status}>'
+
+
+class CrawlTask(db.Model):
+    """Model for a page a crawl still has to fetch, claimed by workers under a lease"""
+    __tablename__ = 'crawl_tasks'
+    __table_args__ = (
+        UniqueConstraint('crawl_id', 'url', name='uq_crawl_tasks_crawl_url'),
+        Index('ix_crawl_tasks_claim', 'crawl_id', 'status', 'lease_expires_at'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    crawl_id = Column(Integer, ForeignKey('crawls.id', ondelete='CASCADE'), nullable=False)
+    kind = Column(String(20), nullable=False)  # 'listing' or 'detail'
+    url = Column(Text, nullable=False)
+    requisition_id = Column(String(50))
+    # JSON listing row for detail tasks
+    payload = Column(Text)
+    status = Column(String(20), nullable=False, default='pending')  # pending, leased, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    lease_token = Column(String(64), index=True)
+    lease_expires_at = Column(DateTime)
+    last_error = Column(Text)
+    updated_at = Column(DateTime, default=phoenix_now)
+
+    def __repr__(self):
+        return f'<CrawlTask {self.kind} {self.status}: {self.url}>'
@@ -0,0 +1,117 @@
+import gzip
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from flask import Response, request
+from events import VersionedCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+PAGE_CACHE_ENABLED = os.environ.get("PAGE_CACHE", "1") == "1"
+# Rendered variants kept per data version; the least recently used goes when it fills
+MAX_PAGES = int(os.environ.get("PAGE_CACHE_SIZE", "256"))
+# Pages served to everyone are worth the slowest, smallest encodings
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+# Pages for one-off filters are compressed on the request thread, so cheaply
+FAST_GZIP_LEVEL = 1
+
+class CachedPage:
+    """One rendered page, compressed once; shared pages with every available encoding at its best level"""
+
+    def __init__(self, html, mimetype='text/html', shared=False):
+        self.mimetype = mimetype
+        self.bodies = {'identity': html.encode('utf-8')}
+        if shared:
+            self.bodies['gzip'] = gzip.compress(self.bodies['identity'], compresslevel=GZIP_LEVEL, mtime=0)
+            if brotli is not None:
+                self.bodies['br'] = brotli.compress(self.bodies['identity'], quality=BROTLI_QUALITY)
+        else:
+            self.bodies['gzip'] = gzip.compress(self.bodies['identity'], compresslevel=FAST_GZIP_LEVEL, mtime=0)
+        self.etag = hashlib.blake2b(self.bodies['identity'], digest_size=12).hexdigest()
+
+    def encoding_for(self, accept_encodings):
+        """Smallest encoding the client accepts"""
+        best = 'identity'
+        for encoding in ('br', 'gzip'):
+            if encoding in self.bodies and accept_encodings[encoding] > 0 \
+                    and len(self.bodies[encoding]) < len(self.bodies[best]):
+                best = encoding
+        return best
+
+
+class PageCache:
+    """Rendered pages and page fragments for one data version.
+
+    Everything the cache holds is derived from the jobs table, so a new
+    data version simply gets a new, empty cache.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self._pages = OrderedDict()
+        self._fragments = {}
+        self._lock = threading.Lock()
+
+    def page(self, key, render, shared=False):
+        """Cached page for key, rendering and compressing it on a miss"""
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+        if page is None:
+            page = CachedPage(render(), shared=shared)
+            with self._lock:
+                self._pages[key] = page
+                while len(self._pages) > MAX_PAGES:
+                    self._pages.popitem(last=False)
+        return page
+
+    def fragment(self, key, build):
+        """Cached value shared by every page of this version, such as the filter facets"""
+        with self._lock:
+            if key in self._fragments:
+                return self._fragments[key]
+        value = build()
+        with self._lock:
+            self._fragments[key] = value
+        return value
+
+
+# Pages of an old version must not be served once a scrape lands, so threads wait for the new, empty cache
+_page_caches = VersionedCache(PageCache, serve_stale=False)
+
+
+def current_page_cache():
+    """Return the cache for the current data version"""
+    return _page_caches.get()
+
+
+def page_response(page):
+    """Serve a cached page in the client's preferred encoding, or 304 if it has it already"""
+    if request.if_none_match.contains_weak(page.etag):
+        response = Response(status=304)
+    else:
+        encoding = page.encoding_for(request.accept_encodings)
+        response = Response(page.bodies[encoding], mimetype=page.mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    # Weak, since the encodings share one tag
+    response.set_etag(page.etag, weak=True)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def cached_page(key, render, shared=False):
+    """Response for a page that only changes with the data version; shared pages are those most visitors get"""
+    if not PAGE_CACHE_ENABLED:
+        return render()
+    return page_response(current_page_cache().page(key, render, shared))
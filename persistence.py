@@ -0,0 +1,373 @@
+import logging
+import os
+import time
+from datetime import timedelta
+from sqlalchemy import MetaData, Table, delete, false, insert, inspect, not_, or_, select, text, true, update
+from database import db
+from gazetteer import geocode_fields
+from models import (DEFAULT_SOURCE, Job, JobDetail, active_clause, compress_text, display_fields, phoenix_naive,
+                    phoenix_now, source_clause)
+
+logger = logging.getLogger(__name__)
+
+# New jobs written per transaction; keeps SQLite write locks short during a scrape
+COMMIT_BATCH = int(os.environ.get("SCRAPE_COMMIT_BATCH", "50"))
+# Build each scrape in a staging table and swap it in whole (see StagedJobWriter)
+STAGED_PUBLISH = os.environ.get("SCRAPE_STAGED", "0") == "1"
+# Rows per statement for IN (...) lookups, updates and deletes
+CHUNK_SIZE = 500
+MAX_AGE_DAYS = 25
+
+# Stage tables older than this belong to a scrape that died; younger ones may still be in use
+STAGE_STALE_HOURS = float(os.environ.get("SCRAPE_STAGE_STALE_HOURS", "6"))
+
+# Text columns of jobs from before the text moved to job_details
+LEGACY_TEXT_COLUMNS = ('job_summary', 'job_duties', 'requirements')
+
+STAGE_PREFIX = 'jobs_stage_'
+RETIRED_PREFIX = 'jobs_retired_'
+
+
+def chunks(items, size=CHUNK_SIZE):
+    """Split a list into consecutive slices of at most `size` items"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class JobWriter:
+    """Writes a scrape's results to the jobs table in short, bounded transactions"""
+
+    # Committed writes are seen by readers at once, and stay if the scrape fails later
+    live = True
+
+    def __init__(self, batch_size=COMMIT_BATCH):
+        self.batch_size = batch_size
+        self.pending = 0
+        self.table = Job.__table__
+
+    def begin(self):
+        """Prepare for writing; the live table needs no setup"""
+
+    def existing_ids(self, requisition_ids):
+        """Return the subset of requisition ids already stored"""
+        column = self.table.c.requisition_id
+        found = set()
+        for chunk in chunks(sorted(requisition_ids)):
+            found.update(db.session.execute(select(column).where(column.in_(chunk))).scalars())
+        return found
+
+    def touch(self, requisition_ids):
+        """Bump updated_at on jobs still listed, one commit per chunk"""
+        now = phoenix_now()
+        for chunk in chunks(sorted(requisition_ids)):
+            db.session.execute(update(self.table).where(self.table.c.requisition_id.in_(chunk)).values(updated_at=now))
+            db.session.commit()
+
+    def add(self, job):
+        """Stage a new job, committing once a batch has built up"""
+        db.session.add(job)
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.commit()
+
+    def commit(self):
+        db.session.commit()
+        self.pending = 0
+
+    def cleanup(self, current_requisition_ids, source=None):
+        """Delete jobs older than MAX_AGE_DAYS or no longer listed, in chunked statements.
+
+        With a source, only that source's jobs are candidates, so one board's
+        listing never removes another board's jobs.
+        """
+        column = self.table.c.requisition_id
+        scope = source_clause(self.table, source) if source is not None else true()
+        cutoff_date = phoenix_now() - timedelta(days=MAX_AGE_DAYS)
+        old_ids = list(db.session.execute(select(column).where(scope, self.table.c.scraped_at < cutoff_date)).scalars())
+        old = set(old_ids)
+        delisted_ids = [requisition_id for requisition_id in db.session.execute(select(column).where(scope)).scalars()
+                        if requisition_id not in current_requisition_ids and requisition_id not in old]
+
+        for chunk in chunks(old_ids + delisted_ids):
+            self.delete_details(chunk)
+            db.session.execute(delete(self.table).where(column.in_(chunk)))
+            db.session.commit()
+
+        total_removed = len(old_ids) + len(delisted_ids)
+        if total_removed > 0:
+            logger.info(f"Cleanup: Removed {len(old_ids)} jobs >{MAX_AGE_DAYS} days old and {len(delisted_ids)} jobs no longer on site")
+        return total_removed
+
+    def delete_details(self, requisition_ids):
+        # Bulk deletes skip the ORM cascade, so job_details rows go explicitly
+        db.session.execute(delete(JobDetail).where(JobDetail.requisition_id.in_(requisition_ids)))
+
+    def publish(self):
+        """Make the written data visible to readers; live writes already are"""
+
+    def abort(self):
+        """Give up on an unfinished scrape"""
+        db.session.rollback()
+
+
+class StagedJobWriter(JobWriter):
+    """Builds the next jobs table off to the side and swaps it in with one transaction.
+
+    begin() copies the live rows into jobs_stage_<n> without indexes, the
+    scrape and cleanup then write only to the copy, and publish() builds the
+    indexes before renaming the copy to jobs. Readers keep seeing the
+    previous complete table until the swap commits. Writes made to the live
+    jobs table by anything else during the scrape are lost at the swap.
+    Long text still goes straight to job_details, which is keyed by
+    requisition id; rows left without a job are removed after the swap.
+    """
+
+    live = False
+
+    def __init__(self, batch_size=COMMIT_BATCH):
+        super().__init__(batch_size)
+        self.generation = str(int(time.time() * 1000))
+        self.table = None
+        self.indexes = []
+        self.rows = []
+
+    def begin(self):
+        self.drop_leftovers()
+
+        name = f"{STAGE_PREFIX}{self.generation}"
+        self.table = Job.__table__.to_metadata(MetaData(), name=name)
+        # Indexes (named after the stage table) are built once the data is in
+        for index in self.table.indexes:
+            if name not in index.name:
+                # Explicitly named indexes would collide with the live table's
+                index.name = f"{index.name}_{self.generation}"
+        self.indexes = list(self.table.indexes)
+        self.table.indexes.clear()
+
+        with db.engine.begin() as connection:
+            self.table.create(connection)
+            columns = [column.name for column in Job.__table__.columns]
+            connection.execute(insert(self.table).from_select(columns, select(*Job.__table__.columns)))
+            if connection.dialect.name == 'postgresql':
+                # The copy keeps ids, so the stage's own sequence must start past them
+                connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), "
+                    f"COALESCE((SELECT MAX(id) FROM {name}), 0) + 1, false)"
+                ))
+        logger.info(f"Staging scrape in {name}")
+
+    def add(self, job):
+        # Core inserts skip the ORM events that normally render these
+        job.refresh_display()
+        job.refresh_location()
+        row = {}
+        for column in Job.__table__.columns:
+            if column.name == 'id':
+                continue
+            value = getattr(job, column.key)
+            # Nor do they apply column defaults to explicit NULLs; is_active would stay NULL
+            if value is None and column.default is not None and column.name != 'updated_at':
+                value = column.default.arg if column.default.is_scalar else column.default.arg(None)
+            row[column.name] = value
+        row['updated_at'] = row['updated_at'] or row['scraped_at']
+        self.rows.append(row)
+        if job.details is not None:
+            job.details.requisition_id = job.requisition_id
+            db.session.add(job.details)
+        if len(self.rows) >= self.batch_size:
+            self.commit()
+
+    def commit(self):
+        if self.rows:
+            db.session.execute(insert(self.table), self.rows)
+            self.rows = []
+        db.session.commit()
+
+    def delete_details(self, requisition_ids):
+        # Live jobs still show these details until the swap; orphans are removed afterwards
+        pass
+
+    def publish(self):
+        self.commit()
+        with db.engine.begin() as connection:
+            for index in self.indexes:
+                index.create(connection)
+
+        retired = f"{RETIRED_PREFIX}{self.generation}"
+        statements = [
+            f"ALTER TABLE {Job.__tablename__} RENAME TO {retired}",
+            f"ALTER TABLE {self.table.name} RENAME TO {Job.__tablename__}",
+            f"DROP TABLE {retired}"
+        ]
+        self.execute_atomically(statements)
+        logger.info(f"Published {self.table.name} as {Job.__tablename__}")
+
+        live_ids = select(Job.__table__.c.requisition_id)
+        removed = db.session.execute(delete(JobDetail).where(JobDetail.requisition_id.not_in(live_ids))).rowcount
+        db.session.commit()
+        if removed:
+            logger.info(f"Removed {removed} job_details rows left without a job")
+
+    def abort(self):
+        db.session.rollback()
+        if self.table is not None:
+            self.table.drop(db.engine, checkfirst=True)
+
+    def execute_atomically(self, statements):
+        """Run DDL in a single transaction, so readers see either the old or the new table"""
+        if db.engine.dialect.name == 'sqlite':
+            # pysqlite autocommits DDL unless a transaction is opened by hand
+            raw = db.engine.raw_connection()
+            try:
+                connection = raw.driver_connection
+                isolation_level = connection.isolation_level
+                connection.isolation_level = None
+                cursor = connection.cursor()
+                try:
+                    cursor.execute("BEGIN IMMEDIATE")
+                    for statement in statements:
+                        cursor.execute(statement)
+                    cursor.execute("COMMIT")
+                except Exception:
+                    cursor.execute("ROLLBACK")
+                    raise
+                finally:
+                    connection.isolation_level = isolation_level
+            finally:
+                raw.close()
+        else:
+            with db.engine.begin() as connection:
+                for statement in statements:
+                    connection.execute(text(statement))
+
+    def drop_leftovers(self):
+        """Drop stage and retired tables left by a scrape that died part way.
+
+        Tables are named after the millisecond their scrape started; those
+        younger than STAGE_STALE_HOURS may belong to a scrape of another
+        source still running, and are left alone.
+        """
+        cutoff = (time.time() - STAGE_STALE_HOURS * 3600) * 1000
+        for name in inspect(db.engine).get_table_names():
+            prefix = next((prefix for prefix in (STAGE_PREFIX, RETIRED_PREFIX) if name.startswith(prefix)), None)
+            if prefix is None:
+                continue
+            generation = name[len(prefix):]
+            if generation.isdigit() and int(generation) > cutoff:
+                continue
+            logger.warning(f"Dropping leftover table {name}")
+            with db.engine.begin() as connection:
+                connection.execute(text(f"DROP TABLE {name}"))
+
+
+def expire_closed_jobs(table=None):
+    """Mark postings past their closing date inactive, and reopen any whose date moved out.
+
+    Two set-based UPDATEs; rows with no is_active yet are settled either way.
+    Returns the number of postings whose state changed.
+    """
+    table = table if table is not None else Job.__table__
+    # Closing dates are dates, so a posting stays open through its closing day in Phoenix
+    start_of_today = phoenix_naive().replace(hour=0, minute=0, second=0, microsecond=0)
+    closed = table.c.closing_date < start_of_today
+
+    expired = db.session.execute(
+        update(table).where(or_(active_clause(table), table.c.is_active.is_(None)), closed)
+        .values(is_active=False, updated_at=table.c.updated_at)
+    ).rowcount
+    reopened = db.session.execute(
+        update(table).where(or_(table.c.is_active == false(), table.c.is_active.is_(None)),
+                            or_(table.c.closing_date.is_(None), not_(closed)))
+        .values(is_active=True, updated_at=table.c.updated_at)
+    ).rowcount
+    db.session.commit()
+
+    if expired or reopened:
+        logger.info(f"Expiry: {expired} postings closed, {reopened} marked open")
+    return expired + reopened
+
+
+def backfill_display_fields(batch_size=1000):
+    """Render the stored listing strings for jobs written before they existed"""
+    columns = (Job.id, Job.title, Job.url, Job.salary_min, Job.salary_max, Job.salary_text,
+               Job.closing_date, Job.scraped_at)
+    updated = 0
+    while True:
+        rows = db.session.query(*columns).filter(Job.title_html.is_(None)).limit(batch_size).all()
+        if not rows:
+            break
+        db.session.execute(update(Job), [{'id': row.id, **display_fields(row)} for row in rows])
+        db.session.commit()
+        updated += len(rows)
+    if updated:
+        logger.info(f"Rendered display fields for {updated} existing jobs")
+    return updated
+
+
+def backfill_coordinates():
+    """Geocode jobs written before locations were resolved, one update per distinct location"""
+    locations = [location for (location,) in db.session.query(Job.location).filter(
+        Job.place.is_(None), Job.location.isnot(None)).distinct()]
+    for location in locations:
+        db.session.execute(update(Job).where(Job.location == location, Job.place.is_(None))
+                           .values(**geocode_fields(location)))
+    db.session.commit()
+    if locations:
+        logger.info(f"Geocoded {len(locations)} distinct job locations")
+    return len(locations)
+
+
+def migrate_legacy_job_text(batch_size=500):
+    """Move job text still in the old jobs columns into compressed job_details rows, then drop those columns"""
+    existing = {column['name'] for column in inspect(db.engine).get_columns(Job.__tablename__)}
+    legacy = [name for name in LEGACY_TEXT_COLUMNS if name in existing]
+    if not legacy:
+        return 0
+
+    table = Table(Job.__tablename__, MetaData(), autoload_with=db.engine)
+    pending = or_(*(table.c[name].isnot(None) for name in legacy))
+    moved = 0
+    while True:
+        rows = db.session.execute(select(table.c.requisition_id, *(table.c[name] for name in legacy))
+                                  .where(pending).limit(batch_size)).all()
+        if not rows:
+            break
+        requisition_ids = [row.requisition_id for row in rows]
+        details = {detail.requisition_id: detail for detail in
+                   JobDetail.query.filter(JobDetail.requisition_id.in_(requisition_ids))}
+        for row in rows:
+            detail = details.get(row.requisition_id)
+            if detail is None:
+                detail = JobDetail(requisition_id=row.requisition_id)
+                db.session.add(detail)
+            for name in legacy:
+                # Text written since the split wins over the old copy
+                if getattr(row, name) is not None and getattr(detail, name) is None:
+                    setattr(detail, name, compress_text(getattr(row, name)))
+        db.session.execute(update(table).where(table.c.requisition_id.in_(requisition_ids))
+                           .values({name: None for name in legacy}))
+        db.session.commit()
+        moved += len(rows)
+
+    for name in legacy:
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE {Job.__tablename__} DROP COLUMN {name}"))
+        except Exception as e:
+            logger.warning(f"Could not drop {Job.__tablename__}.{name}, left empty: {str(e)}")
+    logger.info(f"Moved the text of {moved} jobs into job_details and dropped {', '.join(legacy)} from jobs")
+    return moved
+
+
+def backfill_sources():
+    """Attribute jobs written before there were several sources to the original board"""
+    updated = db.session.execute(update(Job).where(Job.source.is_(None))
+                                 .values(source=DEFAULT_SOURCE, updated_at=Job.updated_at)).rowcount
+    db.session.commit()
+    if updated:
+        logger.info(f"Set the source of {updated} existing jobs")
+    return updated
+
+
+def job_writer():
+    """Writer for the configured publish mode"""
+    return StagedJobWriter() if STAGED_PUBLISH else JobWriter()
@@ -0,0 +1,241 @@
+import cProfile
+import functools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+# Profile every scrape while set; touching PROFILE_DIR/next-scrape profiles just the next one
+PROFILE_SCRAPES = os.environ.get("PROFILE_SCRAPES", "0") == "1"
+# Requests slower than this get their sampled stacks saved; 0 turns request sampling off
+SLOW_REQUEST_MS = int(os.environ.get("PROFILE_SLOW_REQUEST_MS", "0"))
+SAMPLE_INTERVAL = int(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", "10")) / 1000
+# Newest profile files kept; older ones are deleted as new ones are written
+MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", "50"))
+
+NEXT_SCRAPE_FLAG = 'next-scrape'
+PROFILE_SUFFIXES = ('.pstats', '.collapsed')
+# Long-lived endpoints never sampled as slow requests
+UNSAMPLED_ENDPOINTS = {'jobs.api_events'}
+SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def collapse_stack(frame):
+    """Frame chain as a root-first "module:function;..." line, as flamegraph tools expect"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Background thread that samples the stacks of watched threads.
+
+    watch() starts counting stacks for a thread, unwatch() returns the
+    counts. Threads run unhindered; sampling costs one sys._current_frames()
+    call per interval, however many threads are watched.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self._watched = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def watch(self, thread_id, label=''):
+        with self._lock:
+            self._watched[thread_id] = (label, Counter())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+
+    def watching(self, thread_id):
+        with self._lock:
+            return thread_id in self._watched
+
+    def unwatch(self, thread_id):
+        with self._lock:
+            _, counts = self._watched.pop(thread_id, ('', Counter()))
+        return counts
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                watched = dict(self._watched)
+            if not watched:
+                continue
+            frames = sys._current_frames()
+            for thread_id, (label, counts) in watched.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    stack = collapse_stack(frame)
+                    counts[f"{label};{stack}" if label else stack] += 1
+
+
+sampler = StackSampler()
+
+
+def profile_path(kind, name, suffix):
+    stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    return os.path.join(PROFILE_DIR, f"{kind}-{stamp}-{SAFE_NAME.sub('_', name).strip('_')[:60]}{suffix}")
+
+
+def write_collapsed(path, counts):
+    with open(path, 'w') as f:
+        for stack, count in counts.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+def rotate_profiles():
+    """Delete the oldest profile files beyond MAX_FILES"""
+    files = list_profiles()
+    for entry in files[MAX_FILES:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, entry['name']))
+        except OSError:
+            pass
+
+
+def list_profiles():
+    """Saved profiles, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    entries = []
+    for name in os.listdir(PROFILE_DIR):
+        if name.endswith(PROFILE_SUFFIXES):
+            stat = os.stat(os.path.join(PROFILE_DIR, name))
+            entries.append({'name': name, 'size': stat.st_size, 'modified': stat.st_mtime})
+    entries.sort(key=lambda entry: entry['modified'], reverse=True)
+    for entry in entries:
+        entry['modified'] = datetime.fromtimestamp(entry['modified']).isoformat()
+    return entries
+
+
+def request_next_scrape_profile():
+    """Have the next scrape, in any process sharing PROFILE_DIR, run under the profiler"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    open(os.path.join(PROFILE_DIR, NEXT_SCRAPE_FLAG), 'w').close()
+
+
+def _claim_scrape_profile():
+    if PROFILE_SCRAPES:
+        return True
+    try:
+        # Removing the flag is the claim, so only one scrape takes it
+        os.remove(os.path.join(PROFILE_DIR, NEXT_SCRAPE_FLAG))
+        return True
+    except FileNotFoundError:
+        return False
+
+
+# Scraping thread id -> ids of the threads sampled for its profile, while it is profiled
+_scrape_threads = {}
+_scrape_threads_lock = threading.Lock()
+
+
+def pool_initializer():
+    """Initializer for a worker pool the calling scrape starts: its workers are sampled while the scrape is profiled"""
+    owner = threading.get_ident()
+    with _scrape_threads_lock:
+        if owner not in _scrape_threads:
+            return None
+
+    def watch_worker():
+        thread_id = threading.get_ident()
+        with _scrape_threads_lock:
+            threads = _scrape_threads.get(owner)
+            if threads is None:
+                return
+            threads.add(thread_id)
+        sampler.watch(thread_id, threading.current_thread().name)
+
+    return watch_worker
+
+
+def profile_scrape(func):
+    """Run a scrape entry point under cProfile and the stack sampler when requested.
+
+    cProfile sees only the calling thread and writes a .pstats file; the
+    sampler follows the calling thread and the workers of pools started with
+    pool_initializer(), so fetch workers show up in the .collapsed file but
+    web requests served meanwhile do not.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _claim_scrape_profile():
+            return func(*args, **kwargs)
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profiler = cProfile.Profile()
+        owner = threading.get_ident()
+        with _scrape_threads_lock:
+            _scrape_threads[owner] = {owner}
+        sampler.watch(owner, threading.current_thread().name)
+        started = time.monotonic()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            with _scrape_threads_lock:
+                watched = _scrape_threads.pop(owner)
+            counts = Counter()
+            for thread_id in watched:
+                counts.update(sampler.unwatch(thread_id))
+            base = profile_path('scrape', func.__name__, '')
+            profiler.dump_stats(f"{base}.pstats")
+            write_collapsed(f"{base}.collapsed", counts)
+            rotate_profiles()
+            logger.info(f"Profiled {func.__name__} in {time.monotonic() - started:.1f}s: {base}.pstats, {base}.collapsed")
+
+    return wrapper
+
+
+def init_app(app):
+    """Sample in-flight requests and keep the stacks of those slower than SLOW_REQUEST_MS.
+
+    Streaming responses are left out: they stay open by design, so their
+    duration says nothing about how slow the handler was.
+    """
+    if SLOW_REQUEST_MS <= 0:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def start_sampling():
+        if request.endpoint in UNSAMPLED_ENDPOINTS:
+            return
+        g.profile_started = time.monotonic()
+        sampler.watch(threading.get_ident())
+
+    @app.after_request
+    def skip_streams(response):
+        if response.is_streamed and g.pop('profile_started', None) is not None:
+            sampler.unwatch(threading.get_ident())
+        return response
+
+    @app.teardown_request
+    def save_slow_request(exc):
+        counts = sampler.unwatch(threading.get_ident())
+        started = g.pop('profile_started', None)
+        if started is None:
+            return
+        elapsed_ms = (time.monotonic() - started) * 1000
+        if elapsed_ms < SLOW_REQUEST_MS or not counts:
+            return
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = profile_path('request', f"{request.method}{request.path}", '.collapsed')
+            write_collapsed(path, counts)
+            rotate_profiles()
+            logger.warning(f"Slow request {request.method} {request.full_path} took {elapsed_ms:.0f}ms; stacks in {path}")
+        except OSError as e:
+            logger.error(f"Error saving request profile: {str(e)}")
@@ -0,0 +1,156 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from database import db
+from events import VersionedCache
+from models import ACTIVE, Job
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Serve index() and api_jobs() from memory instead of the database
+READ_MODEL_ENABLED = os.environ.get("READ_MODEL", "0") == "1"
+
+# Bytes of filter results kept per snapshot, least recently used first out
+RESULT_CACHE_BYTES = int(os.environ.get("READ_MODEL_RESULT_CACHE_BYTES", str(4 * 1024 * 1024)))
+
+class ReadModel:
+    """Immutable columnar snapshot of the open jobs for one data version.
+
+    Rows are held in scraped_at-descending order, so any filter result is
+    already sorted and a page is a slice. Titles, departments and locations
+    are interned to integer codes; substring filters on them are evaluated
+    once per distinct value rather than per row.
+    """
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.size = len(rows)
+
+        self.rows = [{
+            'title': row.title_html or '',
+            'department': row.department or '',
+            'location': row.location or '',
+            'employment_type': row.employment_type or '',
+            'salary': row.salary_display or '',
+            'closing_date': row.closing_date_display or '',
+            'scraped_at': row.scraped_at_display or ''
+        } for row in rows]
+
+        self.title_names, self.title_codes = self._intern([row.title for row in rows])
+        self.department_names, self.department_codes = self._intern([row.department for row in rows])
+        self.department_lookup = {name: code for code, name in enumerate(self.department_names)}
+        self.location_names, self.location_codes = self._intern([row.location for row in rows])
+        self.place_names, self.place_codes = self._intern([row.place for row in rows])
+        self.place_lookup = {name: code for code, name in enumerate(self.place_names)}
+        # Postings hidden when duplicates are collapsed: in a cluster but not its representative
+        self.duplicates = np.array([row.duplicate_cluster_id is not None and row.duplicate_cluster_id != row.requisition_id
+                                    for row in rows], dtype=bool)
+        self.salary_min = np.array([row.salary_min if row.salary_min is not None else np.nan for row in rows], dtype=np.float64)
+        self.salary_max = np.array([row.salary_max if row.salary_max is not None else np.nan for row in rows], dtype=np.float64)
+
+        self.departments = sorted(name for name in self.department_names if name)
+        self.locations = sorted(name for name in self.location_names if name)
+
+        self._results = OrderedDict()
+        self._results_bytes = 0
+        self._results_lock = threading.Lock()
+
+    @staticmethod
+    def _intern(values):
+        """Return (distinct names, int32 code per row); None becomes ''"""
+        codes = {}
+        row_codes = np.fromiter((codes.setdefault(value or '', len(codes)) for value in values),
+                                dtype=np.int32, count=len(values))
+        return list(codes), row_codes
+
+    def _codes_containing(self, names, needle):
+        needle = needle.lower()
+        return np.array([code for code, name in enumerate(names) if needle in name.lower()], dtype=np.int32)
+
+    def _contains(self, codes, names, needle):
+        return np.isin(codes, self._codes_containing(names, needle))
+
+    def filter(self, search='', department='', location='', salary_min=None, salary_max=None, any_field='',
+               places=None, collapse_duplicates=False):
+        """Row positions matching index()/api_jobs() filters, newest first; `places` is a frozenset"""
+        key = (search, department, location, salary_min, salary_max, any_field, places, collapse_duplicates)
+        with self._results_lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                self._results.move_to_end(key)
+        if cached is not None:
+            return cached
+
+        mask = np.ones(self.size, dtype=bool)
+        if search:
+            mask &= self._contains(self.title_codes, self.title_names, search)
+        if department:
+            mask &= self.department_codes == self.department_lookup.get(department, -1)
+        if location:
+            mask &= self._contains(self.location_codes, self.location_names, location)
+        if salary_min is not None:
+            mask &= self.salary_min >= salary_min
+        if salary_max is not None:
+            mask &= self.salary_max <= salary_max
+        if any_field:
+            mask &= (self._contains(self.title_codes, self.title_names, any_field)
+                     | self._contains(self.department_codes, self.department_names, any_field)
+                     | self._contains(self.location_codes, self.location_names, any_field))
+
+        if places is not None:
+            codes = [self.place_lookup[place] for place in places if place in self.place_lookup]
+            mask &= np.isin(self.place_codes, np.array(codes, dtype=np.int32))
+
+        if collapse_duplicates:
+            mask &= ~self.duplicates
+
+        positions = np.flatnonzero(mask)
+        if positions.nbytes <= RESULT_CACHE_BYTES:
+            with self._results_lock:
+                if key not in self._results:
+                    self._results[key] = positions
+                    self._results_bytes += positions.nbytes
+                while self._results_bytes > RESULT_CACHE_BYTES:
+                    _, evicted = self._results.popitem(last=False)
+                    self._results_bytes -= evicted.nbytes
+        return positions
+
+    def page(self, positions, start, length):
+        """DataTables rows for one page of a filter result; a negative length means all"""
+        # A negative start is the first page, as SQLite treats a negative OFFSET
+        start = max(start, 0)
+        selected = positions[start:] if length < 0 else positions[start:start + length]
+        return [self.rows[i] for i in selected]
+
+
+def build_read_model(version):
+    """Load the columns the read model needs in a single query"""
+    started = time.monotonic()
+    rows = (db.session.query(
+                Job.title, Job.title_html, Job.department, Job.location, Job.employment_type,
+                Job.salary_min, Job.salary_max, Job.salary_display,
+                Job.closing_date_display, Job.scraped_at_display, Job.place,
+                Job.requisition_id, Job.duplicate_cluster_id)
+            .filter(ACTIVE)
+            .order_by(Job.scraped_at.desc(), Job.id.desc())
+            .all())
+    model = ReadModel(version, rows)
+    logger.info(f"Built read model for version {version}: {model.size} jobs in {(time.monotonic() - started) * 1000:.0f}ms")
+    return model
+
+
+_read_models = VersionedCache(build_read_model)
+
+
+def current_read_model():
+    """Return the snapshot for the current data version, or None when the read model is off"""
+    if not READ_MODEL_ENABLED or np is None:
+        return None
+    return _read_models.get()
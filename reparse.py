@@ -0,0 +1,126 @@
+"""Re-run the detail page extractors over the HTML archive without touching the network.
+
+Usage: python reparse.py [--workers N] [--batch-size N]
+"""
+import argparse
+import logging
+import os
+import time
+from multiprocessing import Pool
+from sqlalchemy import func, insert, update
+from app import get_app
+from database import db
+from models import Job, JobDetail, ArchivedPage, compress_text, format_salary
+from html_archive import read_page
+from sources import get_source
+
+logger = logging.getLogger(__name__)
+
+DETAIL_FIELDS = ('job_summary', 'job_duties', 'requirements')
+
+
+def _reparse_page(task):
+    """Parse one archived page with its job's source; runs in a pool worker"""
+    requisition_id, source, content_hash = task
+    try:
+        details = get_source(source).parse_detail(read_page(content_hash))
+    except Exception as e:
+        return requisition_id, None, str(e)
+
+    # Compress here so the parent process only has to write
+    for field in DETAIL_FIELDS:
+        details[field] = compress_text(details.get(field))
+    return requisition_id, details, None
+
+
+def latest_detail_pages():
+    """Return [(requisition_id, source, content_hash)] for the newest archived copy of each job's page"""
+    newest = (db.session.query(ArchivedPage.url, func.max(ArchivedPage.fetched_at).label('fetched_at'))
+              .filter(ArchivedPage.kind == 'detail')
+              .group_by(ArchivedPage.url)
+              .subquery())
+    rows = (db.session.query(Job.requisition_id, Job.source, ArchivedPage.content_hash)
+            .join(ArchivedPage, ArchivedPage.url == Job.url)
+            .join(newest, (newest.c.url == ArchivedPage.url) & (newest.c.fetched_at == ArchivedPage.fetched_at))
+            .all())
+    # Two hashes can share a fetched_at; keep one per job
+    latest = {requisition_id: (source, content_hash) for requisition_id, source, content_hash in rows}
+    return [(requisition_id, source, content_hash) for requisition_id, (source, content_hash) in latest.items()]
+
+
+def write_batch(results, job_ids, existing_details):
+    """Bulk-update jobs and their detail rows from parsed results"""
+    job_rows = []
+    detail_updates = []
+    detail_inserts = []
+    for requisition_id, details in results:
+        job_rows.append({
+            'id': job_ids[requisition_id],
+            'salary_text': details.get('salary_text'),
+            'salary_min': details.get('salary_min'),
+            'salary_max': details.get('salary_max'),
+            'grade': details.get('grade'),
+            'salary_display': format_salary(details.get('salary_min'), details.get('salary_max'), details.get('salary_text'))
+        })
+        detail_row = {'requisition_id': requisition_id}
+        detail_row.update({field: details[field] for field in DETAIL_FIELDS})
+        if requisition_id in existing_details:
+            detail_updates.append(detail_row)
+        else:
+            detail_inserts.append(detail_row)
+
+    if job_rows:
+        db.session.execute(update(Job), job_rows)
+    if detail_updates:
+        db.session.execute(update(JobDetail), detail_updates)
+    if detail_inserts:
+        db.session.execute(insert(JobDetail), detail_inserts)
+    db.session.commit()
+
+
+def reparse(workers=None, batch_size=500):
+    """Re-extract every job with an archived detail page; returns the number updated"""
+    with get_app().app_context():
+        tasks = latest_detail_pages()
+        if not tasks:
+            logger.info("No archived detail pages to reparse")
+            return 0
+
+        job_ids = dict(db.session.query(Job.requisition_id, Job.id).all())
+        existing_details = {row[0] for row in db.session.query(JobDetail.requisition_id)}
+        logger.info(f"Reparsing {len(tasks)} archived pages with {workers or os.cpu_count()} workers")
+
+        started = time.monotonic()
+        updated = 0
+        failed = 0
+        batch = []
+        with Pool(processes=workers) as pool:
+            for requisition_id, details, error in pool.imap_unordered(_reparse_page, tasks, chunksize=16):
+                if error:
+                    failed += 1
+                    logger.error(f"Error reparsing {requisition_id}: {error}")
+                    continue
+                batch.append((requisition_id, details))
+                if len(batch) >= batch_size:
+                    write_batch(batch, job_ids, existing_details)
+                    updated += len(batch)
+                    batch = []
+        write_batch(batch, job_ids, existing_details)
+        updated += len(batch)
+
+        # Salaries and grades may have changed under every cached view
+        from events import bus
+        bus.publish('reparse', updated_count=updated)
+
+        elapsed = time.monotonic() - started
+        logger.info(f"Reparse completed. {updated} jobs updated, {failed} failed in {elapsed:.1f}s "
+                    f"({updated / elapsed * 60 if elapsed else 0:.0f} pages/min)")
+        return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--batch-size', type=int, default=500, help="Rows written per commit")
+    args = parser.parse_args()
+    reparse(workers=args.workers, batch_size=args.batch_size)
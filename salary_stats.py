@@ -0,0 +1,154 @@
+import bisect
+import logging
+import statistics
+import threading
+import time
+from sqlalchemy import func
+from database import db
+from events import VersionedCache
+from models import ACTIVE, Job
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+GROUP_COLUMNS = {
+    'department': Job.department,
+    'grade': Job.grade,
+    'location': Job.location,
+    'employment_type': Job.employment_type
+}
+DEFAULT_BUCKETS = 10
+MAX_BUCKETS = 50
+PERCENTILES = (10, 25, 50, 75, 90)
+
+class SalaryStats:
+    """Salary aggregates for one data version, computed at most once per grouping.
+
+    Each job counts once, at the midpoint of its annual salary range.
+    Counts, min, max and mean come from a SQL GROUP BY; percentiles and
+    histograms need the values themselves, which are loaded in one query
+    and split by group. All groups share the same histogram edges so their
+    buckets line up on a dashboard.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def get(self, group_by, buckets=DEFAULT_BUCKETS):
+        key = (group_by, buckets)
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                started = time.monotonic()
+                result = compute_stats(GROUP_COLUMNS[group_by], buckets)
+                result.update(version=self.version, group_by=group_by)
+                self._results[key] = result
+                logger.info(f"Computed salary stats by {group_by} for version {self.version} in {(time.monotonic() - started) * 1000:.0f}ms")
+        return result
+
+
+def salary_midpoint():
+    return (Job.salary_min + Job.salary_max) / 2
+
+
+def compute_stats(column, buckets):
+    """Aggregate open postings' salaries overall and per value of `column`"""
+    midpoint = salary_midpoint()
+    aggregates = (func.count(Job.id), func.count(Job.salary_min), func.min(Job.salary_min),
+                  func.max(Job.salary_max), func.avg(midpoint))
+
+    overall = db.session.query(*aggregates).filter(ACTIVE).one()
+    grouped = db.session.query(column, *aggregates).filter(ACTIVE).group_by(column).all()
+    pairs = (db.session.query(column, midpoint)
+             .filter(ACTIVE, Job.salary_min.isnot(None), Job.salary_max.isnot(None))
+             .all())
+
+    values_by_group = {}
+    for key, value in pairs:
+        values_by_group.setdefault(key, []).append(value)
+    all_values = [value for _, value in pairs]
+    edges = histogram_edges(all_values, buckets)
+
+    summarize = summarize_numpy if np is not None else summarize_python
+    groups = []
+    for key, *row in grouped:
+        group = summary(row)
+        group['key'] = key or ''
+        group.update(summarize(values_by_group.get(key, []), edges))
+        groups.append(group)
+    groups.sort(key=lambda group: (-group['count'], group['key']))
+
+    total = summary(overall)
+    total.update(summarize(all_values, edges))
+    return {'overall': total, 'groups': groups}
+
+
+def summary(row):
+    count, with_salary, salary_min, salary_max, mean = row
+    return {
+        'count': count,
+        'with_salary': with_salary,
+        'min': salary_min,
+        'max': salary_max,
+        'mean': round(mean, 2) if mean is not None else None
+    }
+
+
+def histogram_edges(values, buckets):
+    """Equal-width bucket edges spanning every salary"""
+    if not values:
+        return []
+    low, high = min(values), max(values)
+    if low == high:
+        high = low + 1
+    width = (high - low) / buckets
+    # The outer edges stay exact; rounding them could leave the lowest or highest salary outside every bucket
+    return [low] + [round(low + width * i, 2) for i in range(1, buckets)] + [high]
+
+
+def histogram(counts, edges):
+    return [{'from': edges[i], 'to': edges[i + 1], 'count': int(count)} for i, count in enumerate(counts)]
+
+
+def summarize_numpy(values, edges):
+    """Percentiles and histogram for one group, vectorized"""
+    if not values:
+        return {'percentiles': {}, 'histogram': histogram([0] * (len(edges) - 1), edges) if edges else []}
+    array = np.asarray(values, dtype=np.float64)
+    percentiles = np.percentile(array, PERCENTILES)
+    counts, _ = np.histogram(array, bins=np.asarray(edges, dtype=np.float64))
+    return {
+        'percentiles': {f"p{p}": round(float(value), 2) for p, value in zip(PERCENTILES, percentiles)},
+        'histogram': histogram(counts, edges)
+    }
+
+
+def summarize_python(values, edges):
+    """Same as summarize_numpy, for installs without NumPy"""
+    counts = [0] * max(len(edges) - 1, 0)
+    if not values:
+        return {'percentiles': {}, 'histogram': histogram(counts, edges) if edges else []}
+    # Matches NumPy's default linear interpolation
+    cuts = statistics.quantiles(values, n=100, method='inclusive') if len(values) > 1 else [values[0]] * 99
+    for value in values:
+        # The last bucket includes its upper edge, as in np.histogram
+        counts[min(bisect.bisect_right(edges, value) - 1, len(counts) - 1)] += 1
+    return {
+        'percentiles': {f"p{p}": round(cuts[p - 1], 2) for p in PERCENTILES},
+        'histogram': histogram(counts, edges)
+    }
+
+
+# Creating a holder is free; its groupings are computed on first request
+_salary_stats = VersionedCache(SalaryStats, serve_stale=False)
+
+
+def current_salary_stats():
+    """Return the aggregates holder for the current data version"""
+    return _salary_stats.get()
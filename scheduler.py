@@ -1,11 +1,19 @@
 import logging
+import os
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 import pytz
 from scraper import scrape_jobs
+from sources import DEFAULT_SOURCE, enabled_sources, get_source, schedule_slots
 
 logger = logging.getLogger(__name__)
 
+# Scrape through the durable crawl queue (crawl_queue.py) instead of in one transaction
+USE_CRAWL_QUEUE = os.environ.get("SCRAPE_QUEUE", "0") == "1"
+# Minutes between sweeps that close postings past their closing date
+EXPIRY_INTERVAL_MINUTES = int(os.environ.get("EXPIRY_INTERVAL_MINUTES", "15"))
+
 def start_scheduler():
     """Start the background scheduler for automatic scraping"""
     scheduler = BackgroundScheduler()
@@ -13,47 +21,92 @@ def start_scheduler():
     # Phoenix timezone
     phoenix_tz = pytz.timezone('America/Phoenix')
     
-    # Schedule scraping 4 times a day: 6 AM, 10 AM, 2 PM, 6 PM Phoenix time
-    scraping_times = [
-        {'hour': 6, 'minute': 0},   # 6:00 AM
-        {'hour': 10, 'minute': 0},  # 10:00 AM
-        {'hour': 14, 'minute': 0},  # 2:00 PM
-        {'hour': 18, 'minute': 0}   # 6:00 PM
-    ]
-    
-    for time_config in scraping_times:
+    # Each source is scraped at its own Phoenix hours; the original board at 6 AM, 10 AM, 2 PM and 6 PM
+    for hour, source_names in schedule_slots(enabled_sources()).items():
         trigger = CronTrigger(
-            hour=time_config['hour'],
-            minute=time_config['minute'],
+            hour=hour,
+            minute=0,
             timezone=phoenix_tz
         )
         
         scheduler.add_job(
             func=scheduled_scrape,
+            args=[source_names],
             trigger=trigger,
-            id=f"scrape_{time_config['hour']}_{time_config['minute']}",
-            name=f"Scrape jobs at {time_config['hour']}:{time_config['minute']:02d} Phoenix time",
+            id=f"scrape_{hour}_0",
+            name=f"Scrape {', '.join(source_names)} at {hour}:00 Phoenix time",
             replace_existing=True,
             max_instances=1
         )
         
-        logger.info(f"Scheduled scraping at {time_config['hour']}:{time_config['minute']:02d} Phoenix time")
+        logger.info(f"Scheduled scraping of {', '.join(source_names)} at {hour}:00 Phoenix time")
     
+    # Close postings between scrapes, so listings drop them on their closing day
+    scheduler.add_job(
+        func=expire_postings,
+        trigger=IntervalTrigger(minutes=EXPIRY_INTERVAL_MINUTES, timezone=phoenix_tz),
+        id="expire_postings",
+        name="Close postings past their closing date",
+        replace_existing=True,
+        max_instances=1
+    )
+
+    if USE_CRAWL_QUEUE:
+        # Finish a crawl that a restart interrupted instead of waiting for the next slot
+        scheduler.add_job(
+            func=resume_crawl,
+            id="resume_crawl",
+            name="Resume an interrupted crawl",
+            replace_existing=True
+        )
+
     # Start the scheduler
     scheduler.start()
     logger.info("Job scheduler started successfully")
     
     return scheduler
 
-def scheduled_scrape():
+def scheduled_scrape(source_names=(DEFAULT_SOURCE,)):
     """Function called by scheduler to scrape jobs"""
     try:
         logger.info("Starting scheduled job scraping...")
-        jobs_scraped = scrape_jobs()
+        if list(source_names) != [DEFAULT_SOURCE]:
+            from crawl_runner import run_sources
+            jobs_scraped = run_sources([get_source(name) for name in source_names])
+        elif USE_CRAWL_QUEUE:
+            from crawl_queue import run_crawl
+            jobs_scraped = run_crawl()
+        else:
+            jobs_scraped = scrape_jobs()
         logger.info(f"Scheduled scraping completed. {jobs_scraped} new jobs added.")
     except Exception as e:
         logger.error(f"Error during scheduled scraping: {str(e)}")
 
+def expire_postings():
+    """Function called by scheduler to mark closed postings inactive"""
+    try:
+        from app import get_app
+        from persistence import expire_closed_jobs
+        with get_app().app_context():
+            changed = expire_closed_jobs()
+            if changed:
+                # A closed representative would otherwise hide its still-open duplicates
+                from scraper import group_duplicate_postings
+                group_duplicate_postings()
+                # Caches keyed on the data version must pick up the change
+                from events import bus
+                bus.publish('expiry', updated_count=changed)
+    except Exception as e:
+        logger.error(f"Error expiring closed postings: {str(e)}")
+
+def resume_crawl():
+    """Function called once at startup to finish an interrupted crawl"""
+    try:
+        from crawl_queue import resume_unfinished_crawl
+        resume_unfinished_crawl()
+    except Exception as e:
+        logger.error(f"Error resuming crawl: {str(e)}")
+
 if __name__ == "__main__":
     # For testing the scheduler
     import time
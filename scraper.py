@@ -3,18 +3,56 @@ from bs4 import BeautifulSoup
 import re
 import time
 import logging
-import pytz
-from datetime import datetime, timedelta
-from urllib.parse import urljoin, urlparse
-from app import app, db
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from urllib.parse import urlparse
+from app import get_app, init_db
+from database import db
 from models import Job
+from html_archive import archive_page, prune_archive
+from fetch_controller import FetchController, looks_like_challenge
+from profiling import pool_initializer, profile_scrape
+from session_store import cookies_from_requests, discard_session, load_session, save_session
+from persistence import JobWriter, chunks, expire_closed_jobs, job_writer
+from sources import DEFAULT_SOURCE, get_source, parse_date
 
 logger = logging.getLogger(__name__)
 
+# Annual hours used to turn an hourly rate into a salary
+HOURS_PER_YEAR = 2080
+# Salaries below this are taken to be hourly rates
+HOURLY_RATE_CEILING = 200
+SALARY_UNIT_PATTERN = r'((?:per|an|a|/)?[^\S\n]*(?:hourly|hour|hr|monthly|month|biweekly|weekly|week|annually|annual|year|yr)\b)'
+SALARY_PERIODS = (('biweekly', 26), ('hour', HOURS_PER_YEAR), ('hr', HOURS_PER_YEAR), ('month', 12),
+                  ('week', 52), ('annual', 1), ('year', 1), ('yr', 1))
+
+
+def salary_unit(text):
+    """Pay period stated right after a salary on the same line, e.g. " per hour", or ''"""
+    match = re.match(r'[^\S\n]*' + SALARY_UNIT_PATTERN, text, re.IGNORECASE)
+    return f" {match.group(1).strip()}" if match else ''
+
+
+def salary_period_multiplier(salary_text):
+    """Pay periods per year named in salary text, or None when it names none"""
+    lowered = salary_text.lower()
+    for word, periods in SALARY_PERIODS:
+        if re.search(rf'\b{word}', lowered):
+            return periods
+    return None
+
+
 class AZStateJobsScraper:
-    def __init__(self):
-        self.base_url = "https://www.azstatejobs.gov"
-        self.search_url = "https://www.azstatejobs.gov/jobs/search"
+    """Fetches a source over plain HTTP; the source supplies the URLs and parsers"""
+
+    def __init__(self, base_url=None, request_delay=None, source=None):
+        self.source = source or get_source(DEFAULT_SOURCE)
+        if base_url:
+            self.source = self.source.with_base_url(base_url)
+        self.base_url = self.source.base_url
+        self.search_url = self.source.listing_url
+        # Seconds between job requests; the warm-up waits are multiples of it
+        self.request_delay = request_delay if request_delay is not None else self.source.request_delay
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -32,21 +70,26 @@ class AZStateJobsScraper:
             'Upgrade-Insecure-Requests': '1',
             'Connection': 'keep-alive'
         })
+        # Retries, timeouts and per-host concurrency; request_delay spaces out request starts
+        self.fetcher = FetchController(self.session, min_interval=self.request_delay,
+                                       max_concurrency=self.source.max_concurrency)
 
     def get_job_listings(self):
         """Scrape the main job search page to get job listings"""
         try:
-            # First, visit the homepage to establish a session
-            logger.info("Establishing session by visiting homepage...")
-            homepage_response = self.session.get(self.base_url, timeout=30)
-            logger.info(f"Homepage response status: {homepage_response.status_code}")
+            response = self.resume_session()
+            if response is None:
+                # First, visit the homepage to establish a session
+                logger.info("Establishing session by visiting homepage...")
+                homepage_response = self.fetcher.get(self.base_url)
+                logger.info(f"Homepage response status: {homepage_response.status_code}")
 
-            # Wait a bit to seem more human-like
-            time.sleep(2)
+                # Wait a bit to seem more human-like
+                time.sleep(2 * self.request_delay)
 
-            # Now try the search page
-            logger.info("Fetching job listings from main search page...")
-            response = self.session.get(self.search_url, timeout=30)
+                # Now try the search page
+                logger.info("Fetching job listings from main search page...")
+                response = self.fetcher.get(self.search_url)
 
             # Log response details for debugging
             logger.info(f"Response status: {response.status_code}")
@@ -60,22 +103,16 @@ class AZStateJobsScraper:
                 page_text = response.text # Fallback to requests' default decoding
 
             # Check if we got a bot challenge
-            if b"JavaScript is disabled" in response.content or b"verify that you're not a robot" in response.content:
+            if looks_like_challenge(response.content):
                 logger.warning("Detected bot challenge page - trying alternative approach")
 
                 # Try different URL variations
-                alternative_urls = [
-                    "https://www.azstatejobs.gov/jobs/search?query=",
-                    "https://www.azstatejobs.gov/jobs",
-                    "https://www.azstatejobs.gov/jobs/search?page=1"
-                ]
-
-                for alt_url in alternative_urls:
+                for alt_url in self.source.alternate_listing_urls:
                     logger.info(f"Trying alternative URL: {alt_url}")
-                    time.sleep(3)  # Wait between attempts
-                    response = self.session.get(alt_url, timeout=30)
+                    time.sleep(3 * self.request_delay)  # Wait between attempts
+                    response = self.fetcher.get(alt_url)
 
-                    if b"JavaScript is disabled" not in response.content and response.status_code == 200:
+                    if not looks_like_challenge(response.content) and response.status_code == 200:
                         logger.info(f"Success with alternative URL: {alt_url}")
                         try:
                             page_text = response.content.decode('utf-8', errors='replace')
@@ -94,110 +131,105 @@ class AZStateJobsScraper:
 
             response.raise_for_status()
 
-            soup = BeautifulSoup(page_text, 'html.parser')
-
-            # Log some page content for debugging
-            page_text_preview = soup.get_text()[:500]  # First 500 chars
-            logger.info(f"Page content preview: {page_text_preview}")
-
-            # Find the jobs table
-            jobs_table = soup.find('table')
-            if not jobs_table:
-                logger.error("Could not find jobs table on the page")
-                # Log all tables found for debugging
-                all_tables = soup.find_all('table')
-                logger.info(f"Found {len(all_tables)} tables on the page")
-                return []
-
-            jobs = []
-            tbody = jobs_table.find('tbody')
-            rows = tbody.find_all('tr') if tbody else []
-
-            for row in rows:
-                try:
-                    cells = row.find_all('td')
-                    if len(cells) < 7:
-                        continue
-
-                    # Extract job information
-                    title_cell = cells[0]
-                    title_link = title_cell.find('a')
-                    if not title_link:
-                        continue
-
-                    # Clean category text by replacing newlines and extra spaces
-                    category_text = cells[2].get_text(strip=True).replace('\n', ' ').replace('  ', ' ')
-
-                    job_data = {
-                        'title': title_link.get_text(strip=True),
-                        'url': urljoin(self.base_url, title_link.get('href')),
-                        'requisition_id': cells[1].get_text(strip=True),
-                        'category': category_text,
-                        'department': cells[3].get_text(strip=True),
-                        'employment_type': cells[4].get_text(strip=True),
-                        'location': cells[5].get_text(strip=True),
-                        'closing_date': self.parse_date(cells[6].get_text(strip=True)),
-                        'postsecondary_required': cells[7].get_text(strip=True) if len(cells) > 7 else None
-                    }
-
-                    jobs.append(job_data)
-
-                except Exception as e:
-                    logger.error(f"Error parsing job row: {str(e)}")
-                    continue
+            archive_page(response.url, response.content, 'listing')
 
-            logger.info(f"Found {len(jobs)} job listings")
-            return jobs
+            job_listings = self.source.parse_listing(page_text)
+            if job_listings:
+                save_session(self.source.session_key, cookies_from_requests(self.session.cookies), self.session.headers)
+            return job_listings
 
         except Exception as e:
             logger.error(f"Error fetching job listings: {str(e)}")
             return []
 
-    def get_job_details(self, job_url):
-        """Scrape individual job page for salary and other details"""
-        try:
-            logger.debug(f"Fetching job details from: {job_url}")
-            response = self.session.get(job_url, timeout=30)
-            response.raise_for_status()
-
-            # Use the properly decoded text instead of raw content
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            details = {}
-
-            # Extract salary information
-            salary_text = self.extract_salary(soup)
-            if salary_text:
-                details['salary_text'] = salary_text
-                salary_min, salary_max = self.parse_salary_range(salary_text)
-                details['salary_min'] = salary_min
-                details['salary_max'] = salary_max
-
-            # Extract grade
-            grade_text = self.extract_grade(soup)
-            if grade_text:
-                details['grade'] = grade_text
-
-            # Extract job summary
-            job_summary = self.extract_job_summary(soup)
-            if job_summary:
-                details['job_summary'] = job_summary
-
-            # Extract job duties
-            job_duties = self.extract_job_duties(soup)
-            if job_duties:
-                details['job_duties'] = job_duties
-
-            # Extract requirements
-            requirements = self.extract_requirements(soup)
-            if requirements:
-                details['requirements'] = requirements
+    def resume_session(self):
+        """Fetch the listing with the saved session, skipping the warm-up; None when there is none or it was refused"""
+        saved = load_session(self.source.session_key)
+        if saved is None:
+            return None
+        saved.apply_to_requests(self.session)
+        logger.info("Fetching job listings with the saved session...")
+        response = self.fetcher.get(self.search_url)
+        if response.status_code == 200 and response.content and not looks_like_challenge(response.content):
+            return response
+        logger.info(f"Saved session refused (status {response.status_code}); warming up a new one")
+        discard_session(self.source.session_key)
+        self.session.cookies.clear()
+        return None
 
-            return details
+    def get_job_details(self, job_url):
+        """Fetch, archive and parse a single job page; {} if it could not be fetched"""
+        return self.fetch_job_details([{'url': job_url}]).get(job_url, {})
 
-        except Exception as e:
-            logger.error(f"Error fetching job details from {job_url}: {str(e)}")
+    def fetch_detail_pages(self, job_urls):
+        """Fetch job pages concurrently within the fetch controller's limits; returns {url: content or None}"""
+        def fetch(job_url):
+            try:
+                response = self.fetcher.get(job_url)
+                response.raise_for_status()
+                if looks_like_challenge(response.content):
+                    logger.warning(f"Bot challenge instead of job details at {job_url}")
+                    return job_url, None
+                return job_url, response.content
+            except Exception as e:
+                logger.error(f"Error fetching job details from {job_url}: {str(e)}")
+                return job_url, None
+
+        if not job_urls:
             return {}
+        with ThreadPoolExecutor(max_workers=self.fetcher.max_concurrency, initializer=pool_initializer()) as pool:
+            return dict(pool.map(fetch, job_urls))
+
+    def fetch_job_details(self, job_listings):
+        """Fetch, archive and parse the job pages of a batch of listings; returns {url: fields}"""
+        detail_pages = self.fetch_detail_pages([job['url'] for job in job_listings])
+        details = {}
+        for job_url, content in detail_pages.items():
+            if not content:
+                continue
+            try:
+                archive_page(job_url, content, 'detail')
+                details[job_url] = self.source.parse_detail(content)
+            except Exception as e:
+                logger.error(f"Error parsing job details from {job_url}: {str(e)}")
+        return details
+
+    def parse_job_details(self, content):
+        """Extract salary and other details from a job page's HTML"""
+        # Use the properly decoded text instead of raw content
+        soup = BeautifulSoup(content, 'html.parser')
+
+        details = {}
+
+        # Extract salary information
+        salary_text = self.extract_salary(soup)
+        if salary_text:
+            details['salary_text'] = salary_text
+            salary_min, salary_max = self.parse_salary_range(salary_text)
+            details['salary_min'] = salary_min
+            details['salary_max'] = salary_max
+
+        # Extract grade
+        grade_text = self.extract_grade(soup)
+        if grade_text:
+            details['grade'] = grade_text
+
+        # Extract job summary
+        job_summary = self.extract_job_summary(soup)
+        if job_summary:
+            details['job_summary'] = job_summary
+
+        # Extract job duties
+        job_duties = self.extract_job_duties(soup)
+        if job_duties:
+            details['job_duties'] = job_duties
+
+        # Extract requirements
+        requirements = self.extract_requirements(soup)
+        if requirements:
+            details['requirements'] = requirements
+
+        return details
 
     def extract_salary(self, soup):
         """Extract salary information from job page"""
@@ -205,10 +237,10 @@ class AZStateJobsScraper:
 
         # Look for salary in Posting Details section specifically
         # Pattern 1: Single salary amount "Salary: $40,207.02"
-        single_salary_match = re.search(r'Salary:\s*\$?([\d,]+(?:\.\d{2})?)\s*(?:\n|$)', text, re.IGNORECASE)
+        single_salary_match = re.search(r'Salary:\s*\$?([\d,]+(?:\.\d{2})?)[^\S\n]*' + SALARY_UNIT_PATTERN + r'?\s*(?:\n|$)', text, re.IGNORECASE)
         if single_salary_match:
             salary_val = single_salary_match.group(1).replace(',', '')
-            return f"${salary_val}"
+            return f"${salary_val}{salary_unit(text[single_salary_match.end(1):])}"
 
         # Pattern 2: Salary range "Salary: $40,207.02 - $45,000"
         range_patterns = [
@@ -222,7 +254,7 @@ class AZStateJobsScraper:
                 if len(match.groups()) == 2:
                     min_sal = match.group(1).replace('$', '').replace(',', '')
                     max_sal = match.group(2).replace('$', '').replace(',', '')
-                    return f"${min_sal} - ${max_sal}"
+                    return f"${min_sal} - ${max_sal}{salary_unit(text[match.end():match.end() + 40])}"
 
         # Pattern 3: Look for salary after "Posting Details:" heading
         posting_details_idx = text.find('Posting Details:')
@@ -234,7 +266,7 @@ class AZStateJobsScraper:
             salary_match = re.search(r'Salary:\s*\$?([\d,]+(?:\.\d{2})?)', details_section, re.IGNORECASE)
             if salary_match:
                 salary_val = salary_match.group(1).replace(',', '')
-                return f"${salary_val}"
+                return f"${salary_val}{salary_unit(details_section[salary_match.end():salary_match.end() + 40])}"
 
         return None
 
@@ -277,147 +309,184 @@ class AZStateJobsScraper:
         return None
 
     def parse_salary_range(self, salary_text):
-        """Parse salary range from text"""
+        """Parse salary range from text as annual amounts; a single salary gives min == max"""
         if not salary_text:
             return None, None
 
         # Remove $ and commas, extract numbers
-        numbers = re.findall(r'[\d,]+(?:\.\d{2})?', salary_text.replace('$', '').replace(',', ''))
+        numbers = re.findall(r'\d+(?:\.\d+)?', salary_text.replace('$', '').replace(',', ''))
+        if not numbers:
+            return None, None
 
-        if len(numbers) >= 2:
-            try:
-                salary_min = float(numbers[0].replace(',', ''))
-                salary_max = float(numbers[1].replace(',', ''))
-                return salary_min, salary_max
-            except ValueError:
-                pass
+        try:
+            values = [float(number) for number in numbers[:2]]
+        except ValueError:
+            return None, None
+        salary_min, salary_max = values[0], values[-1]
 
-        return None, None
+        periods = salary_period_multiplier(salary_text)
+        if periods is None:
+            # Postings often give an hourly rate with no unit; no annual salary is this low
+            periods = HOURS_PER_YEAR if salary_max < HOURLY_RATE_CEILING else 1
+        return round(salary_min * periods, 2), round(salary_max * periods, 2)
 
     def parse_date(self, date_text):
         """Parse date string to datetime object"""
-        if not date_text or date_text.strip() == '':
-            return None
-
-        try:
-            # Try different date formats
-            formats = [
-                '%b %d %Y - %H:%M %Z',
-                '%b %d %Y',
-                '%m/%d/%Y',
-                '%Y-%m-%d'
-            ]
-
-            for fmt in formats:
+        return parse_date(date_text)
+
+@lru_cache(maxsize=1)
+def _detail_parser():
+    return AZStateJobsScraper()
+
+def parse_job_page(content):
+    """Fields the shared extractors find on a job page, for sources without their own parser"""
+    return _detail_parser().parse_job_details(content)
+
+def new_job_from_listing(job_data):
+    """Build a Job from a listing row merged with the fields parsed from its detail page"""
+    return Job(
+        requisition_id=job_data['requisition_id'],
+        source=job_data.get('source', DEFAULT_SOURCE),
+        title=job_data['title'],
+        department=job_data['department'],
+        location=job_data['location'],
+        employment_type=job_data['employment_type'],
+        category=job_data['category'],
+        closing_date=job_data['closing_date'],
+        postsecondary_required=job_data['postsecondary_required'],
+        url=job_data['url'],
+        salary_text=job_data.get('salary_text'),
+        salary_min=job_data.get('salary_min'),
+        salary_max=job_data.get('salary_max'),
+        grade=job_data.get('grade'),
+        job_summary=job_data.get('job_summary'),
+        job_duties=job_data.get('job_duties'),
+        requirements=job_data.get('requirements')
+    )
+
+def cleanup_old_jobs(current_requisition_ids, source=None):
+    """Remove jobs that are >25 days old or no longer on the official site"""
+    with get_app().app_context():
+        return JobWriter().cleanup(current_requisition_ids, source)
+
+def queue_saved_search_alerts(requisition_ids):
+    """Write saved-search matches for new jobs to the alert outbox"""
+    try:
+        from alerts import queue_alerts
+        return queue_alerts(requisition_ids)
+    except Exception as e:
+        logger.error(f"Error queueing saved-search alerts: {str(e)}")
+        db.session.rollback()
+        return 0
+
+def group_duplicate_postings(table=None):
+    """Recompute near-duplicate clusters; a failure leaves the previous clusters in place"""
+    try:
+        from dedup import assign_duplicate_clusters
+        return assign_duplicate_clusters(table)
+    except Exception as e:
+        logger.error(f"Error grouping duplicate postings: {str(e)}")
+        db.session.rollback()
+        return 0
+
+def store_scrape(source, job_listings, fetch_details=None, event_source=None):
+    """Write one source's listings to the database; every backend and source goes through here.
+
+    Known jobs are touched, new ones are written a batch per transaction,
+    and the source's jobs that are no longer listed are removed.
+    fetch_details(batch) returns {url: fields} for a batch of new listings;
+    without it new jobs keep only their listing fields. Runs in an app
+    context and returns the number of new jobs.
+    """
+    if not job_listings:
+        # Cleaning up against an empty listing would delete every job of the source
+        logger.error(f"No listings from {source.name}; keeping its stored jobs")
+        return 0
+
+    writer = job_writer()
+    jobs_scraped = 0
+    jobs_committed = 0
+    new_requisition_ids = []
+
+    try:
+        # Release the write lock taken by the listing's archive entry before fetching details
+        db.session.commit()
+        writer.begin()
+        current_requisition_ids = {job['requisition_id'] for job in job_listings}
+
+        existing_ids = writer.existing_ids(current_requisition_ids)
+        writer.touch(existing_ids)
+
+        new_listings = []
+        for job_data in job_listings:
+            if job_data['requisition_id'] not in existing_ids:
+                existing_ids.add(job_data['requisition_id'])
+                new_listings.append(job_data)
+
+        # Fetch a batch of detail pages concurrently, then write it in one short transaction
+        for batch in chunks(new_listings, writer.batch_size):
+            details = fetch_details(batch) if fetch_details else {}
+            for job_data in batch:
                 try:
-                    return datetime.strptime(date_text.strip(), fmt)
-                except ValueError:
-                    continue
+                    # Merge job data with details
+                    job_data.update(details.get(job_data['url']) or {})
 
-            # If no format worked, try to extract just the date part
-            date_match = re.search(r'(\w{3} \d{1,2} \d{4})', date_text)
-            if date_match:
-                return datetime.strptime(date_match.group(1), '%b %d %Y')
+                    writer.add(new_job_from_listing(job_data))
+                    new_requisition_ids.append(job_data['requisition_id'])
+                    jobs_scraped += 1
+                    logger.info(f"Added new job: {job_data['requisition_id']} - {job_data['title']}")
 
-        except Exception as e:
-            logger.error(f"Error parsing date '{date_text}': {str(e)}")
-
-        return None
+                except Exception as e:
+                    logger.error(f"Error processing job {job_data.get('requisition_id', 'unknown')}: {str(e)}")
+                    continue
+            writer.commit()
+            if writer.live:
+                jobs_committed = jobs_scraped
+
+        logger.info(f"Scraping {source.name} completed. {jobs_scraped} new jobs added.")
+
+        # Clean up old and removed jobs, then make the result visible
+        jobs_removed = writer.cleanup(current_requisition_ids, source.name)
+        # Touching updated_at changes nothing a reader sees; postings closing or reopening do
+        jobs_updated = expire_closed_jobs(writer.table)
+        group_duplicate_postings(writer.table)
+        writer.publish()
+
+    except Exception as e:
+        logger.error(f"Error storing jobs from {source.name}: {str(e)}")
+        writer.abort()
+        if not writer.live:
+            return 0
+        # Batches written before the failure are already live; readers and alerts must still hear of them
+        new_requisition_ids = new_requisition_ids[:jobs_committed]
+        jobs_scraped = jobs_committed
+        jobs_updated = jobs_removed = 0
 
-def cleanup_old_jobs(current_requisition_ids):
-    """Remove jobs that are >25 days old or no longer on the official site"""
-    with app.app_context():
-        phoenix_tz = pytz.timezone('America/Phoenix')
-        cutoff_date = datetime.now(phoenix_tz) - timedelta(days=25)
-
-        # Remove jobs older than 25 days
-        old_jobs = Job.query.filter(Job.scraped_at < cutoff_date).all()
-        old_count = len(old_jobs)
-        for job in old_jobs:
-            db.session.delete(job)
-
-        # Remove jobs no longer on official site
-        all_our_jobs = Job.query.all()
-        removed_count = 0
-        for job in all_our_jobs:
-            if job.requisition_id not in current_requisition_ids:
-                db.session.delete(job)
-                removed_count += 1
+    queue_saved_search_alerts(new_requisition_ids)
 
-        db.session.commit()
+    try:
+        prune_archive()
+    except Exception as e:
+        logger.error(f"Error pruning HTML archive: {str(e)}")
+        db.session.rollback()
 
-        total_removed = old_count + removed_count
-        if total_removed > 0:
-            logger.info(f"Cleanup: Removed {old_count} jobs >25 days old and {removed_count} jobs no longer on site")
+    # Let /api/events subscribers know the data changed
+    from events import bus
+    bus.publish(event_source or source.name, jobs_scraped, jobs_updated, jobs_removed)
 
-        return total_removed
+    return jobs_scraped
 
-def scrape_jobs():
+@profile_scrape
+def scrape_jobs(scraper=None):
     """Main function to scrape jobs and store in database"""
-    with app.app_context():
-        scraper = AZStateJobsScraper()
-        jobs_scraped = 0
+    with get_app().app_context():
+        scraper = scraper or AZStateJobsScraper()
 
         try:
             # Get job listings from main page
             job_listings = scraper.get_job_listings()
-            current_requisition_ids = {job['requisition_id'] for job in job_listings}
-
-            for job_data in job_listings:
-                try:
-                    # Check if job already exists
-                    existing_job = Job.query.filter_by(requisition_id=job_data['requisition_id']).first()
-
-                    if existing_job:
-                        # Update existing job
-                        phoenix_tz = pytz.timezone('America/Phoenix')
-                        existing_job.updated_at = datetime.now(phoenix_tz)
-                        logger.debug(f"Updated existing job: {job_data['requisition_id']}")
-                    else:
-                        # Get detailed information from individual job page
-                        job_details = scraper.get_job_details(job_data['url'])
-
-                        # Merge job data with details
-                        job_data.update(job_details)
-
-                        # Create new job record
-                        new_job = Job(
-                            requisition_id=job_data['requisition_id'],
-                            title=job_data['title'],
-                            department=job_data['department'],
-                            location=job_data['location'],
-                            employment_type=job_data['employment_type'],
-                            category=job_data['category'],
-                            closing_date=job_data['closing_date'],
-                            postsecondary_required=job_data['postsecondary_required'],
-                            url=job_data['url'],
-                            salary_text=job_data.get('salary_text'),
-                            salary_min=job_data.get('salary_min'),
-                            salary_max=job_data.get('salary_max'),
-                            grade=job_data.get('grade'),
-                            job_summary=job_data.get('job_summary'),
-                            job_duties=job_data.get('job_duties'),
-                            requirements=job_data.get('requirements')
-                        )
-
-                        db.session.add(new_job)
-                        jobs_scraped += 1
-                        logger.info(f"Added new job: {job_data['requisition_id']} - {job_data['title']}")
-
-                    # Rate limiting - be respectful
-                    time.sleep(1)
-
-                except Exception as e:
-                    logger.error(f"Error processing job {job_data.get('requisition_id', 'unknown')}: {str(e)}")
-                    continue
-
-            # Commit all changes
-            db.session.commit()
-            logger.info(f"Scraping completed. {jobs_scraped} new jobs added.")
-
-            # Clean up old and removed jobs
-            cleanup_old_jobs(current_requisition_ids)
-
+            jobs_scraped = store_scrape(scraper.source, job_listings, scraper.fetch_job_details, 'requests')
+            logger.info(f"Fetch stats: {scraper.fetcher.stats()}")
             return jobs_scraped
 
         except Exception as e:
@@ -426,4 +495,5 @@ def scrape_jobs():
             return 0
 
 if __name__ == "__main__":
-    scrape_jobs()
\ No newline at end of file
+    init_db(get_app())
+    scrape_jobs()
@@ -1,31 +1,37 @@
 
 import logging
 import time
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-from app import app, db
-from models import Job
-import pytz
-from datetime import datetime, timedelta
-from urllib.parse import urljoin
-import re
+from app import get_app, init_db
+from database import db
+from scraper import store_scrape
+from html_archive import archive_page
+from fetch_controller import looks_like_challenge
+from profiling import profile_scrape
+from session_store import cookies_from_browser, discard_session, load_session, save_session
+from sources import DEFAULT_SOURCE, get_source
 
 logger = logging.getLogger(__name__)
 
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
 class SeleniumAZStateJobsScraper:
-    def __init__(self):
-        self.base_url = "https://www.azstatejobs.gov"
-        self.search_url = "https://www.azstatejobs.gov/jobs/search"
+    def __init__(self, base_url=None, source=None):
+        self.source = source or get_source(DEFAULT_SOURCE)
+        if base_url:
+            self.source = self.source.with_base_url(base_url)
+        self.base_url = self.source.base_url
+        self.search_url = self.source.listing_url
         self.driver = None
+        self.user_agent = USER_AGENT
         
-    def setup_driver(self):
+    def setup_driver(self, user_agent=USER_AGENT):
         """Setup Chrome driver with options to avoid detection"""
+        # Imported here so the module loads without Selenium installed
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        from webdriver_manager.chrome import ChromeDriverManager
+
         chrome_options = Options()
         chrome_options.add_argument("--headless=new")
         chrome_options.add_argument("--no-sandbox")
@@ -40,7 +46,7 @@ class SeleniumAZStateJobsScraper:
         chrome_options.add_argument("--disable-javascript")
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+        chrome_options.add_argument(f"--user-agent={user_agent}")
         
         try:
             # Try to use system Chrome first, fallback to ChromeDriverManager
@@ -60,87 +66,63 @@ class SeleniumAZStateJobsScraper:
     
     def get_job_listings(self):
         """Scrape job listings using Selenium"""
-        if not self.setup_driver():
+        saved = load_session(self.source.session_key)
+        self.user_agent = saved.user_agent if saved and saved.user_agent else USER_AGENT
+        if not self.setup_driver(self.user_agent):
             return []
+
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
             
         try:
-            logger.info("Visiting homepage with Selenium...")
-            self.driver.get(self.base_url)
-            time.sleep(3)
-            
-            logger.info("Navigating to jobs search page...")
-            self.driver.get(self.search_url)
-            
-            # Wait for page to load and check for content
-            wait = WebDriverWait(self.driver, 15)
-            
-            # Check if we hit the bot challenge
-            page_source = self.driver.page_source
-            if "JavaScript is disabled" in page_source or "verify that you're not a robot" in page_source:
-                logger.warning("Still hitting bot challenge with Selenium")
+            page_source = None
+            if saved:
+                # A session the site accepted last time needs no warm-up or settling waits
+                self.driver.execute_cdp_cmd('Network.setCookies', {'cookies': saved.chrome_cookies()})
+                logger.info("Navigating to jobs search page with the saved session...")
+                self.driver.get(self.search_url)
+                page_source = self.driver.page_source
+                if looks_like_challenge(page_source):
+                    logger.info("Saved session refused; warming up a new one")
+                    discard_session(self.source.session_key)
+                    self.driver.delete_all_cookies()
+                    page_source = None
+
+            if page_source is None:
+                logger.info("Visiting homepage with Selenium...")
+                self.driver.get(self.base_url)
+                time.sleep(3)
                 
-                # Try clicking through any buttons or links that might help
-                try:
-                    # Look for any "Continue" or similar buttons
-                    continue_button = self.driver.find_element(By.XPATH, "//button[contains(text(), 'Continue')] | //a[contains(text(), 'Continue')]")
-                    continue_button.click()
-                    time.sleep(5)
-                except:
-                    pass
-                    
-                # Refresh page source
+                logger.info("Navigating to jobs search page...")
+                self.driver.get(self.search_url)
+                
+                # Wait for page to load and check for content
+                wait = WebDriverWait(self.driver, 15)
+                
+                # Check if we hit the bot challenge
                 page_source = self.driver.page_source
-            
-            # Parse with BeautifulSoup
-            soup = BeautifulSoup(page_source, 'html.parser')
-            
-            # Log page content for debugging
-            page_text = soup.get_text()[:500]
-            logger.info(f"Page content preview: {page_text}")
-            
-            # Look for jobs table
-            jobs_table = soup.find('table')
-            if not jobs_table:
-                logger.error("Could not find jobs table on the page")
-                return []
-            
-            jobs = []
-            tbody = jobs_table.find('tbody')
-            rows = tbody.find_all('tr') if tbody else []
-            
-            for row in rows:
-                try:
-                    cells = row.find_all('td')
-                    if len(cells) < 7:
-                        continue
+                if looks_like_challenge(page_source):
+                    logger.warning("Still hitting bot challenge with Selenium")
                     
-                    title_cell = cells[0]
-                    title_link = title_cell.find('a')
-                    if not title_link:
-                        continue
-                    
-                    category_text = cells[2].get_text(strip=True).replace('\n', ' ').replace('  ', ' ')
-                    
-                    job_data = {
-                        'title': title_link.get_text(strip=True),
-                        'url': urljoin(self.base_url, title_link.get('href')),
-                        'requisition_id': cells[1].get_text(strip=True),
-                        'category': category_text,
-                        'department': cells[3].get_text(strip=True),
-                        'employment_type': cells[4].get_text(strip=True),
-                        'location': cells[5].get_text(strip=True),
-                        'closing_date': self.parse_date(cells[6].get_text(strip=True)),
-                        'postsecondary_required': cells[7].get_text(strip=True) if len(cells) > 7 else None
-                    }
-                    
-                    jobs.append(job_data)
-                    
-                except Exception as e:
-                    logger.error(f"Error parsing job row: {str(e)}")
-                    continue
+                    # Try clicking through any buttons or links that might help
+                    try:
+                        # Look for any "Continue" or similar buttons
+                        continue_button = self.driver.find_element(By.XPATH, "//button[contains(text(), 'Continue')] | //a[contains(text(), 'Continue')]")
+                        continue_button.click()
+                        time.sleep(5)
+                    except:
+                        pass
+                        
+                    # Refresh page source
+                    page_source = self.driver.page_source
             
-            logger.info(f"Found {len(jobs)} job listings")
-            return jobs
+            archive_page(self.driver.current_url, page_source, 'listing')
+
+            job_listings = self.source.parse_listing(page_source)
+            if job_listings:
+                save_session(self.source.session_key, cookies_from_browser(self.driver.get_cookies()),
+                             {'User-Agent': self.user_agent})
+            return job_listings
             
         except Exception as e:
             logger.error(f"Error with Selenium scraping: {str(e)}")
@@ -148,83 +130,24 @@ class SeleniumAZStateJobsScraper:
         finally:
             if self.driver:
                 self.driver.quit()
-    
-    def parse_date(self, date_text):
-        """Parse date string to datetime object"""
-        if not date_text or date_text.strip() == '':
-            return None
-        
-        try:
-            formats = [
-                '%b %d %Y - %H:%M %Z',
-                '%b %d %Y',
-                '%m/%d/%Y',
-                '%Y-%m-%d'
-            ]
-            
-            for fmt in formats:
-                try:
-                    return datetime.strptime(date_text.strip(), fmt)
-                except ValueError:
-                    continue
-            
-            date_match = re.search(r'(\w{3} \d{1,2} \d{4})', date_text)
-            if date_match:
-                return datetime.strptime(date_match.group(1), '%b %d %Y')
-                
-        except Exception as e:
-            logger.error(f"Error parsing date '{date_text}': {str(e)}")
-        
-        return None
 
-def scrape_jobs_selenium():
+@profile_scrape
+def scrape_jobs_selenium(scraper=None):
     """Alternative scraping function using Selenium"""
-    with app.app_context():
-        scraper = SeleniumAZStateJobsScraper()
-        jobs_scraped = 0
-        
+    with get_app().app_context():
+        scraper = scraper or SeleniumAZStateJobsScraper()
+
         try:
             job_listings = scraper.get_job_listings()
-            current_requisition_ids = {job['requisition_id'] for job in job_listings}
-            
-            for job_data in job_listings:
-                try:
-                    existing_job = Job.query.filter_by(requisition_id=job_data['requisition_id']).first()
-                    
-                    if existing_job:
-                        phoenix_tz = pytz.timezone('America/Phoenix')
-                        existing_job.updated_at = datetime.now(phoenix_tz)
-                        logger.debug(f"Updated existing job: {job_data['requisition_id']}")
-                    else:
-                        new_job = Job(
-                            requisition_id=job_data['requisition_id'],
-                            title=job_data['title'],
-                            department=job_data['department'],
-                            location=job_data['location'],
-                            employment_type=job_data['employment_type'],
-                            category=job_data['category'],
-                            closing_date=job_data['closing_date'],
-                            postsecondary_required=job_data['postsecondary_required'],
-                            url=job_data['url']
-                        )
-                        
-                        db.session.add(new_job)
-                        jobs_scraped += 1
-                        logger.info(f"Added new job: {job_data['requisition_id']} - {job_data['title']}")
-                        
-                except Exception as e:
-                    logger.error(f"Error processing job {job_data.get('requisition_id', 'unknown')}: {str(e)}")
-                    continue
-            
-            db.session.commit()
-            logger.info(f"Selenium scraping completed. {jobs_scraped} new jobs added.")
-            
-            return jobs_scraped
-            
+
+            # Listing rows only; job pages are left to the requests backend
+            return store_scrape(scraper.source, job_listings, event_source='selenium')
+
         except Exception as e:
             logger.error(f"Error during Selenium scraping: {str(e)}")
             db.session.rollback()
             return 0
 
 if __name__ == "__main__":
+    init_db(get_app())
     scrape_jobs_selenium()
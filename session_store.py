@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+SESSION_DIR = os.environ.get("SCRAPE_SESSION_DIR", "sessions")
+# How long a saved session is offered to the site before starting over with the warm-up
+SESSION_TTL_HOURS = float(os.environ.get("SCRAPE_SESSION_TTL_HOURS", "24"))
+SESSION_ENABLED = os.environ.get("SCRAPE_SESSION", "1") == "1"
+
+SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+class SavedSession:
+    """Cookies and request headers a site last accepted, in a form every backend can load.
+
+    Cookies are kept as {name, value, domain, path, expires, secure,
+    httpOnly}, with expires in epoch seconds or None for session cookies.
+    Challenge clearance tokens are cookies too, and are bound to the user
+    agent that earned them, so browsers reuse the saved User-Agent.
+    """
+
+    def __init__(self, cookies, headers, saved_at, expires_at):
+        self.cookies = cookies
+        self.headers = headers
+        self.saved_at = saved_at
+        self.expires_at = expires_at
+
+    @property
+    def user_agent(self):
+        return self.headers.get('User-Agent')
+
+    def live_cookies(self):
+        now = time.time()
+        return [cookie for cookie in self.cookies if cookie['expires'] is None or cookie['expires'] > now]
+
+    def apply_to_requests(self, session):
+        """Load into a requests session"""
+        session.headers.update(self.headers)
+        for cookie in self.live_cookies():
+            session.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'],
+                                secure=cookie['secure'], expires=cookie['expires'],
+                                rest={'HttpOnly': None} if cookie['httpOnly'] else {})
+
+    def playwright_cookies(self):
+        """Cookies for BrowserContext.add_cookies()"""
+        return [{'name': cookie['name'], 'value': cookie['value'], 'domain': cookie['domain'], 'path': cookie['path'],
+                 'expires': cookie['expires'] if cookie['expires'] is not None else -1,
+                 'secure': cookie['secure'], 'httpOnly': cookie['httpOnly']}
+                for cookie in self.live_cookies()]
+
+    def chrome_cookies(self):
+        """Cookies for the Chrome DevTools Network.setCookies command, which needs no page loaded first"""
+        cookies = []
+        for cookie in self.live_cookies():
+            entry = {'name': cookie['name'], 'value': cookie['value'], 'domain': cookie['domain'], 'path': cookie['path'],
+                     'secure': cookie['secure'], 'httpOnly': cookie['httpOnly']}
+            if cookie['expires'] is not None:
+                entry['expires'] = cookie['expires']
+            cookies.append(entry)
+        return cookies
+
+
+def session_path(site):
+    return os.path.join(SESSION_DIR, f"{SAFE_NAME.sub('_', site)}.json")
+
+
+def cookies_from_requests(jar):
+    """Cookies of a requests session in the stored form"""
+    return [{'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain, 'path': cookie.path,
+             'expires': cookie.expires, 'secure': bool(cookie.secure),
+             'httpOnly': cookie.has_nonstandard_attr('HttpOnly')}
+            for cookie in jar]
+
+
+def cookies_from_browser(cookies):
+    """Cookies from Playwright's context.cookies() or Selenium's driver.get_cookies() in the stored form"""
+    stored = []
+    for cookie in cookies:
+        # Playwright says expires=-1 for session cookies; Selenium leaves out expiry
+        expires = cookie.get('expires', cookie.get('expiry'))
+        stored.append({'name': cookie['name'], 'value': cookie['value'], 'domain': cookie.get('domain', ''),
+                       'path': cookie.get('path', '/'), 'expires': expires if expires is not None and expires >= 0 else None,
+                       'secure': bool(cookie.get('secure')), 'httpOnly': bool(cookie.get('httpOnly'))})
+    return stored
+
+
+def load_session(site):
+    """The saved session for a site (host), or None if there is none or it has expired"""
+    if not SESSION_ENABLED:
+        return None
+    try:
+        with open(session_path(site)) as f:
+            data = json.load(f)
+        session = SavedSession(data['cookies'], data['headers'], data['saved_at'], data['expires_at'])
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable saved session for {site}: {str(e)}")
+        return None
+    if session.expires_at <= time.time():
+        logger.info(f"Saved session for {site} has expired")
+        return None
+    return session
+
+
+def save_session(site, cookies, headers):
+    """Store the cookies and headers a site just accepted, readable only by this user"""
+    if not SESSION_ENABLED:
+        return
+    now = time.time()
+    data = {'saved_at': now, 'expires_at': now + SESSION_TTL_HOURS * 3600,
+            'headers': dict(headers), 'cookies': cookies}
+    try:
+        os.makedirs(SESSION_DIR, exist_ok=True)
+        path = session_path(site)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        logger.info(f"Saved session for {site} with {len(cookies)} cookies")
+    except OSError as e:
+        logger.error(f"Error saving session for {site}: {str(e)}")
+
+
+def discard_session(site):
+    """Forget a session the site no longer accepts"""
+    try:
+        os.remove(session_path(site))
+        logger.info(f"Discarded saved session for {site}")
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,201 @@
+"""Job boards the scrapers know how to crawl.
+
+A Source describes one board: where its listing lives, how to read listing
+rows and job pages, which backend fetches it, and how politely. Scrapers
+take a Source instead of hard-coding URLs, and every source writes through
+scraper.store_scrape(). Sources register themselves by name; SCRAPE_SOURCES
+picks the ones that are crawled.
+"""
+import copy
+import logging
+import os
+import re
+from datetime import datetime
+from urllib.parse import urljoin, urlparse
+from bs4 import BeautifulSoup
+from fetch_controller import MAX_CONCURRENCY
+from models import DEFAULT_SOURCE
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated source names crawled by the scheduler and crawl_runner.py
+ENABLED_SOURCES = [name.strip() for name in os.environ.get("SCRAPE_SOURCES", DEFAULT_SOURCE).split(',') if name.strip()]
+BACKENDS = ('requests', 'playwright', 'selenium')
+# Phoenix hours the original board has always been scraped at
+DEFAULT_SCHEDULE = (6, 10, 14, 18)
+
+DATE_FORMATS = ('%b %d %Y - %H:%M %Z', '%b %d %Y', '%m/%d/%Y', '%Y-%m-%d')
+
+_sources = {}
+
+
+def parse_date(date_text):
+    """Parse a listing's closing date, or None"""
+    if not date_text or date_text.strip() == '':
+        return None
+
+    try:
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(date_text.strip(), fmt)
+            except ValueError:
+                continue
+
+        # If no format worked, try to extract just the date part
+        date_match = re.search(r'(\w{3} \d{1,2} \d{4})', date_text)
+        if date_match:
+            return datetime.strptime(date_match.group(1), '%b %d %Y')
+
+    except Exception as e:
+        logger.error(f"Error parsing date '{date_text}': {str(e)}")
+
+    return None
+
+
+class Source:
+    """One job board. Subclasses set the class attributes and override the parsers they need.
+
+    Jobs from every source share the jobs table, so requisition ids from any
+    board but the original one are stored as "<name>:<id>".
+    """
+
+    name = None
+    base_url = None
+    listing_path = '/'
+    # Tried in order when the listing page answers with a bot challenge
+    alternate_listing_paths = ()
+    backend = 'requests'
+    # Seconds between request starts, and the most requests in flight, per host
+    request_delay = 1.0
+    max_concurrency = MAX_CONCURRENCY
+    # Phoenix hours to crawl at
+    schedule = DEFAULT_SCHEDULE
+
+    @property
+    def listing_url(self):
+        return urljoin(self.base_url, self.listing_path)
+
+    @property
+    def alternate_listing_urls(self):
+        return [urljoin(self.base_url, path) for path in self.alternate_listing_paths]
+
+    @property
+    def session_key(self):
+        """Name of the saved session, shared by everything fetching from the same host"""
+        return urlparse(self.base_url).netloc
+
+    def with_base_url(self, base_url):
+        """Copy of this source served from another host, e.g. a local stand-in"""
+        source = copy.copy(self)
+        source.base_url = base_url
+        return source
+
+    def job_key(self, requisition_id):
+        """Requisition id as stored, unique across sources"""
+        return requisition_id if self.name == DEFAULT_SOURCE else f"{self.name}:{requisition_id}"
+
+    def parse_listing(self, html):
+        """Job dicts for each posting on a listing page"""
+        raise NotImplementedError
+
+    def parse_detail(self, content):
+        """Fields from a job page; the shared extractors find labelled salary, grade and text sections"""
+        from scraper import parse_job_page
+        return parse_job_page(content)
+
+
+def register(cls):
+    """Class decorator adding a source to the registry"""
+    if cls.backend not in BACKENDS:
+        raise ValueError(f"Source {cls.name} has unknown backend {cls.backend}")
+    _sources[cls.name] = cls()
+    return cls
+
+
+def get_source(name=DEFAULT_SOURCE):
+    try:
+        return _sources[name]
+    except KeyError:
+        raise ValueError(f"Unknown source: {name}") from None
+
+
+def all_sources():
+    return list(_sources.values())
+
+
+def enabled_sources():
+    """Sources named in SCRAPE_SOURCES; unknown names are logged and skipped"""
+    sources = []
+    for name in ENABLED_SOURCES:
+        if name in _sources:
+            sources.append(_sources[name])
+        else:
+            logger.error(f"SCRAPE_SOURCES names unknown source {name}")
+    return sources
+
+
+def schedule_slots(sources):
+    """Map each Phoenix hour to the names of the sources crawled at it"""
+    slots = {}
+    for source in sources:
+        for hour in source.schedule:
+            slots.setdefault(hour, []).append(source.name)
+    return dict(sorted(slots.items()))
+
+
+@register
+class AZStateJobsSource(Source):
+    """azstatejobs.gov, the State of Arizona's job board"""
+
+    name = DEFAULT_SOURCE
+    base_url = 'https://www.azstatejobs.gov'
+    listing_path = '/jobs/search'
+    alternate_listing_paths = ('/jobs/search?query=', '/jobs', '/jobs/search?page=1')
+
+    def parse_listing(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # Log some page content for debugging
+        logger.info(f"Page content preview: {soup.get_text()[:500]}")
+
+        jobs_table = soup.find('table')
+        if not jobs_table:
+            logger.error("Could not find jobs table on the page")
+            return []
+
+        jobs = []
+        tbody = jobs_table.find('tbody')
+        rows = tbody.find_all('tr') if tbody else []
+
+        for row in rows:
+            try:
+                cells = row.find_all('td')
+                if len(cells) < 7:
+                    continue
+
+                title_link = cells[0].find('a')
+                if not title_link:
+                    continue
+
+                # Clean category text by replacing newlines and extra spaces
+                category_text = cells[2].get_text(strip=True).replace('\n', ' ').replace('  ', ' ')
+
+                jobs.append({
+                    'source': self.name,
+                    'title': title_link.get_text(strip=True),
+                    'url': urljoin(self.base_url, title_link.get('href')),
+                    'requisition_id': self.job_key(cells[1].get_text(strip=True)),
+                    'category': category_text,
+                    'department': cells[3].get_text(strip=True),
+                    'employment_type': cells[4].get_text(strip=True),
+                    'location': cells[5].get_text(strip=True),
+                    'closing_date': parse_date(cells[6].get_text(strip=True)),
+                    'postsecondary_required': cells[7].get_text(strip=True) if len(cells) > 7 else None
+                })
+
+            except Exception as e:
+                logger.error(f"Error parsing job row: {str(e)}")
+                continue
+
+        logger.info(f"Found {len(jobs)} job listings")
+        return jobs
@@ -0,0 +1,83 @@
+import bisect
+import heapq
+import logging
+import re
+import time
+from sqlalchemy import func
+from database import db
+from events import VersionedCache
+from models import ACTIVE, Job
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_FIELDS = (('title', Job.title), ('department', Job.department), ('location', Job.location))
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 25
+# Prefixes this short match so many keys that their answers are precomputed
+PRECOMPUTED_PREFIX_LENGTH = 2
+
+WORD_START = re.compile(r'\b\w')
+
+class SuggestIndex:
+    """Sorted-array prefix index over job titles, departments and locations.
+
+    Each distinct value is filed under every word start, so "nur" finds
+    "Registered Nurse". A prefix maps to a contiguous range of the sorted
+    keys, found with two binary searches; the range is ranked by how many
+    current jobs carry each value.
+    """
+
+    def __init__(self, version, counts):
+        self.version = version
+        entries = []
+        for kind, values in counts.items():
+            for value, count in values.items():
+                lowered = value.lower()
+                for match in WORD_START.finditer(lowered):
+                    entries.append((lowered[match.start():], kind, value, count))
+        entries.sort()
+        self.keys = [entry[0] for entry in entries]
+        self.entries = [entry[1:] for entry in entries]
+
+        self._precomputed = {}
+        for key in {key[:length] for key in self.keys for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1)}:
+            self._precomputed[key] = self._rank(key, MAX_LIMIT)
+
+    def _rank(self, prefix, limit):
+        low = bisect.bisect_left(self.keys, prefix)
+        high = bisect.bisect_left(self.keys, prefix + '\uffff', low)
+        # A value can sit under several of its words; rank each once
+        best = {}
+        for kind, value, count in self.entries[low:high]:
+            best[(kind, value)] = count
+        top = heapq.nsmallest(limit, best.items(), key=lambda item: (-item[1], item[0][1]))
+        return [{'value': value, 'kind': kind, 'count': count} for (kind, value), count in top]
+
+    def suggest(self, prefix, limit=DEFAULT_LIMIT):
+        """Top suggestions for a prefix, most common first"""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        if len(prefix) <= PRECOMPUTED_PREFIX_LENGTH:
+            return self._precomputed.get(prefix, [])[:limit]
+        return self._rank(prefix, limit)
+
+
+def build_suggest_index(version):
+    """Count each distinct title, department and location among open jobs"""
+    started = time.monotonic()
+    counts = {}
+    for kind, column in SUGGEST_FIELDS:
+        rows = db.session.query(column, func.count()).filter(ACTIVE, column.isnot(None)).group_by(column).all()
+        counts[kind] = {value: count for value, count in rows if value}
+    index = SuggestIndex(version, counts)
+    logger.info(f"Built suggest index for version {version}: {len(index.keys)} keys in {(time.monotonic() - started) * 1000:.0f}ms")
+    return index
+
+
+_suggest_indexes = VersionedCache(build_suggest_index)
+
+
+def current_suggest_index():
+    """Return the index for the current data version, rebuilding it after a scrape"""
+    return _suggest_indexes.get()
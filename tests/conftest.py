@@ -0,0 +1,15 @@
+import pytest
+from database import db
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """A fresh app on an empty SQLite database, with an app context pushed"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'jobs.db'}")
+    monkeypatch.setattr('html_archive.ARCHIVE_DIR', str(tmp_path / 'html_archive'))
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
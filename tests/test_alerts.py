@@ -0,0 +1,67 @@
+import random
+from types import SimpleNamespace
+import pytest
+from alerts import SearchMatcher
+from models import SavedSearch
+
+TITLES = ['Registered Nurse', 'Nurse Practitioner', 'Accountant II', 'Senior Accountant', 'IT Analyst',
+          'Correctional Officer', 'Licensed Practical Nurse', 'Program Manager', 'HR Specialist', 'Auditor']
+DEPARTMENTS = ['Department of Revenue', 'Department of Corrections', 'Department of Health Services',
+               'Department of Transportation']
+LOCATIONS = ['Phoenix', 'Tucson', 'Flagstaff', 'Phoenix, AZ 85007', 'Yuma', None]
+
+
+def sample_jobs(count, seed):
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(count):
+        salary_min = rng.choice([None, 35000.0, 48000.0, 52000.0, 61000.0, 75000.0])
+        salary_max = None if salary_min is None else salary_min + rng.choice([0.0, 5000.0, 20000.0])
+        jobs.append(SimpleNamespace(requisition_id=str(i), title=rng.choice(TITLES + [None]),
+                                    department=rng.choice(DEPARTMENTS), location=rng.choice(LOCATIONS),
+                                    salary_min=salary_min, salary_max=salary_max))
+    return jobs
+
+
+def sample_searches():
+    criteria = [
+        {'keyword': 'nurse'},
+        {'keyword': 'NURSE', 'location': 'phoenix'},
+        {'keyword': 'II'},
+        {'keyword': 'an'},
+        {'keyword': 'accountant', 'salary_min': 50000.0},
+        {'keyword': 'nowhere'},
+        {'department': 'Department of Revenue'},
+        {'department': 'Department of Revenue', 'salary_max': 60000.0},
+        {'department': 'department of revenue'},
+        {'location': 'Tucson'},
+        {'location': 'phx'},
+        {'location': 'AZ 85'},
+        {'location': 'u'},
+        {'salary_min': 52000.0},
+        {'salary_min': 52000.0, 'salary_max': 70000.0},
+        {'salary_max': 48000.0},
+        {'salary_max': 1.0},
+    ]
+    return [SavedSearch(id=i + 1, name=f'search {i + 1}', email='a@example.com', **fields)
+            for i, fields in enumerate(criteria)]
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_matcher_agrees_with_saved_search_matches(seed):
+    jobs = sample_jobs(300, seed)
+    searches = sample_searches()
+
+    expected = {search.id: [job for job in jobs if search.matches(job)] for search in searches}
+    expected = {search_id: matched for search_id, matched in expected.items() if matched}
+
+    assert dict(SearchMatcher(searches).match(jobs)) == expected
+
+
+def test_matcher_reports_each_job_once_per_search():
+    job = SimpleNamespace(requisition_id='1', title='Nurse Nurse', department='Department of Revenue',
+                          location='Phoenix', salary_min=60000.0, salary_max=60000.0)
+    search = SavedSearch(id=1, name='all', email='a@example.com', keyword='nurse', location='phoenix',
+                         salary_min=50000.0)
+
+    assert SearchMatcher([search]).match([job]) == {1: [job]}
@@ -0,0 +1,50 @@
+from datetime import timedelta, timezone
+from crawl_queue import prune_crawls, start_crawl
+from database import db
+from models import Crawl, CrawlTask, phoenix_naive, phoenix_now
+
+
+def add_crawl(status, finished_days_ago=None, tasks=2):
+    finished_at = phoenix_naive() - timedelta(days=finished_days_ago) if finished_days_ago is not None else None
+    crawl = Crawl(source='requests', status=status, started_at=phoenix_naive(), finished_at=finished_at)
+    db.session.add(crawl)
+    db.session.flush()
+    for i in range(tasks):
+        db.session.add(CrawlTask(crawl_id=crawl.id, kind='detail', url=f'https://example.com/{crawl.id}/{i}',
+                                 payload='{"job_summary": "long text"}', status='done'))
+    db.session.commit()
+    return crawl.id
+
+
+def test_prune_drops_finished_tasks_and_old_crawls(app):
+    running = add_crawl('running')
+    recent = add_crawl('done', finished_days_ago=1)
+    failed = add_crawl('failed', finished_days_ago=2)
+    old = add_crawl('done', finished_days_ago=60)
+
+    assert prune_crawls(retention_days=30) == (6, 1)
+
+    assert {crawl.id for crawl in Crawl.query} == {running, recent, failed}
+    assert db.session.get(Crawl, old) is None
+    assert {task.crawl_id for task in CrawlTask.query} == {running}
+
+
+def test_phoenix_naive_matches_stored_wall_clock():
+    now = phoenix_now()
+    assert phoenix_naive(now) == now.replace(tzinfo=None)
+    assert phoenix_naive(now.astimezone(timezone.utc)) == now.replace(tzinfo=None)
+    assert phoenix_naive(now.replace(tzinfo=None)) == now.replace(tzinfo=None)
+
+
+def test_start_crawl_resumes_recent_and_abandons_stale(app):
+    class FakeScraper:
+        search_url = 'https://example.com/jobs/search'
+
+    first = start_crawl(FakeScraper())
+    assert start_crawl(FakeScraper()) == first
+
+    db.session.get(Crawl, first).started_at = phoenix_naive() - timedelta(hours=13)
+    db.session.commit()
+    second = start_crawl(FakeScraper())
+    assert second != first
+    assert db.session.get(Crawl, first).status == 'failed'
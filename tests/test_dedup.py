@@ -0,0 +1,83 @@
+import pytest
+import dedup
+
+SUMMARY = ('The Department of Revenue is seeking an experienced auditor to examine business tax returns, '
+           'review financial records for compliance with Arizona statutes, prepare written findings and '
+           'meet with taxpayers to explain assessments and resolve disputes before appeal.')
+
+
+def sig(text):
+    return dedup.signature(dedup.shingles(text))
+
+
+def test_identical_text_has_similarity_one():
+    assert dedup.similarity(sig(SUMMARY), sig(SUMMARY)) == 1.0
+
+
+def test_unrelated_text_has_low_similarity():
+    other = ('Correctional officers supervise inmates in housing units, conduct searches and counts, '
+             'escort inmates to appointments and respond to emergencies on every shift.')
+    assert dedup.similarity(sig(SUMMARY), sig(other)) < 0.2
+
+
+def test_short_and_empty_text():
+    assert dedup.signature(dedup.shingles('')) is None
+    assert sig('Auditor') == sig('auditor')
+
+
+def test_numpy_and_python_signatures_agree(monkeypatch):
+    if dedup.np is None:
+        pytest.skip("numpy is not installed")
+    hashes = dedup.shingles(SUMMARY)
+    with_numpy = dedup.signature(hashes)
+    monkeypatch.setattr(dedup, 'np', None)
+    assert dedup.signature(hashes) == with_numpy
+
+
+def test_find_clusters_groups_near_duplicates_only():
+    signatures = {
+        'A1': sig('Tax Auditor ' + SUMMARY),
+        # Reposted with the closing line reworded
+        'A2': sig('Tax Auditor ' + SUMMARY.replace('before appeal', 'before any appeal')),
+        'A3': sig('Tax Auditor ' + SUMMARY),
+        'B1': sig('Correctional Officer supervise inmates in housing units, conduct searches and counts, '
+                  'escort inmates to appointments and respond to emergencies on every shift.'),
+        'C1': sig('Registered Nurse provide direct patient care at the state hospital, administer '
+                  'medications, document assessments and coordinate with physicians on treatment plans.'),
+    }
+
+    clusters = dedup.find_clusters(signatures)
+
+    assert [sorted(members) for members in clusters] == [['A1', 'A2', 'A3']]
+
+
+def test_find_clusters_with_no_duplicates():
+    signatures = {str(i): sig(f'posting number {i} ' + ' '.join(f'word{i * 50 + j}' for j in range(40)))
+                  for i in range(20)}
+    assert dedup.find_clusters(signatures) == []
+
+
+def add_job(requisition_id, title, summary, scraped_at, is_active=True):
+    from datetime import datetime
+    from models import Job
+    job = Job(requisition_id=requisition_id, title=title, department='Department of Revenue', location='Phoenix',
+              url=f'https://example.com/{requisition_id}', job_summary=summary,
+              scraped_at=datetime(2026, 1, scraped_at), is_active=is_active)
+    dedup.db.session.add(job)
+    return job
+
+
+def test_assign_duplicate_clusters_uses_newest_open_posting(app):
+    from models import Job
+    add_job('1', 'Tax Auditor', SUMMARY, 1)
+    add_job('2', 'Tax Auditor', SUMMARY, 2)
+    # Newest, but closed: neither joins nor represents the cluster
+    add_job('3', 'Tax Auditor', SUMMARY, 3, is_active=False)
+    add_job('4', 'Registered Nurse', 'Provide direct patient care at the state hospital and administer '
+                                     'medications to residents on the night shift.', 1)
+    dedup.db.session.commit()
+
+    assert dedup.assign_duplicate_clusters() == 1
+
+    clusters = {job.requisition_id: job.duplicate_cluster_id for job in Job.query}
+    assert clusters == {'1': '2', '2': '2', '3': None, '4': None}
@@ -0,0 +1,111 @@
+import time
+import pytest
+import requests
+from fetch_controller import CircuitOpenError, FetchController, looks_like_challenge
+
+URL = 'https://jobs.example.com/page'
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, content=b'<html>job</html>'):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {}
+
+
+class FakeSession:
+    """Answers each get() with the next scripted outcome: a status code, or an exception to raise"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+
+    def get(self, url, timeout=None, **kwargs):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(outcome)
+
+
+def controller(outcomes, **kwargs):
+    options = dict(min_interval=0, max_retries=0, max_concurrency=4, failure_threshold=3, cooldown=0.05)
+    options.update(kwargs)
+    return FetchController(FakeSession(outcomes), **options)
+
+
+def host_state(fetcher):
+    return fetcher._state('jobs.example.com')
+
+
+def test_successes_raise_the_limit_additively():
+    fetcher = controller([200] * 3)
+    for _ in range(3):
+        fetcher.get(URL)
+    # 1 -> 2 -> 2.5 -> 2.9
+    assert host_state(fetcher).limit == pytest.approx(2.9)
+
+
+def test_limit_is_capped_at_max_concurrency():
+    fetcher = controller([200] * 30, max_concurrency=2)
+    for _ in range(30):
+        fetcher.get(URL)
+    assert host_state(fetcher).limit == 2
+
+
+def test_failures_halve_the_limit_down_to_one():
+    fetcher = controller([200] * 6 + [503, 503], failure_threshold=10)
+    for _ in range(6):
+        fetcher.get(URL)
+    before = host_state(fetcher).limit
+    fetcher.get(URL)
+    assert host_state(fetcher).limit == pytest.approx(max(1.0, before / 2))
+    fetcher.get(URL)
+    assert host_state(fetcher).limit == 1.0
+
+
+def test_challenge_is_returned_but_counted_as_failure():
+    fetcher = controller([])
+    fetcher.session.get = lambda url, timeout=None: FakeResponse(200, b"Please verify that you're not a robot")
+    response = fetcher.get(URL)
+    assert looks_like_challenge(response.content)
+    assert host_state(fetcher).failures == 1
+
+
+def test_consecutive_failures_open_the_circuit():
+    fetcher = controller([503, 503, 503], cooldown=10, max_wait=0.01)
+    for _ in range(3):
+        fetcher.get(URL)
+    state = host_state(fetcher)
+    assert state.trips == 1
+    assert state.open_until > time.monotonic()
+    with pytest.raises(CircuitOpenError):
+        fetcher.get(URL)
+
+
+def test_successful_probe_closes_the_circuit_and_resets_the_cooldown():
+    fetcher = controller([503, 503, 503, 200, 503, 503, 503])
+    for _ in range(3):
+        fetcher.get(URL)
+    # Waits out the cooldown, then the probe succeeds
+    assert fetcher.get(URL).status_code == 200
+    state = host_state(fetcher)
+    assert state.open_until == 0.0
+    assert state.consecutive_trips == 0
+
+    for _ in range(3):
+        fetcher.get(URL)
+    assert state.trips == 2
+    # Back to the base cooldown rather than doubling it
+    assert state.open_until - time.monotonic() <= fetcher.cooldown
+
+
+def test_failed_probe_reopens_with_a_doubled_cooldown():
+    fetcher = controller([503, 503, 503, requests.ConnectionError('refused')])
+    for _ in range(3):
+        fetcher.get(URL)
+    with pytest.raises(requests.ConnectionError):
+        fetcher.get(URL)
+    state = host_state(fetcher)
+    assert state.trips == 2
+    assert state.consecutive_trips == 2
+    remaining = state.open_until - time.monotonic()
+    assert fetcher.cooldown < remaining <= 2 * fetcher.cooldown
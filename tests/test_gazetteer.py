@@ -0,0 +1,47 @@
+import pytest
+from gazetteer import GeoIndex, geocode, haversine_miles, load_places
+
+
+@pytest.mark.parametrize('location, place', [
+    ('Phoenix', 'Phoenix'),
+    ('Phoenix, AZ 85007', 'Phoenix'),
+    ('Phoenix - Capitol Mall', 'Phoenix'),
+    ('ASPC Florence', 'Florence'),
+    ('Pima County', 'Tucson'),
+    ('Tucson / Phoenix', 'Tucson'),
+    ('Remote', None),
+    ('', None),
+])
+def test_geocode(location, place):
+    match = geocode(location)
+    assert (match[0] if match else None) == place
+
+
+@pytest.fixture(scope='module')
+def index():
+    return GeoIndex(1, list(load_places().values()))
+
+
+@pytest.mark.parametrize('west, south, east, north', [
+    (-112.5, 33.0, -111.5, 34.0), (-115, 31, -109, 37.5), (-111.0, 32.1, -110.9, 32.3), (-180, -90, 180, 90),
+])
+def test_bbox_matches_a_full_scan(index, west, south, east, north):
+    expected = {name for name, latitude, longitude in load_places().values()
+                if south <= latitude <= north and west <= longitude <= east}
+    assert index.within_bbox(west, south, east, north) == expected
+
+
+@pytest.mark.parametrize('miles', [0, 10, 25, 100, 500])
+def test_radius_matches_a_full_scan(index, miles):
+    _, latitude, longitude = geocode('Flagstaff')
+    expected = {name for name, lat, lon in load_places().values()
+                if haversine_miles(latitude, longitude, lat, lon) <= miles}
+    assert set(index.within_radius(latitude, longitude, miles)) == expected
+
+
+def test_out_of_range_queries_are_rejected(app):
+    client = app.test_client()
+    for query in ({'bbox': '1,2,3'}, {'bbox': '10,0,-10,5'}, {'bbox': 'nan,0,1,1'},
+                  {'near': 'Nowhereville'}, {'near': 'Phoenix', 'radius': 'inf'}):
+        assert client.get('/api/jobs', query_string=query).status_code == 400, query
+    assert client.get('/api/jobs', query_string={'near': '95,500', 'radius': 1e9}).status_code == 200
@@ -0,0 +1,45 @@
+import os
+import time
+import html_archive
+import sources
+from database import db
+from html_archive import archive_page, blob_path, prune_archive
+from reparse import _reparse_page
+
+
+def test_prune_keeps_unreferenced_blobs_during_the_grace_period(app):
+    content_hash = archive_page('https://example.com/jobs/1', '<html>one</html>', 'detail')
+    # Another scrape's row, not committed yet
+    db.session.rollback()
+    path = blob_path(content_hash)
+
+    prune_archive()
+    assert os.path.exists(path)
+
+    stale = time.time() - html_archive.GRACE_HOURS * 3600 - 60
+    os.utime(path, (stale, stale))
+    prune_archive()
+    assert not os.path.exists(path)
+
+
+def test_prune_keeps_referenced_blobs(app):
+    content_hash = archive_page('https://example.com/jobs/2', '<html>two</html>', 'detail')
+    db.session.commit()
+    stale = time.time() - html_archive.GRACE_HOURS * 3600 - 60
+    os.utime(blob_path(content_hash), (stale, stale))
+    prune_archive()
+    assert os.path.exists(blob_path(content_hash))
+
+
+def test_reparse_uses_each_jobs_source(app, monkeypatch):
+    class CountySource(sources.Source):
+        name = 'county'
+
+        def parse_detail(self, content):
+            return {'grade': content.decode('utf-8')}
+
+    monkeypatch.setitem(sources._sources, 'county', CountySource())
+    content_hash = archive_page('https://example.com/jobs/3', 'G21', 'detail')
+    requisition_id, details, error = _reparse_page(('county:3', 'county', content_hash))
+    assert (requisition_id, details['grade'], error) == ('county:3', 'G21', None)
+    assert _reparse_page(('x:3', 'nowhere', content_hash))[2] == 'Unknown source: nowhere'
@@ -0,0 +1,31 @@
+import gzip
+import page_cache
+from page_cache import CachedPage, PageCache
+
+
+def test_least_recently_used_page_is_evicted(monkeypatch):
+    monkeypatch.setattr(page_cache, 'MAX_PAGES', 2)
+    cache = PageCache(1)
+    renders = []
+
+    def render(name):
+        renders.append(name)
+        return f"<p>{name}</p>"
+
+    cache.page('a', lambda: render('a'))
+    cache.page('b', lambda: render('b'))
+    cache.page('a', lambda: render('a'))
+    cache.page('c', lambda: render('c'))
+    cache.page('a', lambda: render('a'))
+    cache.page('b', lambda: render('b'))
+    assert renders == ['a', 'b', 'c', 'b']
+
+
+def test_only_shared_pages_are_compressed_hard():
+    html = '<tr><td>Registered Nurse</td></tr>' * 200
+    shared = CachedPage(html, shared=True)
+    one_off = CachedPage(html)
+    assert gzip.decompress(shared.bodies['gzip']) == html.encode('utf-8')
+    assert gzip.decompress(one_off.bodies['gzip']) == html.encode('utf-8')
+    assert 'br' not in one_off.bodies
+    assert len(shared.bodies['gzip']) <= len(one_off.bodies['gzip'])
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+import pytest
+import persistence
+from models import Job, ScrapeEvent
+from scraper import store_scrape
+from sources import get_source
+
+
+def listing(i, closing_date):
+    return {'source': 'azstatejobs', 'title': f'Job {i}', 'url': f'https://example.com/jobs/{i}',
+            'requisition_id': f'REQ{i:04d}', 'category': 'Clerical', 'department': 'Department of Revenue',
+            'employment_type': 'Full-time', 'location': 'Phoenix', 'closing_date': closing_date,
+            'postsecondary_required': None}
+
+
+def sample_listings(count, start=0):
+    open_date = datetime.now() + timedelta(days=30)
+    return [listing(i, open_date) for i in range(start, start + count)]
+
+
+def published_counts():
+    event = ScrapeEvent.query.order_by(ScrapeEvent.id.desc()).first()
+    return event.new_count, event.updated_count, event.removed_count
+
+
+def scrape_twice(staged, monkeypatch):
+    monkeypatch.setattr(persistence, 'STAGED_PUBLISH', staged)
+    source = get_source()
+    store_scrape(source, sample_listings(30))
+    first = published_counts()
+    # Ten delisted, five new
+    store_scrape(source, sample_listings(25, start=15))
+    return first, published_counts()
+
+
+@pytest.mark.parametrize('staged', [False, True])
+def test_scrape_publishes_new_updated_removed(app, monkeypatch, staged):
+    assert scrape_twice(staged, monkeypatch) == ((30, 0, 0), (10, 0, 15))
+
+
+def test_staged_and_live_scrapes_store_the_same_rows(app, monkeypatch, tmp_path):
+    columns = ('requisition_id', 'title', 'is_active', 'source', 'title_html', 'salary_display')
+
+    def stored():
+        return sorted(tuple(getattr(job, column) for column in columns) for job in Job.query)
+
+    scrape_twice(False, monkeypatch)
+    live = stored()
+    Job.query.delete()
+    scrape_twice(True, monkeypatch)
+
+    assert stored() == live
+    assert all(job.is_active for job in Job.query)
+
+
+def test_legacy_job_text_moves_to_job_details(app):
+    from sqlalchemy import inspect, text
+    from database import db
+    from models import JobDetail, compress_text
+    from persistence import migrate_legacy_job_text
+
+    with db.engine.begin() as connection:
+        for name in persistence.LEGACY_TEXT_COLUMNS:
+            connection.execute(text(f"ALTER TABLE jobs ADD COLUMN {name} TEXT"))
+    store_scrape(get_source(), sample_listings(3))
+    with db.engine.begin() as connection:
+        connection.execute(text("UPDATE jobs SET job_summary = 'Old summary ' || requisition_id, "
+                                "requirements = 'Old requirements'"))
+    # Text written since the split is kept over the old copy
+    db.session.add(JobDetail(requisition_id='REQ0001', job_summary=compress_text('New summary')))
+    db.session.commit()
+
+    assert migrate_legacy_job_text(batch_size=2) == 3
+
+    assert not {column['name'] for column in inspect(db.engine).get_columns('jobs')} & set(persistence.LEGACY_TEXT_COLUMNS)
+    db.session.expire_all()
+    jobs = {job.requisition_id: job for job in Job.query}
+    assert jobs['REQ0000'].job_summary == 'Old summary REQ0000'
+    assert jobs['REQ0001'].job_summary == 'New summary'
+    assert jobs['REQ0002'].requirements == 'Old requirements'
+    assert jobs['REQ0002'].job_duties is None
+
+    response = app.test_client().get(f"/api/jobs/{jobs['REQ0000'].id}")
+    assert response.get_json()['job_summary'] == 'Old summary REQ0000'
+    assert migrate_legacy_job_text() == 0
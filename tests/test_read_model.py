@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+import pytest
+import read_model
+from database import db
+from events import bus
+from models import Job
+from read_model import build_read_model
+from scraper import store_scrape
+from sources import get_source
+
+TITLES = ['Registered Nurse', 'Nurse Practitioner', 'Accountant II', 'Senior Accountant', 'IT Analyst', 'Auditor']
+DEPARTMENTS = ['Department of Revenue', 'Department of Corrections', 'Department of Health Services']
+LOCATIONS = ['Phoenix', 'Tucson', 'Flagstaff', None]
+
+
+@pytest.fixture
+def jobs(app):
+    closing_date = datetime.now() + timedelta(days=30)
+    store_scrape(get_source(), [{
+        'source': 'azstatejobs', 'title': TITLES[i % len(TITLES)], 'url': f'https://example.com/jobs/{i}',
+        'requisition_id': f'REQ{i:04d}', 'category': 'Clerical', 'department': DEPARTMENTS[i % len(DEPARTMENTS)],
+        'employment_type': 'Full-time', 'location': LOCATIONS[i % len(LOCATIONS)], 'closing_date': closing_date,
+        'postsecondary_required': None} for i in range(40)])
+    # Distinct scrape times so both paths agree on the order
+    scraped_at = datetime(2026, 1, 1)
+    for i, job in enumerate(Job.query.order_by(Job.requisition_id)):
+        job.scraped_at = scraped_at + timedelta(minutes=i)
+    db.session.commit()
+    return build_read_model(bus.current_version())
+
+
+@pytest.mark.parametrize('search, start, length', [
+    ('', 0, 10), ('', 35, 10), ('', -5, 10), ('', 0, -1),
+    ('nurse', 0, 10), ('ACCOUNTANT', 2, 3), ('revenue', 0, -1), ('tucson', 0, 10), ('nowhere', 0, 10),
+])
+def test_read_model_matches_sql(app, jobs, search, start, length):
+    sql = app.test_client().get('/api/jobs', query_string={
+        'start': start, 'length': length, 'search[value]': search}).get_json()
+    positions = jobs.filter(any_field=search)
+    assert (jobs.size, len(positions)) == (sql['recordsTotal'], sql['recordsFiltered'])
+    assert jobs.page(positions, start, length) == sql['data']
+
+
+def test_result_cache_is_bounded_by_bytes(jobs, monkeypatch):
+    monkeypatch.setattr(read_model, 'RESULT_CACHE_BYTES', jobs.size * 8 + 100)
+    for search in ('', 'nurse', 'accountant', 'analyst'):
+        jobs.filter(search=search)
+    assert jobs._results_bytes == sum(positions.nbytes for positions in jobs._results.values())
+    assert jobs._results_bytes <= read_model.RESULT_CACHE_BYTES
+    # The unfiltered result was the oldest and largest
+    assert ('', '', '', None, None, '', None, False) not in jobs._results
+    assert jobs.filter(search='analyst') is jobs.filter(search='analyst')
@@ -0,0 +1,37 @@
+import random
+import pytest
+from salary_stats import histogram_edges, summarize_numpy, summarize_python
+from scraper import AZStateJobsScraper
+
+
+@pytest.mark.parametrize('text, expected', [
+    (None, (None, None)),
+    ('', (None, None)),
+    ('Salary: Depends on qualifications', (None, None)),
+    ('$45,000.00 - $60,000.00', (45000.0, 60000.0)),
+    ('$52,000', (52000.0, 52000.0)),
+    ('$52,000 annually', (52000.0, 52000.0)),
+    ('$20.00 - $25.50 per hour', (41600.0, 53040.0)),
+    ('$20.00 - $25.50', (41600.0, 53040.0)),
+    ('$18/hr', (37440.0, 37440.0)),
+    ('$4,000 - $5,000 monthly', (48000.0, 60000.0)),
+    ('$1,800 biweekly', (46800.0, 46800.0)),
+    ('$1,000 per week', (52000.0, 52000.0)),
+])
+def test_parse_salary_range(text, expected):
+    assert AZStateJobsScraper().parse_salary_range(text) == expected
+
+
+@pytest.mark.parametrize('values', [[], [50000.0], [40000.0, 40000.0], None])
+def test_python_summary_matches_numpy(values):
+    if values is None:
+        rng = random.Random(7)
+        values = [rng.choice([35000.0, 48000.0, 52500.0, 61000.0]) + rng.random() * 20000 for _ in range(500)]
+    edges = histogram_edges(values, 10)
+    assert summarize_python(values, edges) == summarize_numpy(values, edges)
+
+
+def test_histogram_counts_every_salary():
+    values = [35004.676, 50000.0, 80881.45]
+    edges = histogram_edges(values, 10)
+    assert sum(bucket['count'] for bucket in summarize_numpy(values, edges)['histogram']) == len(values)
@@ -0,0 +1,44 @@
+import pytest
+from models import SavedSearch
+
+
+def create(client, **payload):
+    return client.post('/api/saved-searches', json=payload)
+
+
+def test_delete_takes_the_token_from_a_header_or_the_body(app):
+    client = app.test_client()
+    first = create(client, keyword='nurse').get_json()
+    second = create(client, keyword='accountant').get_json()
+
+    # Never from the query string
+    assert client.delete(f"/api/saved-searches/{first['id']}", query_string={'token': first['token']}).status_code == 404
+    assert client.delete(f"/api/saved-searches/{first['id']}", json={'token': second['token']}).status_code == 404
+    assert client.delete(f"/api/saved-searches/{first['id']}", json={'token': first['token']}).status_code == 200
+    assert client.delete(f"/api/saved-searches/{second['id']}",
+                         headers={'X-Search-Token': second['token']}).status_code == 200
+    assert SavedSearch.query.count() == 0
+
+
+@pytest.mark.parametrize('payload', [
+    {'keyword': 'nurse', 'email': 'not-an-address'},
+    {'keyword': 'nurse', 'email': 'a' * 190 + '@example.com'},
+    {'keyword': 'nurse', 'name': 'n' * 101},
+    {'keyword': 'k' * 201},
+    {'keyword': 'nurse', 'name': ['list']},
+    {'keyword': 'nurse', 'salary_min': 'lots'},
+    {'keyword': 'nurse', 'salary_min': [1]},
+    {'name': 'No filters'},
+])
+def test_invalid_saved_searches_are_rejected(app, payload):
+    response = create(app.test_client(), **payload)
+    assert response.status_code == 400
+    assert SavedSearch.query.count() == 0
+
+
+def test_saved_search_fields_are_normalized(app):
+    response = create(app.test_client(), name='  Nursing  ', email='Someone@Example.COM', keyword=' nurse ',
+                      salary_min='50000')
+    assert response.status_code == 201
+    saved = SavedSearch.query.one()
+    assert (saved.name, saved.email, saved.keyword, saved.salary_min) == ('Nursing', 'Someone@example.com', 'nurse', 50000.0)
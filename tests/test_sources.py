@@ -0,0 +1,61 @@
+from datetime import datetime
+import pytest
+from models import DEFAULT_SOURCE
+from sources import Source, get_source, parse_date, register, schedule_slots
+
+LISTING = """
+<table><tbody>
+  <tr><td><a href="/jobs/123">Registered Nurse</a></td><td>123</td><td>Health Care</td>
+      <td>Department of Health Services</td><td>Full-time</td><td>Phoenix</td><td>Jan 15 2026</td><td>No</td></tr>
+  <tr><td>No link</td><td>124</td><td></td><td></td><td></td><td></td><td></td></tr>
+  <tr><td><a href="/jobs/125">Too short</a></td><td>125</td></tr>
+</tbody></table>
+"""
+
+
+def test_parse_listing():
+    jobs = get_source().parse_listing(LISTING)
+    assert jobs == [{
+        'source': DEFAULT_SOURCE, 'title': 'Registered Nurse', 'url': 'https://www.azstatejobs.gov/jobs/123',
+        'requisition_id': '123', 'category': 'Health Care', 'department': 'Department of Health Services',
+        'employment_type': 'Full-time', 'location': 'Phoenix', 'closing_date': datetime(2026, 1, 15),
+        'postsecondary_required': 'No'}]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Jan 15 2026', datetime(2026, 1, 15)),
+    ('01/15/2026', datetime(2026, 1, 15)),
+    ('2026-01-15', datetime(2026, 1, 15)),
+    ('Closes Jan 15 2026 at noon', datetime(2026, 1, 15)),
+    ('  ', None),
+    ('soon', None),
+])
+def test_parse_date(text, expected):
+    assert parse_date(text) == expected
+
+
+def test_other_sources_prefix_their_requisition_ids():
+    class CountySource(Source):
+        name = 'county'
+        base_url = 'https://jobs.example.gov'
+        schedule = (10, 22)
+
+    county = CountySource()
+    assert county.job_key('123') == 'county:123'
+    assert get_source().job_key('123') == '123'
+    assert county.with_base_url('http://localhost:8000').listing_url == 'http://localhost:8000/'
+    assert county.listing_url == 'https://jobs.example.gov/'
+    assert schedule_slots([get_source(), county]) == {6: [DEFAULT_SOURCE], 10: [DEFAULT_SOURCE, 'county'],
+                                                     14: [DEFAULT_SOURCE], 18: [DEFAULT_SOURCE], 22: ['county']}
+
+
+def test_unknown_sources_and_backends_are_rejected():
+    with pytest.raises(ValueError):
+        get_source('nowhere')
+
+    class BadSource(Source):
+        name = 'bad'
+        backend = 'telnet'
+
+    with pytest.raises(ValueError):
+        register(BadSource)
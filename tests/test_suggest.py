@@ -0,0 +1,37 @@
+import random
+import re
+import pytest
+from suggest import MAX_LIMIT, SuggestIndex
+
+WORDS = ['Registered', 'Nurse', 'Nursing', 'Accountant', 'Senior', 'Analyst', 'IT', 'Officer', 'Correctional',
+         'Revenue', 'Phoenix', 'Tucson', 'Department', 'of', 'Health', 'Services', 'Program', 'Manager', 'II']
+
+
+def sample_counts(seed):
+    rng = random.Random(seed)
+    counts = {}
+    for kind in ('title', 'department', 'location'):
+        values = {' '.join(rng.sample(WORDS, rng.randint(1, 3))) for _ in range(60)}
+        counts[kind] = {f"{value} ({kind})": rng.randint(1, 40) for value in values}
+    return counts
+
+
+def brute_force(counts, prefix, limit):
+    matches = [(count, value, kind) for kind, values in counts.items() for value, count in values.items()
+               if any(value.lower()[match.start():].startswith(prefix.lower())
+                      for match in re.finditer(r'\b\w', value.lower()))]
+    matches.sort(key=lambda match: (-match[0], match[1]))
+    return [{'value': value, 'kind': kind, 'count': count} for count, value, kind in matches[:limit]]
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_suggest_matches_brute_force(seed):
+    counts = sample_counts(seed)
+    index = SuggestIndex(1, counts)
+    for prefix in ['n', 'NU', 'nur', 'nurse', 'se', 'ii', 'of health', 'dep', 'x', 'tucson (l', ' ph ']:
+        for limit in (1, 8, MAX_LIMIT):
+            assert index.suggest(prefix, limit) == brute_force(counts, prefix.strip(), limit), (prefix, limit)
+
+
+def test_blank_prefix_suggests_nothing():
+    assert SuggestIndex(1, sample_counts(1)).suggest('   ') == []